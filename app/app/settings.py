@@ -135,11 +135,32 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.2/howto/static-files/
 
 STATIC_URL = '/static/static/'
-MEDIA_URL = '/static/media/'
+# The media are served by `medication.views.MediaView`, to their owners.
+MEDIA_URL = '/api/media/'
+# Internal nginx location of MEDIA_ROOT, for the X-Accel-Redirect responses.
+MEDIA_INTERNAL_URL = '/static/media/'
+MEDIA_ACCEL_REDIRECT = bool(int(
+    os.environ.get('MEDIA_ACCEL_REDIRECT', int(not DEBUG))
+))
 
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Stream every upload to a temporary file, moved into MEDIA_ROOT on save.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+FILE_UPLOAD_TEMP_DIR = os.environ.get('FILE_UPLOAD_TEMP_DIR') or None
+
+MEDICATION_IMAGE_WORKERS = int(os.environ.get('MEDICATION_IMAGE_WORKERS', 2))
+MEDICATION_THUMBNAIL_SIZES = [
+    int(size)
+    for size in os.environ.get(
+        'MEDICATION_THUMBNAIL_SIZES',
+        '128,512',
+    ).split(',')
+]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -147,8 +168,34 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+TOKEN_CACHE_ALIAS = os.environ.get('TOKEN_CACHE_ALIAS') or None
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 60))
+
+DRONE_CACHE_ALIAS = os.environ.get('DRONE_CACHE_ALIAS') or None
+DRONE_CACHE_TTL = int(os.environ.get('DRONE_CACHE_TTL', 300))
+
+# Server of the app, `wsgi` (uwsgi) or `asgi` (gunicorn with uvicorn).
+APP_SERVER = os.environ.get('APP_SERVER', 'wsgi')
+# Route the busiest drone reads to their asynchronous views.
+ASYNC_DRONE_VIEWS = bool(int(
+    os.environ.get('ASYNC_DRONE_VIEWS', int(APP_SERVER == 'asgi'))
+))
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 100)),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -163,8 +210,13 @@ LOGGING = {
     'handlers': {
         'file': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
+            'class': 'core.log_handlers.QueuedFileHandler',
             'filename': LOG_ROOT + 'battery_history.log',
+            'rotation': os.environ.get('LOG_ROTATION', 'size'),
+            'max_bytes': int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+            'when': os.environ.get('LOG_ROTATION_WHEN', 'midnight'),
+            'backup_count': int(os.environ.get('LOG_BACKUP_COUNT', 10)),
+            'queue_size': int(os.environ.get('LOG_QUEUE_SIZE', 10000)),
             'formatter': 'battery_formatter'
         },
     },
@@ -0,0 +1,205 @@
+"""
+Authentication for the APIs.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.dispatch import receiver
+from django.db import models
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """Process-local LRU of token keys to users expiring after a TTL."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the `(user, generation)` cached for `key`, if any and not
+        expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            user, generation, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return user, generation
+
+    def set(self, key, user, generation=None):
+        """
+        Cache `user` for `key` with the `generation` of the token,
+        evicting the least recently used.
+        """
+        with self._lock:
+            self._entries[key] = (
+                user,
+                generation,
+                time.monotonic() + self.ttl
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove `key` from the cache."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_id):
+        """Remove every key cached for the user with `user_id`."""
+        with self._lock:
+            for key, (user, *_) in list(self._entries.items()):
+                if user.pk == user_id:
+                    del self._entries[key]
+
+    def clear(self):
+        """Remove every key from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+def get_shared_cache():
+    """Return the cache shared by the workers, if configured."""
+    if settings.TOKEN_CACHE_ALIAS is None:
+        return None
+
+    return caches[settings.TOKEN_CACHE_ALIAS]
+
+
+def shared_cache_key(key):
+    """Return the shared cache key of the token `key`."""
+    return f'auth-token:{key}'
+
+
+def generation_key(key):
+    """Return the shared cache key of the generation of the token `key`."""
+    return f'auth-generation:{key}'
+
+
+def get_generation(shared_cache, key):
+    """Return the generation of the token `key`, starting one if missing."""
+    cache_key = generation_key(key)
+    generation = shared_cache.get(cache_key)
+
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not shared_cache.add(cache_key, generation, timeout=None):
+            generation = shared_cache.get(cache_key, generation)
+
+    return generation
+
+
+def bump_generations(keys):
+    """
+    Replace the generations of the token `keys`, so every worker looks
+    them up again.
+    """
+    shared_cache = get_shared_cache()
+    if shared_cache is not None and keys:
+        shared_cache.set_many(
+            {generation_key(key): uuid.uuid4().hex for key in keys},
+            timeout=None
+        )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication caching the token to user lookup.
+
+    Users are kept in a process-local LRU and, if `TOKEN_CACHE_ALIAS` is
+    set, in that cache shared by the workers, for `TOKEN_CACHE_TTL`
+    seconds. Entries are removed when the token is deleted or the user
+    is saved, e.g. deactivated.
+
+    With the shared cache, the entries are tagged with the generation of
+    the token in it, read before the lookup and replaced by the removals.
+    An entry of another generation is ignored, so all the workers stop
+    authenticating the token at once, even if a lookup racing with the
+    removal caches the old user. Without it, only the worker handling
+    the removal forgets the token: the others keep authenticating it
+    for up to `TOKEN_CACHE_TTL` seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        shared_cache = get_shared_cache()
+        generation = None
+        if shared_cache is not None:
+            generation = get_generation(shared_cache, key)
+
+        user = None
+        entry = token_cache.get(key)
+        if entry is not None and entry[1] == generation:
+            user = entry[0]
+
+        if user is None:
+            if shared_cache is not None:
+                entry = shared_cache.get(shared_cache_key(key))
+                if entry is not None and entry[1] == generation:
+                    user = entry[0]
+
+            if user is None:
+                user, token = super().authenticate_credentials(key)
+                if shared_cache is not None:
+                    shared_cache.set(
+                        shared_cache_key(key),
+                        (user, generation),
+                        settings.TOKEN_CACHE_TTL
+                    )
+
+            token_cache.set(key, user, generation)
+
+        if not user.is_active:
+            return super().authenticate_credentials(key)
+
+        return (user, Token(key=key, user=user))
+
+
+def invalidate_token(key):
+    """Remove the token `key` from the caches."""
+    token_cache.delete(key)
+
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.delete(shared_cache_key(key))
+
+
+@receiver(models.signals.post_delete, sender=Token)
+def post_delete_token(sender, instance, *args, **kwargs):
+    """Stop authenticating with the deleted token."""
+    invalidate_token(instance.key)
+    bump_generations([instance.key])
+
+
+@receiver(models.signals.post_save, sender=get_user_model())
+def post_save_user(sender, instance, *args, **kwargs):
+    """Reload the saved user, e.g. deactivated, on the next request."""
+    token_cache.delete_user(instance.pk)
+
+    if get_shared_cache() is not None:
+        keys = list(Token.objects.filter(user=instance).values_list(
+            'key',
+            flat=True
+        ))
+        for key in keys:
+            invalidate_token(key)
+        bump_generations(keys)
@@ -0,0 +1,153 @@
+"""
+Logging handlers.
+"""
+import logging
+import os
+import queue
+import threading
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
+
+
+class ReopeningMixin:
+    """
+    Reopen the log file before checking for a rollover if another
+    process has already rotated it, so the workers sharing the file keep
+    writing to the current one.
+    """
+
+    def shouldRollover(self, record):
+        if self.stream is not None:
+            try:
+                current = os.stat(self.baseFilename)
+                opened = os.fstat(self.stream.fileno())
+                rotated = (current.st_dev, current.st_ino) != \
+                    (opened.st_dev, opened.st_ino)
+            except FileNotFoundError:
+                rotated = True
+
+            if rotated:
+                self.stream.close()
+                self.stream = self._open()
+
+        return super().shouldRollover(record)
+
+
+class SizeRotatingFileHandler(ReopeningMixin, RotatingFileHandler):
+    """Rotate the log file when it reaches a size."""
+
+
+class TimeRotatingFileHandler(ReopeningMixin, TimedRotatingFileHandler):
+    """Rotate the log file at time intervals."""
+
+
+class DrainingQueueListener(QueueListener):
+    """Queue listener that waits for room to stop on a full queue."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class QueuedFileHandler(QueueHandler):
+    """
+    Hand the records over to a background thread writing them to a
+    rotating file, so logging never waits on the disk.
+
+    The queue holds up to `queue_size` records. When it is full, records
+    are dropped instead of blocking the request; they are counted in
+    `dropped` and reported in the log once the writer catches up.
+    """
+
+    def __init__(
+            self,
+            filename,
+            rotation='size',
+            max_bytes=10 * 1024 * 1024,
+            when='midnight',
+            backup_count=10,
+            queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.filename = filename
+        self.rotation = rotation
+        self.max_bytes = max_bytes
+        self.when = when
+        self.backup_count = backup_count
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.unreported = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def get_target(self):
+        """Return the handler writing the records to the file."""
+        if self.rotation == 'time':
+            return TimeRotatingFileHandler(
+                self.filename,
+                when=self.when,
+                backupCount=self.backup_count,
+                delay=True,
+            )
+
+        return SizeRotatingFileHandler(
+            self.filename,
+            maxBytes=self.max_bytes,
+            backupCount=self.backup_count,
+            delay=True,
+        )
+
+    def start(self):
+        """
+        Start the writer thread in this process. uwsgi forks the workers
+        after loading the app, so every worker starts its own.
+        """
+        if self._pid == os.getpid():
+            return
+
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self.queue = queue.Queue(self.queue_size)
+                self._listener = DrainingQueueListener(
+                    self.queue,
+                    self.get_target()
+                )
+                self._listener.start()
+                self._pid = os.getpid()
+
+    def enqueue(self, record):
+        self.start()
+
+        try:
+            if self.unreported:
+                self.queue.put_nowait(self.dropped_record(record))
+                self.unreported = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self.unreported += 1
+
+    def dropped_record(self, record):
+        """Return a record reporting the records dropped so far."""
+        message = f'{self.unreported} log records dropped, ' \
+                  f'{self.dropped} in total.'
+        dropped = logging.makeLogRecord({
+            'name': record.name,
+            'levelno': logging.WARNING,
+            'levelname': logging.getLevelName(logging.WARNING),
+            'msg': message,
+        })
+        return self.prepare(dropped)
+
+    def close(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+            self._pid = None
+
+        super().close()
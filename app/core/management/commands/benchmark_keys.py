@@ -0,0 +1,191 @@
+"""
+Django command to benchmark natural against surrogate primary keys.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+
+LAYOUTS = {
+    'natural': {
+        'drone': 'key varchar(100) PRIMARY KEY, battery integer',
+        'medication': 'key varchar(50) PRIMARY KEY, weight integer',
+        'key_type': 'varchar',
+        'drone_key': "'DRONE' || lpad(({i})::text, 10, '0')",
+        'medication_key': "'MEDICATION_' || lpad(({i})::text, 10, '0')",
+        'drone_natural': 'key',
+        'medication_natural': 'key',
+    },
+    'surrogate': {
+        'drone': 'key bigint PRIMARY KEY, '
+                 'serial_number varchar(100) UNIQUE, battery integer',
+        'medication': 'key bigint PRIMARY KEY, '
+                      'code varchar(50) UNIQUE, weight integer',
+        'key_type': 'bigint',
+        'drone_key': '{i}',
+        'medication_key': '{i}',
+        'drone_natural': 'serial_number',
+        'medication_natural': 'code',
+    },
+}
+
+QUERIES = {
+    'join': (
+        'SELECT sum(m.weight) FROM {load} AS l '
+        'JOIN {drone} AS d ON d.key = l.drone '
+        'JOIN {medication} AS m ON m.key = l.medication '
+        'WHERE d.battery >= 50'
+    ),
+    'manifest': (
+        'SELECT m.{medication_natural} FROM {load} AS l '
+        'JOIN {drone} AS d ON d.key = l.drone '
+        'JOIN {medication} AS m ON m.key = l.medication '
+        "WHERE d.{drone_natural} = (SELECT {drone_natural} FROM {drone} "
+        'ORDER BY key OFFSET %s LIMIT 1)'
+    ),
+    'in_use': (
+        'SELECT EXISTS (SELECT 1 FROM {load} AS l '
+        'JOIN {medication} AS m ON m.key = l.medication '
+        "WHERE m.{medication_natural} = (SELECT {medication_natural} "
+        'FROM {medication} ORDER BY key OFFSET %s LIMIT 1))'
+    ),
+}
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the primary key layouts."""
+
+    help = 'Compare the size and join speed of a drone load table keyed ' \
+           'by the varchar natural keys against bigint surrogate keys.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drones', type=int, default=100000)
+        parser.add_argument('--medications', type=int, default=1000)
+        parser.add_argument('--loads', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        drones = options['drones']
+        medications = options['medications']
+        loads = min(options['loads'], drones * medications)
+
+        for name, layout in LAYOUTS.items():
+            with transaction.atomic(), connection.cursor() as cursor:
+                tables = self.create_tables(
+                    cursor,
+                    name,
+                    layout,
+                    drones,
+                    medications,
+                    loads
+                )
+
+                cursor.execute(
+                    'SELECT pg_total_relation_size(%s), '
+                    'pg_indexes_size(%s)',
+                    [tables['load'], tables['load']]
+                )
+                total, indexes = cursor.fetchone()
+                timings = {
+                    query: self.time_query(
+                        cursor,
+                        sql.format(
+                            **tables,
+                            drone_natural=layout['drone_natural'],
+                            medication_natural=layout['medication_natural']
+                        ),
+                        [i * 7919 % drones if query == 'manifest'
+                         else i * 7919 % medications
+                         for i in range(options['repeat'])]
+                    )
+                    for query, sql in QUERIES.items()
+                }
+
+                self.stdout.write(
+                    f'{name:>9}: {loads} loads take '
+                    f'{total / 2 ** 20:.1f} MiB '
+                    f'({indexes / 2 ** 20:.1f} MiB of indexes), ' +
+                    ', '.join(
+                        f'{query} {timing * 1000:.2f} ms'
+                        for query, timing in timings.items()
+                    ) +
+                    f' (best of {options["repeat"]}).'
+                )
+                transaction.set_rollback(True)
+
+    def create_tables(self, cursor, name, layout, drones, medications,
+                      loads):
+        """Create and fill the temporary tables of the `layout`."""
+        tables = {
+            table: f'benchmark_{name}_{table}'
+            for table in ['drone', 'medication', 'load']
+        }
+        key_type = layout['key_type']
+
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {tables["drone"]} '
+            f'({layout["drone"]}) ON COMMIT DROP'
+        )
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {tables["medication"]} '
+            f'({layout["medication"]}) ON COMMIT DROP'
+        )
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {tables["load"]} ('
+            f'id bigserial PRIMARY KEY, '
+            f'drone {key_type} NOT NULL '
+            f'REFERENCES {tables["drone"]} (key), '
+            f'medication {key_type} NOT NULL '
+            f'REFERENCES {tables["medication"]} (key), '
+            f'UNIQUE (drone, medication)) ON COMMIT DROP'
+        )
+        cursor.execute(
+            f'CREATE INDEX ON {tables["load"]} (medication, drone)'
+        )
+
+        drone_columns = [layout['drone_key'].format(i='i')]
+        medication_columns = [layout['medication_key'].format(i='i')]
+        if layout['drone_natural'] != 'key':
+            drone_columns.append(
+                LAYOUTS['natural']['drone_key'].format(i='i')
+            )
+            medication_columns.append(
+                LAYOUTS['natural']['medication_key'].format(i='i')
+            )
+
+        cursor.execute(
+            f'INSERT INTO {tables["drone"]} '
+            f'SELECT {", ".join(drone_columns)}, i %% 101 '
+            f'FROM generate_series(0, %s) AS i',
+            [drones - 1]
+        )
+        cursor.execute(
+            f'INSERT INTO {tables["medication"]} '
+            f'SELECT {", ".join(medication_columns)}, 1 + i %% 500 '
+            f'FROM generate_series(0, %s) AS i',
+            [medications - 1]
+        )
+        cursor.execute(
+            f'INSERT INTO {tables["load"]} (drone, medication) '
+            f'SELECT {layout["drone_key"].format(i="i %% %s")}, '
+            f'{layout["medication_key"].format(i="i / %s")} '
+            f'FROM generate_series(0, %s) AS i',
+            [drones, drones, loads - 1]
+        )
+        for table in tables.values():
+            cursor.execute(f'ANALYZE {table}')
+
+        return tables
+
+    def time_query(self, cursor, sql, params):
+        """Return the best time running `sql` with each of the `params`."""
+        timings = []
+        for param in params:
+            start = time.perf_counter()
+            cursor.execute(sql, [param] if '%s' in sql else None)
+            cursor.fetchall()
+            timings.append(time.perf_counter() - start)
+
+        return min(timings)
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.10 on 2026-10-17 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_medication_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='drone',
+            index=models.Index(fields=['user', 'serial_number'], name='drone_user_serial_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medication',
+            index=models.Index(fields=['user', '-name', 'code'], name='medication_user_name_code_idx'),
+        ),
+    ]
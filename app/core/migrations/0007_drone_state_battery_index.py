@@ -0,0 +1,17 @@
+# Generated by Django 4.0.10 on 2026-10-17 15:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='drone',
+            index=models.Index(fields=['user', 'state', 'battery'], name='drone_user_state_battery_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.10 on 2026-10-17 15:36
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_drone_state_battery_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatteryReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('battery', models.IntegerField(validators=[django.core.validators.MaxValueValidator(100), django.core.validators.MinValueValidator(0)])),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('drone', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='battery_readings', to='core.drone')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='batteryreading',
+            index=models.Index(fields=['drone', 'timestamp'], name='battery_drone_timestamp_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.0.10 on 2026-10-17 15:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_batteryreading'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='drone',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='medication',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='drone',
+            index=models.Index(fields=['user', 'updated_at'], name='drone_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medication',
+            index=models.Index(fields=['user', 'updated_at'], name='medication_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.0.10 on 2026-10-17 16:05
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def load_totals(apps, schema_editor):
+    """Compute the loaded weight and count of the existing drones."""
+    Drone = apps.get_model('core', 'Drone')
+    DroneMedication = Drone.medications.through
+    loads = DroneMedication.objects.filter(
+        drone=OuterRef('pk')
+    ).order_by().values('drone')
+
+    Drone.objects.update(
+        loaded_weight=Coalesce(
+            Subquery(loads.annotate(
+                total=Sum('medication__weight')
+            ).values('total')),
+            0
+        ),
+        loaded_count=Coalesce(
+            Subquery(loads.annotate(total=Count('pk')).values('total')),
+            0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='drone',
+            name='loaded_count',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddField(
+            model_name='drone',
+            name='loaded_weight',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.RunPython(load_totals, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='drone',
+            index=models.Index(fields=['user', 'state', 'serial_number'], include=('weight_limit', 'battery', 'loaded_weight', 'loaded_count'), name='drone_user_state_capacity_idx'),
+        ),
+    ]
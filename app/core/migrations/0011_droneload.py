@@ -0,0 +1,84 @@
+# Generated by Django 4.0.10 on 2026-10-17 16:40
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+def copy_loads(apps, schema_editor):
+    """Copy the drone medications into the load manifest."""
+    Drone = apps.get_model('core', 'Drone')
+    DroneLoad = apps.get_model('core', 'DroneLoad')
+    DroneMedication = Drone.medications.through
+
+    loads = []
+    for drone_id, medication_id in DroneMedication.objects.values_list(
+            'drone_id',
+            'medication_id').iterator(chunk_size=1000):
+        loads.append(DroneLoad(drone_id=drone_id, medication_id=medication_id))
+    DroneLoad.objects.bulk_create(loads, batch_size=1000)
+
+
+def copy_medications(apps, schema_editor):
+    """Copy the load manifest back into the drone medications."""
+    Drone = apps.get_model('core', 'Drone')
+    DroneLoad = apps.get_model('core', 'DroneLoad')
+    DroneMedication = Drone.medications.through
+
+    medications = []
+    for drone_id, medication_id in DroneLoad.objects.values_list(
+            'drone_id',
+            'medication_id').iterator(chunk_size=1000):
+        medications.append(
+            DroneMedication(drone_id=drone_id, medication_id=medication_id)
+        )
+    DroneMedication.objects.bulk_create(medications, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_drone_loaded_weight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DroneLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)])),
+                ('loaded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('delivery_id', models.UUIDField(default=uuid.uuid4)),
+                ('drone', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='loads', to='core.drone')),
+                ('medication', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='loads', to='core.medication')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='droneload',
+            constraint=models.UniqueConstraint(fields=('drone', 'medication'), name='droneload_drone_medication_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='droneload',
+            index=models.Index(fields=['medication', 'drone'], name='droneload_medication_drone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='droneload',
+            index=models.Index(fields=['loaded_at'], name='droneload_loaded_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='droneload',
+            index=models.Index(fields=['delivery_id'], name='droneload_delivery_idx'),
+        ),
+        migrations.RunPython(copy_loads, copy_medications),
+        migrations.RemoveField(
+            model_name='drone',
+            name='medications',
+        ),
+        migrations.AddField(
+            model_name='drone',
+            name='medications',
+            field=models.ManyToManyField(through='core.DroneLoad', to='core.medication'),
+        ),
+    ]
@@ -0,0 +1,150 @@
+# Generated by Django 4.0.10 on 2026-10-17 17:20
+
+import django.core.validators
+from django.db import migrations, models
+
+
+FORWARD_SQL = [
+    # Check the deferred foreign keys now, so the tables can be altered.
+    'SET CONSTRAINTS ALL IMMEDIATE',
+
+    # Number the drones and medications.
+    'ALTER TABLE core_drone ADD COLUMN id bigserial NOT NULL',
+    'ALTER TABLE core_medication ADD COLUMN id bigserial NOT NULL',
+
+    # Translate the references to the new keys.
+    'ALTER TABLE core_droneload '
+    'ADD COLUMN drone_key bigint, ADD COLUMN medication_key bigint',
+    'UPDATE core_droneload AS l SET drone_key = d.id '
+    'FROM core_drone AS d WHERE d.serial_number = l.drone_id',
+    'UPDATE core_droneload AS l SET medication_key = m.id '
+    'FROM core_medication AS m WHERE m.code = l.medication_id',
+    'ALTER TABLE core_batteryreading ADD COLUMN drone_key bigint',
+    'UPDATE core_batteryreading AS r SET drone_key = d.id '
+    'FROM core_drone AS d WHERE d.serial_number = r.drone_id',
+    'ALTER TABLE core_droneload DROP COLUMN drone_id, DROP COLUMN medication_id',
+    'ALTER TABLE core_batteryreading DROP COLUMN drone_id',
+
+    # Swap the primary keys, keeping the natural keys unique.
+    'ALTER TABLE core_drone DROP CONSTRAINT core_drone_pkey, '
+    'ADD CONSTRAINT core_drone_pkey PRIMARY KEY (id), '
+    'ADD CONSTRAINT core_drone_serial_number_key UNIQUE (serial_number)',
+    'ALTER TABLE core_medication DROP CONSTRAINT core_medication_pkey, '
+    'ADD CONSTRAINT core_medication_pkey PRIMARY KEY (id), '
+    'ADD CONSTRAINT core_medication_code_key UNIQUE (code)',
+
+    # Restore the references with their constraints and indexes.
+    'ALTER TABLE core_droneload RENAME COLUMN drone_key TO drone_id',
+    'ALTER TABLE core_droneload '
+    'RENAME COLUMN medication_key TO medication_id',
+    'ALTER TABLE core_droneload '
+    'ALTER COLUMN drone_id SET NOT NULL, '
+    'ALTER COLUMN medication_id SET NOT NULL, '
+    'ADD CONSTRAINT core_droneload_drone_id_e2055755_fk_core_drone_id '
+    'FOREIGN KEY (drone_id) REFERENCES core_drone (id) '
+    'DEFERRABLE INITIALLY DEFERRED, '
+    'ADD CONSTRAINT core_droneload_medication_id_1514041b_fk_core_medication_id '
+    'FOREIGN KEY (medication_id) REFERENCES core_medication (id) '
+    'DEFERRABLE INITIALLY DEFERRED, '
+    'ADD CONSTRAINT droneload_drone_medication_unique '
+    'UNIQUE (drone_id, medication_id)',
+    'CREATE INDEX droneload_medication_drone_idx '
+    'ON core_droneload (medication_id, drone_id)',
+    'ALTER TABLE core_batteryreading RENAME COLUMN drone_key TO drone_id',
+    'ALTER TABLE core_batteryreading '
+    'ALTER COLUMN drone_id SET NOT NULL, '
+    'ADD CONSTRAINT core_batteryreading_drone_id_4938b5ea_fk_core_drone_id '
+    'FOREIGN KEY (drone_id) REFERENCES core_drone (id) '
+    'DEFERRABLE INITIALLY DEFERRED',
+    'CREATE INDEX battery_drone_timestamp_idx '
+    'ON core_batteryreading (drone_id, "timestamp")',
+]
+
+REVERSE_SQL = [
+    'SET CONSTRAINTS ALL IMMEDIATE',
+
+    'ALTER TABLE core_droneload '
+    'ADD COLUMN drone_key varchar(100), ADD COLUMN medication_key varchar(50)',
+    'UPDATE core_droneload AS l SET drone_key = d.serial_number '
+    'FROM core_drone AS d WHERE d.id = l.drone_id',
+    'UPDATE core_droneload AS l SET medication_key = m.code '
+    'FROM core_medication AS m WHERE m.id = l.medication_id',
+    'ALTER TABLE core_batteryreading ADD COLUMN drone_key varchar(100)',
+    'UPDATE core_batteryreading AS r SET drone_key = d.serial_number '
+    'FROM core_drone AS d WHERE d.id = r.drone_id',
+    'ALTER TABLE core_droneload DROP COLUMN drone_id, DROP COLUMN medication_id',
+    'ALTER TABLE core_batteryreading DROP COLUMN drone_id',
+
+    'ALTER TABLE core_drone DROP CONSTRAINT core_drone_serial_number_key, '
+    'DROP CONSTRAINT core_drone_pkey, '
+    'ADD CONSTRAINT core_drone_pkey PRIMARY KEY (serial_number)',
+    'ALTER TABLE core_medication DROP CONSTRAINT core_medication_code_key, '
+    'DROP CONSTRAINT core_medication_pkey, '
+    'ADD CONSTRAINT core_medication_pkey PRIMARY KEY (code)',
+    'ALTER TABLE core_drone DROP COLUMN id',
+    'ALTER TABLE core_medication DROP COLUMN id',
+
+    'ALTER TABLE core_droneload RENAME COLUMN drone_key TO drone_id',
+    'ALTER TABLE core_droneload '
+    'RENAME COLUMN medication_key TO medication_id',
+    'ALTER TABLE core_droneload '
+    'ALTER COLUMN drone_id SET NOT NULL, '
+    'ALTER COLUMN medication_id SET NOT NULL, '
+    'ADD CONSTRAINT core_droneload_drone_id_e2055755_fk_core_drone_serial_number '
+    'FOREIGN KEY (drone_id) REFERENCES core_drone (serial_number) '
+    'DEFERRABLE INITIALLY DEFERRED, '
+    'ADD CONSTRAINT core_droneload_medication_id_1514041b_fk_core_medication_code '
+    'FOREIGN KEY (medication_id) REFERENCES core_medication (code) '
+    'DEFERRABLE INITIALLY DEFERRED, '
+    'ADD CONSTRAINT droneload_drone_medication_unique '
+    'UNIQUE (drone_id, medication_id)',
+    'CREATE INDEX droneload_medication_drone_idx '
+    'ON core_droneload (medication_id, drone_id)',
+    'ALTER TABLE core_batteryreading RENAME COLUMN drone_key TO drone_id',
+    'ALTER TABLE core_batteryreading '
+    'ALTER COLUMN drone_id SET NOT NULL, '
+    'ADD CONSTRAINT core_batteryreading_drone_id_4938b5ea_fk_core_dron '
+    'FOREIGN KEY (drone_id) REFERENCES core_drone (serial_number) '
+    'DEFERRABLE INITIALLY DEFERRED',
+    'CREATE INDEX battery_drone_timestamp_idx '
+    'ON core_batteryreading (drone_id, "timestamp")',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_droneload'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(FORWARD_SQL, REVERSE_SQL),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='drone',
+                    name='serial_number',
+                    field=models.CharField(max_length=100, unique=True, validators=[django.core.validators.MinLengthValidator(5)]),
+                ),
+                migrations.AddField(
+                    model_name='drone',
+                    name='id',
+                    field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+                    preserve_default=False,
+                ),
+                migrations.AlterField(
+                    model_name='medication',
+                    name='code',
+                    field=models.CharField(max_length=50, unique=True, validators=[django.core.validators.MinLengthValidator(5), django.core.validators.RegexValidator(message='Only uppercase, numbers and underscore.', regex='\\b[A-Z0-9_]+\\b')]),
+                ),
+                migrations.AddField(
+                    model_name='medication',
+                    name='id',
+                    field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+                    preserve_default=False,
+                ),
+            ],
+        ),
+    ]
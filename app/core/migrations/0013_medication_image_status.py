@@ -0,0 +1,27 @@
+# Generated by Django 4.0.10 on 2026-10-17 18:10
+
+from django.db import migrations, models
+
+
+def mark_pending(apps, schema_editor):
+    """Queue the existing images for processing."""
+    Medication = apps.get_model('core', 'Medication')
+    Medication.objects.exclude(image__isnull=True).exclude(image='').update(
+        image_status=0
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_surrogate_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medication',
+            name='image_status',
+            field=models.IntegerField(choices=[(0, 'Pending'), (1, 'Ready'), (2, 'Failed')], null=True),
+        ),
+        migrations.RunPython(mark_pending, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.0.10 on 2026-10-17 18:40
+
+import core.models
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+import django.utils.timezone
+
+
+def count_references(apps, schema_editor):
+    """Reference count the images of the existing medications."""
+    Medication = apps.get_model('core', 'Medication')
+    ImageBlob = apps.get_model('core', 'ImageBlob')
+    images = Medication.objects.exclude(image__isnull=True).exclude(
+        image=''
+    ).values('image').annotate(references=Count('pk')).order_by()
+
+    ImageBlob.objects.bulk_create(
+        [
+            ImageBlob(name=image['image'], references=image['references'])
+            for image in images.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_medication_image_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('references', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='imageblob',
+            index=models.Index(condition=models.Q(('references__lte', 0)), fields=['updated_at'], name='imageblob_unreferenced_idx'),
+        ),
+        migrations.AlterField(
+            model_name='medication',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.medication_image_file_path),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,214 @@
+"""
+Mixins for the API views.
+"""
+import hashlib
+
+from django.db.models import Count, Max, prefetch_related_objects
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import (
+    http_date,
+    parse_etags,
+    parse_http_date_safe,
+    quote_etag,
+)
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders, json
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional list and detail requests with a 304 from one
+    aggregate query over `updated_at`, before any row is serialized.
+
+    The ETag covers the latest modification and the number of rows, so
+    it also changes when rows are deleted. Set
+    `detail_last_modified_fields` to also cover related rows rendered in
+    the detail view.
+    """
+    list_last_modified_fields = ('updated_at',)
+    detail_last_modified_fields = ('updated_at',)
+
+    def get_conditional_state(self, queryset, fields):
+        """Return the number of rows and their latest modification."""
+        state = queryset.order_by().aggregate(
+            count=Count('pk', distinct=True),
+            **{f'field_{i}': Max(field) for i, field in enumerate(fields)}
+        )
+        count = state.pop('count')
+        last_modified = max(filter(None, state.values()), default=None)
+
+        return count, last_modified
+
+    def get_etag(self, request, count, last_modified):
+        """Return the ETag of the rows shown at the request URL."""
+        version = '{}:{}:{}:{}'.format(
+            request.user.pk,
+            request.get_full_path(),
+            count,
+            last_modified.isoformat() if last_modified else '',
+        )
+        return quote_etag(hashlib.sha1(version.encode()).hexdigest())
+
+    def is_not_modified(self, request, etag, last_modified):
+        """Return whether the client already has the current version."""
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags
+
+        if_modified_since = parse_http_date_safe(
+            request.headers.get('If-Modified-Since')
+        )
+        return if_modified_since is not None and last_modified is not None \
+            and int(last_modified.timestamp()) <= if_modified_since
+
+    def conditional_response(self, request, queryset, fields, render,
+                             detail=False):
+        """
+        Return a 304 if the rows of `queryset` did not change since the
+        client got them, otherwise the response built by `render`.
+        """
+        count, last_modified = self.get_conditional_state(queryset, fields)
+        if detail and count == 0:
+            return render()
+
+        etag = self.get_etag(request, count, last_modified)
+
+        if self.is_not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+        else:
+            response = render()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request,
+            self.filter_queryset(self.get_queryset()),
+            self.list_last_modified_fields,
+            lambda: super(ConditionalGetMixin, self).list(
+                request,
+                *args,
+                **kwargs
+            )
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+
+        return self.conditional_response(
+            request,
+            queryset,
+            self.detail_last_modified_fields,
+            lambda: super(ConditionalGetMixin, self).retrieve(
+                request,
+                *args,
+                **kwargs
+            ),
+            detail=True
+        )
+
+
+STREAM_PARAMETER = OpenApiParameter(
+    'stream',
+    OpenApiTypes.STR,
+    enum=['json', 'ndjson'],
+    description='Stream every row instead of a page.',
+)
+
+
+class StreamingListMixin:
+    """
+    Stream the whole list, unpaginated, when requested with
+    `?stream=json` or `?stream=ndjson`, documented by `STREAM_PARAMETER`.
+
+    The rows are read from a server-side cursor `stream_chunk_size` at a
+    time, their prefetches are done per chunk, and each chunk is encoded
+    and sent before the next one is read, so the memory used does not
+    grow with the number of rows.
+    """
+    stream_chunk_size = 1000
+    stream_content_types = {
+        'json': 'application/json',
+        'ndjson': 'application/x-ndjson',
+    }
+
+    def get_stream_format(self, request):
+        """Return the requested stream format, or None to paginate."""
+        stream_format = request.query_params.get('stream')
+        if stream_format is not None and \
+                stream_format not in self.stream_content_types:
+            raise ParseError(detail='The stream format must be one of '
+                                    f'{list(self.stream_content_types)}.')
+
+        return stream_format
+
+    def iterate_chunks(self, queryset):
+        """Yield the rows of `queryset` in prefetched chunks."""
+        lookups = queryset._prefetch_related_lookups
+        rows = queryset.prefetch_related(None).iterator(
+            chunk_size=self.stream_chunk_size
+        )
+
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == self.stream_chunk_size:
+                prefetch_related_objects(chunk, *lookups)
+                yield chunk
+                chunk = []
+
+        if chunk:
+            prefetch_related_objects(chunk, *lookups)
+            yield chunk
+
+    def stream_rows(self, queryset, stream_format):
+        """Yield the serialized rows of `queryset` as encoded text."""
+        separators = (',', ':') if api_settings.COMPACT_JSON else None
+
+        def encode(chunk):
+            return [
+                json.dumps(
+                    row,
+                    cls=encoders.JSONEncoder,
+                    ensure_ascii=not api_settings.UNICODE_JSON,
+                    separators=separators,
+                )
+                for row in self.get_serializer(chunk, many=True).data
+            ]
+
+        if stream_format == 'ndjson':
+            for chunk in self.iterate_chunks(queryset):
+                yield ''.join(f'{row}\n' for row in encode(chunk))
+            return
+
+        separator = ''
+        yield '['
+        for chunk in self.iterate_chunks(queryset):
+            yield separator + ','.join(encode(chunk))
+            separator = ','
+        yield ']'
+
+    def list(self, request, *args, **kwargs):
+        stream_format = self.get_stream_format(request)
+        if stream_format is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(
+            self.stream_rows(queryset, stream_format),
+            content_type=self.stream_content_types[stream_format],
+        )
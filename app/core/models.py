@@ -3,6 +3,8 @@ Database models.
 """
 import uuid
 import os
+import weakref
+from collections import Counter, defaultdict
 
 from model_utils import Choices
 from django.conf import settings
@@ -14,13 +16,17 @@ from django.core.validators import (
     MinLengthValidator,
     RegexValidator,
 )
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
+from core.storage import ContentAddressedStorage
+
 
 def medication_image_file_path(instance, filename):
     """Generate file path for new medication image."""
@@ -98,7 +104,6 @@ class Drone(models.Model):
     )
 
     serial_number = models.CharField(
-        primary_key=True,
         max_length=100,
         unique=True,
         validators=[
@@ -131,7 +136,49 @@ class Drone(models.Model):
         choices=DRONE_STATUS,
     )
 
-    medications = models.ManyToManyField('Medication')
+    medications = models.ManyToManyField('Medication', through='DroneLoad')
+
+    loaded_weight = models.IntegerField(
+        default=0,
+        validators=[
+            MinValueValidator(0)
+        ],
+        )
+
+    loaded_count = models.IntegerField(
+        default=0,
+        validators=[
+            MinValueValidator(0)
+        ],
+        )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'serial_number'],
+                name='drone_user_serial_idx',
+            ),
+            models.Index(
+                fields=['user', 'state', 'battery'],
+                name='drone_user_state_battery_idx',
+            ),
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='drone_user_updated_idx',
+            ),
+            models.Index(
+                fields=['user', 'state', 'serial_number'],
+                include=[
+                    'weight_limit',
+                    'battery',
+                    'loaded_weight',
+                    'loaded_count',
+                ],
+                name='drone_user_state_capacity_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.serial_number
@@ -149,12 +196,17 @@ def set_default_weight_limit(sender, instance, *args, **kwargs):
 class Medication(models.Model):
     """Medications that can be loaded on drones."""
 
+    IMAGE_STATUS = Choices(
+        (0, 'pending', _('Pending')),
+        (1, 'ready', _('Ready')),
+        (2, 'failed', _('Failed')),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
     code = models.CharField(
-        primary_key=True,
         max_length=50,
         unique=True,
         validators=[
@@ -183,15 +235,225 @@ class Medication(models.Model):
             MinValueValidator(1)
         ]
     )
-    image = models.ImageField(null=True, upload_to=medication_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=medication_image_file_path,
+        storage=ContentAddressedStorage(),
+    )
+
+    image_status = models.IntegerField(
+        null=True,
+        choices=IMAGE_STATUS,
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'code'],
+                name='medication_user_name_code_idx',
+            ),
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='medication_user_updated_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class DroneLoad(models.Model):
+    """Medication loaded into a drone."""
+
+    drone = models.ForeignKey(
+        Drone,
+        on_delete=models.CASCADE,
+        related_name='loads',
+        db_index=False,
+    )
+
+    medication = models.ForeignKey(
+        Medication,
+        on_delete=models.CASCADE,
+        related_name='loads',
+        db_index=False,
+    )
+
+    quantity = models.IntegerField(
+        default=1,
+        validators=[
+            MinValueValidator(1)
+        ],
+    )
+
+    loaded_at = models.DateTimeField(default=timezone.now)
+
+    delivery_id = models.UUIDField(default=uuid.uuid4)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['drone', 'medication'],
+                name='droneload_drone_medication_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['medication', 'drone'],
+                name='droneload_medication_drone_idx',
+            ),
+            models.Index(
+                fields=['loaded_at'],
+                name='droneload_loaded_at_idx',
+            ),
+            models.Index(
+                fields=['delivery_id'],
+                name='droneload_delivery_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.quantity} x {self.medication_id} in {self.drone_id}'
+
+
+class BatteryReading(models.Model):
+    """Battery level reported by a drone."""
+
+    drone = models.ForeignKey(
+        Drone,
+        on_delete=models.CASCADE,
+        related_name='battery_readings',
+        db_index=False,
+    )
+
+    battery = models.IntegerField(
+        validators=[
+            MaxValueValidator(100),
+            MinValueValidator(0)
+        ],
+    )
+
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['drone', 'timestamp'],
+                name='battery_drone_timestamp_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.drone_id} {self.battery}% at {self.timestamp}'
+
+
+class ReleaseBatch:
+    """References on images released together on commit."""
+
+    def __init__(self, manager, names):
+        self.manager = manager
+        self.names = list(names)
+        self.released = False
+
+    def __call__(self):
+        self.released = True
+        self.manager.release(self.names)
+
+
+class ImageBlobManager(models.Manager):
+    """Manager for the references to the stored images."""
+
+    def acquire(self, name):
+        """Take a reference on the image `name`, creating its blob."""
+        now = timezone.now()
+        references = self.filter(name=name)
+        if references.update(references=F('references') + 1, updated_at=now):
+            return
+
+        try:
+            with transaction.atomic():
+                self.create(name=name, references=1, updated_at=now)
+        except IntegrityError:
+            references.update(
+                references=F('references') + 1,
+                updated_at=now
+            )
+
+    def release(self, names):
+        """
+        Release a reference on every image in `names`, once per
+        occurrence, with one update per distinct number of occurrences.
+        """
+        now = timezone.now()
+        by_count = defaultdict(list)
+        for name, count in Counter(names).items():
+            by_count[count].append(name)
+
+        for count, counted in by_count.items():
+            self.filter(name__in=counted).update(
+                references=F('references') - count,
+                updated_at=now
+            )
+
+    def release_on_commit(self, names):
+        """
+        Release the references on `names` once the current transaction
+        commits, together with the ones released in the same savepoint.
+        Nothing is released if the transaction rolls back.
+        """
+        connection = transaction.get_connection(self.db)
+        if not connection.in_atomic_block:
+            self.release(names)
+            return
+
+        # The pending batches by savepoint, only referenced weakly so a
+        # batch Django discards on rollback drops out of the mapping.
+        batches = getattr(connection, 'image_release_batches', None)
+        if batches is None:
+            batches = connection.image_release_batches = \
+                weakref.WeakValueDictionary()
+
+        savepoints = tuple(connection.savepoint_ids)
+        batch = batches.get(savepoints)
+        if batch is not None and not batch.released:
+            batch.names.extend(names)
+            return
+
+        batch = batches[savepoints] = ReleaseBatch(self, names)
+        transaction.on_commit(batch, using=self.db)
+
+
+class ImageBlob(models.Model):
+    """Stored image shared by the rows referencing it."""
+
+    name = models.CharField(max_length=255, unique=True)
+
+    references = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    objects = ImageBlobManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['updated_at'],
+                condition=models.Q(references__lte=0),
+                name='imageblob_unreferenced_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.references} references)'
+
+
 @receiver(models.signals.post_delete, sender=Medication)
 def post_delete_medication(sender, instance, *args, **kwargs):
-    """ Clean Old Image file """
+    """
+    Release the reference of the medication on its image once the
+    deletion commits. The file itself is removed by the sweeper.
+    """
     if instance.image:
-        if os.path.isfile(instance.image.path):
-            os.remove(instance.image.path)
+        instance.image.storage.delete(instance.image.name)
@@ -0,0 +1,216 @@
+"""
+Pagination for the APIs.
+"""
+import binascii
+import json
+import operator
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the unique `ordering` of the view.
+
+    The cursor holds the ordering values of the last row seen, so every
+    page is fetched with an indexable `WHERE (a, b) > (x, y)` condition
+    and costs the same no matter how deep the client pages.
+    """
+    ordering = ('pk',)
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return the page of `queryset` selected by the request cursor."""
+        self.base_url = request.build_absolute_uri()
+        self.ordering = tuple(getattr(view, 'ordering', self.ordering))
+        self.page_size = self.get_page_size(request)
+        reverse, position = self.decode_cursor(request)
+        if position is not None:
+            position = self.clean_position(queryset.model, position)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(invert_ordering(field) for field in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(keyset_filter(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        return self.page
+
+    def get_page_size(self, request):
+        """Return the page size requested by the client, if valid."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+
+        return min(page_size, self.max_page_size)
+
+    def get_position(self, instance):
+        """Return the ordering values of `instance`, a model or a dict."""
+        if isinstance(instance, dict):
+            return [instance[field.lstrip('-')] for field in self.ordering]
+
+        return [
+            getattr(instance, field.lstrip('-'))
+            for field in self.ordering
+        ]
+
+    def get_next_link(self):
+        """Return the link to the page after the current one."""
+        if not self.has_next or not self.page:
+            return None
+
+        return self.encode_cursor(False, self.get_position(self.page[-1]))
+
+    def get_previous_link(self):
+        """Return the link to the page before the current one."""
+        if not self.has_previous or not self.page:
+            return None
+
+        return self.encode_cursor(True, self.get_position(self.page[0]))
+
+    def decode_cursor(self, request):
+        """Return the `(reverse, position)` held by the request cursor."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            reverse = bool(cursor['r'])
+            position = cursor['p']
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return reverse, position
+
+    def clean_position(self, model, position):
+        """
+        Return the cursor `position` converted by the ordering fields of
+        `model`, rejecting the values no row can have.
+        """
+        cleaned = []
+        for field, value in zip(self.ordering, position):
+            if not isinstance(value, (str, int, float)):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                cleaned.append(
+                    ordering_field(model, field.lstrip('-')).to_python(value)
+                )
+            except (ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        return cleaned
+
+    def encode_cursor(self, reverse, position):
+        """Return the URL pointing to the given cursor."""
+        cursor = json.dumps({'r': int(reverse), 'p': position})
+        encoded = urlsafe_b64encode(cursor.encode('utf-8')).decode('ascii')
+
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            encoded
+        )
+
+    def get_paginated_response(self, data):
+        """Wrap the page `data` with the links to its neighbours."""
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page, '
+                               f'up to {self.max_page_size}.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+def invert_ordering(field):
+    """Return the `field` ordering in the opposite direction."""
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def ordering_field(model, name):
+    """Return the field of `model` ordered by `name`, across relations."""
+    *path, name = name.split(LOOKUP_SEP)
+    for part in path:
+        model = model._meta.get_field(part).related_model
+
+    return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+
+def keyset_filter(ordering, position):
+    """
+    Return the condition selecting the rows after `position` in
+    `ordering`, i.e. `(a > x) OR (a = x AND b > y) OR ...`.
+    """
+    clauses = []
+    prefix = {}
+    for field, value in zip(ordering, position):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        clauses.append(Q(**prefix, **{f'{name}__{lookup}': value}))
+        prefix[name] = value
+
+    return reduce(operator.or_, clauses)
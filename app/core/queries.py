@@ -0,0 +1,120 @@
+"""
+Set-based queries shared by the APIs.
+"""
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, router
+from django.db.models import sql
+
+
+def bulk_update_values(model, objs, fields, batch_size=1000):
+    """
+    Update `fields` of `objs` with one
+    `UPDATE ... FROM (VALUES ...)` statement per `batch_size` objects.
+
+    Unlike `QuerySet.bulk_update`, the statement does not grow a
+    `CASE WHEN` branch per object and field, so its cost stays linear.
+    Return the number of updated rows.
+    """
+    objs = list(objs)
+    if not objs:
+        return 0
+
+    meta = model._meta
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    columns = [meta.pk] + [meta.get_field(field) for field in fields]
+
+    row = '({})'.format(', '.join(
+        f'%s::{field.cast_db_type(connection)}' for field in columns
+    ))
+    assignments = ', '.join(
+        f'{qn(field.column)} = v.{qn(field.column)}'
+        for field in columns[1:]
+    )
+    names = ', '.join(qn(field.column) for field in columns)
+    pk = qn(meta.pk.column)
+
+    updated = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start:start + batch_size]
+            cursor.execute(
+                f'UPDATE {qn(meta.db_table)} AS t SET {assignments} '
+                f'FROM (VALUES {", ".join([row] * len(batch))}) '
+                f'AS v({names}) WHERE t.{pk} = v.{pk}',
+                [
+                    field.get_db_prep_save(
+                        getattr(obj, field.attname),
+                        connection
+                        )
+                    for obj in batch
+                    for field in columns
+                ]
+            )
+            updated += cursor.rowcount
+
+    return updated
+
+
+def update_locked(queryset, values, returning=()):
+    """
+    Lock the rows of `queryset` and update `values` on them with one
+    `UPDATE ... FROM (SELECT ... FOR UPDATE)` statement.
+
+    The filters of `queryset` are checked again on the locked rows, so
+    a row changed by a concurrent transaction is only updated if it
+    still matches them. Return the primary key and the `returning`
+    fields of every updated row as they were before the update.
+    """
+    model = queryset.model
+    meta = model._meta
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    pk = qn(meta.pk.column)
+    names = [pk] + [f'old_{index}' for index in range(len(returning))]
+
+    old = queryset.select_for_update().order_by('pk').values_list(
+        'pk',
+        *returning
+        )
+    try:
+        old_sql, old_params = old.query.sql_with_params()
+    except EmptyResultSet:
+        return []
+
+    query = sql.UpdateQuery(model)
+    query.add_update_values(values)
+    set_sql, set_params = query.get_compiler(connection=connection).as_sql()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{set_sql} FROM ({old_sql}) AS old({", ".join(names)}) '
+            f'WHERE {qn(meta.db_table)}.{pk} = old.{pk} '
+            f'RETURNING {", ".join(f"old.{name}" for name in names)}',
+            [*set_params, *old_params]
+        )
+        return cursor.fetchall()
+
+
+def insert_from(model, fields, queryset):
+    """
+    Insert a `model` row for every row of the `values_list` `queryset`
+    with one `INSERT ... SELECT` statement, setting the `fields` in the
+    order of the selected columns. Return the number of inserted rows.
+    """
+    meta = model._meta
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(meta.get_field(field).column) for field in fields)
+
+    try:
+        select_sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {qn(meta.db_table)} ({columns}) {select_sql}',
+            params
+        )
+        return cursor.rowcount
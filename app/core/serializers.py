@@ -0,0 +1,32 @@
+"""
+Base serializers for the APIs.
+"""
+from rest_framework import serializers
+
+
+class ValuesListSerializer(serializers.ListSerializer):
+    """List serializer letting the child prepare the rows as a batch."""
+
+    def to_representation(self, data):
+        rows = list(data)
+        self.child.prepare(rows)
+
+        return [self.child.to_representation(row) for row in rows]
+
+
+class ValuesSerializer(serializers.BaseSerializer):
+    """
+    Read-only serializer of the dicts returned by `QuerySet.values()`.
+
+    Subclasses list the `columns` to select and build the representation
+    of each row by hand, skipping the field machinery of the model
+    serializers. Anything computed once for all the rows, such as the
+    related rows or the choice labels, is done in `prepare`.
+    """
+    columns = ()
+
+    class Meta:
+        list_serializer_class = ValuesListSerializer
+
+    def prepare(self, rows):
+        """Fetch and compute what the `rows` need to be represented."""
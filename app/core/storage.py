@@ -0,0 +1,125 @@
+"""
+Content-addressed storage of the uploaded files.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+# Name of a content-addressed file, or of a thumbnail of one.
+CONTENT_NAME = re.compile(
+    r'(?:^|/)(?P<prefix>[0-9a-f]{2})/(?:thumbnails/)?'
+    r'(?P=prefix)[0-9a-f]{62}(?:_\d+)?\.\w+$'
+)
+
+
+def content_digest(content):
+    """Return the BLAKE2b hex digest of the `content` file."""
+    digest = hashlib.blake2b(digest_size=32)
+    if hasattr(content, 'seek') and content.seekable():
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek') and content.seekable():
+        content.seek(0)
+
+    return digest.hexdigest()
+
+
+def is_content_name(name):
+    """
+    Return whether `name` is named after the digest of its content, so
+    its bytes never change.
+    """
+    return CONTENT_NAME.search(name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage naming every file after the digest of its
+    content, so identical files are stored once.
+
+    The name keeps the directory and extension requested by the field,
+    e.g. `uploads/medication/3f/3f9a...e1.jpg`. A name always holds the
+    same bytes, so it can be cached forever. Every saved name takes a
+    reference on its `ImageBlob` and `delete` only releases it; the
+    files no longer referenced are removed by `purge`, from the
+    `collect_images` command.
+    """
+
+    def content_name(self, name, digest):
+        """Return the name of the file of `name` with the `digest`."""
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+
+        return os.path.join(directory, digest[:2], f'{digest}{extension}')
+
+    def save(self, name, content, max_length=None):
+        """
+        Save `content` under the name of its digest, unless the same
+        content is already stored, and take a reference on it.
+        """
+        from core.models import ImageBlob
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.content_name(name, content_digest(content))
+        ImageBlob.objects.acquire(name)
+        if not self.exists(name):
+            self._save(name, content)
+
+        return name
+
+    def _save(self, name, content):
+        """Write `content` to `name` atomically, moving temporary files."""
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(directory, self.directory_permissions_mode)
+
+        if hasattr(content, 'temporary_file_path'):
+            file_move_safe(
+                content.temporary_file_path(),
+                full_path,
+                allow_overwrite=True
+                )
+        else:
+            descriptor, temporary = tempfile.mkstemp(dir=directory)
+            try:
+                with os.fdopen(descriptor, 'wb') as output:
+                    for chunk in content.chunks():
+                        output.write(chunk)
+                os.replace(temporary, full_path)
+            except BaseException:
+                os.remove(temporary)
+                raise
+
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+        return name
+
+    def delete(self, name):
+        """
+        Release a reference on `name` once the current transaction
+        commits, without removing the file.
+        """
+        from core.models import ImageBlob
+
+        if name:
+            ImageBlob.objects.release_on_commit([name])
+
+    def purge(self, name):
+        """Remove the file of `name` from the disk."""
+        super().delete(name)
@@ -0,0 +1,144 @@
+"""
+Tests for the cached token authentication.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import (
+    CachedTokenAuthentication,
+    TokenCache,
+    token_cache,
+)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='12345678',
+        )
+        self.token = Token.objects.create(user=self.user)
+        # The token key is its primary key, cleared once it is deleted.
+        self.key = self.token.key
+        self.authentication = CachedTokenAuthentication()
+
+    def test_token_lookup_cached(self):
+        """Test the token is only looked up in the database once."""
+        user, token = self.authentication.authenticate_credentials(
+            self.key
+        )
+
+        with self.assertNumQueries(0):
+            cached_user, cached_token = \
+                self.authentication.authenticate_credentials(self.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(cached_user, self.user)
+        self.assertEqual(cached_token.key, self.key)
+
+    def test_deleted_token_invalidated(self):
+        """Test a deleted token stops authenticating."""
+        self.authentication.authenticate_credentials(self.key)
+
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.key)
+
+    def test_deactivated_user_invalidated(self):
+        """Test a deactivated user stops authenticating."""
+        self.authentication.authenticate_credentials(self.key)
+
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.key)
+
+    @patch('core.authentication.time.monotonic')
+    def test_cached_token_expires(self, patched_monotonic):
+        """Test the cached token is looked up again after the TTL."""
+        patched_monotonic.return_value = 0
+        self.authentication.authenticate_credentials(self.key)
+
+        patched_monotonic.return_value = token_cache.ttl + 1
+        with self.assertNumQueries(1):
+            self.authentication.authenticate_credentials(self.key)
+
+    def test_shared_cache(self):
+        """Test workers share the cached token through the cache."""
+        with self.settings(TOKEN_CACHE_ALIAS='default'):
+            self.authentication.authenticate_credentials(self.key)
+            token_cache.clear()
+
+            with self.assertNumQueries(0):
+                user, token = self.authentication.authenticate_credentials(
+                    self.key
+                )
+
+            self.assertEqual(user, self.user)
+
+            self.token.delete()
+            token_cache.clear()
+
+            with self.assertRaises(AuthenticationFailed):
+                self.authentication.authenticate_credentials(self.key)
+
+    def test_shared_cache_invalidates_other_workers(self):
+        """Test a removal in another worker stops the cached tokens here."""
+        other_worker = patch(
+            'core.authentication.token_cache',
+            TokenCache(token_cache.max_size, token_cache.ttl)
+        )
+
+        with self.settings(TOKEN_CACHE_ALIAS='default'):
+            self.authentication.authenticate_credentials(self.key)
+
+            with other_worker:
+                self.user.is_active = False
+                self.user.save()
+
+            with self.assertRaises(AuthenticationFailed):
+                self.authentication.authenticate_credentials(self.key)
+
+            self.user.is_active = True
+            self.user.save()
+            self.authentication.authenticate_credentials(self.key)
+
+            with other_worker:
+                self.token.delete()
+
+            with self.assertRaises(AuthenticationFailed):
+                self.authentication.authenticate_credentials(self.key)
+
+    def test_shared_cache_ignores_racing_lookup(self):
+        """Test a lookup racing with a removal is not cached as valid."""
+        lookup = TokenAuthentication.authenticate_credentials
+
+        def lookup_then_delete(authentication, key):
+            credentials = lookup(authentication, key)
+            self.token.delete()
+            return credentials
+
+        with self.settings(TOKEN_CACHE_ALIAS='default'):
+            with patch.object(
+                    TokenAuthentication,
+                    'authenticate_credentials',
+                    autospec=True,
+                    side_effect=lookup_then_delete):
+                self.authentication.authenticate_credentials(self.key)
+
+            with self.assertRaises(AuthenticationFailed):
+                self.authentication.authenticate_credentials(self.key)
+
+            token_cache.clear()
+            with self.assertRaises(AuthenticationFailed):
+                self.authentication.authenticate_credentials(self.key)
@@ -0,0 +1,84 @@
+"""
+Tests for the logging handlers.
+"""
+import logging
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.log_handlers import QueuedFileHandler
+
+
+class QueuedFileHandlerTests(SimpleTestCase):
+    """Test the queued file handler."""
+
+    def setUp(self):
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.log_dir.name, 'test.log')
+        self.logger = logging.getLogger('test_queued_file_handler')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        logging.disable(logging.NOTSET)
+
+    def tearDown(self):
+        for handler in self.logger.handlers[:]:
+            self.logger.removeHandler(handler)
+            handler.close()
+        self.log_dir.cleanup()
+
+    def read_log(self):
+        """Return the lines written to the log file."""
+        with open(self.filename) as log_file:
+            return log_file.read().splitlines()
+
+    def test_records_written_in_background(self):
+        """Test records are formatted and written to the file."""
+        handler = QueuedFileHandler(self.filename)
+        handler.setFormatter(
+            logging.Formatter('{levelname} {message}', style='{')
+        )
+        self.logger.addHandler(handler)
+
+        self.logger.info('first')
+        self.logger.info('second')
+        handler.close()
+
+        self.assertEqual(self.read_log(), ['INFO first', 'INFO second'])
+
+    def test_rotation_by_size(self):
+        """Test the file is rotated when it reaches the maximum size."""
+        handler = QueuedFileHandler(
+            self.filename,
+            max_bytes=10,
+            backup_count=2,
+        )
+        self.logger.addHandler(handler)
+
+        for i in range(3):
+            self.logger.info(f'record {i}')
+        handler.close()
+
+        self.assertEqual(self.read_log(), ['record 2'])
+        self.assertTrue(os.path.exists(f'{self.filename}.1'))
+
+    def test_full_queue_drops_records(self):
+        """Test records are dropped and reported when the queue is full."""
+        handler = QueuedFileHandler(self.filename, queue_size=2)
+        self.logger.addHandler(handler)
+        handler._pid = os.getpid()
+
+        for i in range(5):
+            self.logger.info(f'record {i}')
+
+        self.assertEqual(handler.dropped, 3)
+
+        handler._pid = None
+        self.logger.info('record 5')
+        handler.close()
+
+        self.assertEqual(handler.dropped, 3)
+        self.assertEqual(
+            self.read_log(),
+            ['3 log records dropped, 3 in total.', 'record 5']
+        )
@@ -0,0 +1,103 @@
+"""
+Tests for the content-addressed storage.
+"""
+import os
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from core.models import ImageBlob
+from core.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Test storing files by the digest of their content."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_save_names_files_by_content(self):
+        """Test the name depends on the content and the extension only."""
+        first = self.storage.save('uploads/a.JPG', ContentFile(b'data'))
+        second = self.storage.save('uploads/b.jpg', ContentFile(b'data'))
+        other = self.storage.save('uploads/c.jpg', ContentFile(b'other'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertRegex(first, r'^uploads/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        with self.storage.open(first) as stored:
+            self.assertEqual(stored.read(), b'data')
+        self.assertEqual(ImageBlob.objects.get(name=first).references, 2)
+
+    def test_delete_releases_reference(self):
+        """Test deleting a name keeps the file until it is purged."""
+        name = self.storage.save('uploads/a.png', ContentFile(b'data'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+
+        self.assertTrue(os.path.exists(self.storage.path(name)))
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 0)
+
+        self.storage.purge(name)
+
+        self.assertFalse(self.storage.exists(name))
+
+    def test_delete_batched_on_commit(self):
+        """Test the references are released in one batch on commit."""
+        names = [
+            self.storage.save('uploads/a.png', ContentFile(data))
+            for data in [b'first', b'first', b'second']
+        ]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            for name in names:
+                self.storage.delete(name)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(ImageBlob.objects.get(name=names[0]).references, 2)
+        with self.assertNumQueries(2):
+            callbacks[0]()
+        self.assertFalse(ImageBlob.objects.filter(references__gt=0).exists())
+
+    def test_delete_rolled_back(self):
+        """Test nothing is released if the deletion rolls back."""
+        name = self.storage.save('uploads/a.png', ContentFile(b'data'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.storage.delete(name)
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 1)
+
+    def test_delete_batched_by_savepoint(self):
+        """Test a rolled back savepoint only drops its own releases."""
+        first, second, third = [
+            self.storage.save('uploads/a.png', ContentFile(data))
+            for data in [b'first', b'second', b'third']
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.storage.delete(first)
+            try:
+                with transaction.atomic():
+                    self.storage.delete(second)
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            with transaction.atomic():
+                self.storage.delete(third)
+            self.storage.delete(second)
+
+        self.assertEqual(len(callbacks), 2)
+        self.assertFalse(ImageBlob.objects.filter(references__gt=0).exists())
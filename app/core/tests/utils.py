@@ -0,0 +1,27 @@
+"""
+Helpers shared by the API tests.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountTestMixin:
+    """Assertions about the number of queries run by a request."""
+
+    def assertConstantQueries(self, setup, request, sizes=(1, 10)):
+        """
+        Assert `request(setup(size))` runs the same number of queries for
+        every `size` in `sizes`, i.e. it has no N+1 queries.
+        """
+        counts = []
+        for size in sizes:
+            context = setup(size)
+            with CaptureQueriesContext(connection) as queries:
+                request(context)
+            counts.append(len(queries))
+
+        self.assertEqual(
+            len(set(counts)),
+            1,
+            f'Query counts {counts} changed with sizes {list(sizes)}.'
+        )
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DroneConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'drone'
+
+    def ready(self):
+        from drone import signals  # noqa: F401
@@ -0,0 +1,237 @@
+"""
+Asynchronous views of the busiest drone read endpoints.
+
+Served by an ASGI server, they wait for the clients and the database
+without holding a worker, and answer the cached responses and the 304s
+without leaving the event loop. They return the same data, and share
+the same cached responses, as the `DroneViewSet` actions they replace.
+
+Without the drone cache, the drone is answered with the conditional
+GET of `ConditionalGetMixin`, as the synchronous view does.
+
+Django 4.0 has no asynchronous queryset API, so the queries run through
+`sync_to_async`, in the thread of the request, as the later API does.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from core.authentication import CachedTokenAuthentication
+from core.mixins import ConditionalGetMixin
+from core.models import Drone
+from drone import cache, serializers
+from drone.views import (
+    DroneViewSet,
+    available_page,
+    loaded_medications,
+    prefetch_medications,
+)
+
+
+# The conditional GET of the synchronous views, which uses no view state.
+conditional = ConditionalGetMixin()
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    """Return the JSON response of `data`."""
+    return HttpResponse(
+        JSONRenderer().render(data),
+        status=status_code,
+        content_type='application/json'
+    )
+
+
+def error_response(exc):
+    """Return the response of the API exception `exc`, as DRF does."""
+    if isinstance(exc, Http404):
+        exc = exceptions.NotFound()
+
+    data = exc.detail
+    if not isinstance(data, (list, dict)):
+        data = {'detail': data}
+    response = render(data, exc.status_code)
+
+    if isinstance(exc, (exceptions.NotAuthenticated,
+                        exceptions.AuthenticationFailed)):
+        response.status_code = status.HTTP_401_UNAUTHORIZED
+        response['WWW-Authenticate'] = CachedTokenAuthentication.keyword
+
+    return response
+
+
+def api_view(fallback=None):
+    """
+    Decorate an asynchronous read view with the token authentication
+    and the API errors. The requests of the other methods are handed
+    over to the synchronous `fallback` view, if any.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                if fallback is None:
+                    return error_response(
+                        exceptions.MethodNotAllowed(request.method)
+                    )
+                return await sync_to_async(fallback)(
+                    request,
+                    *args,
+                    **kwargs
+                    )
+
+            try:
+                user = await sync_to_async(
+                    CachedTokenAuthentication().authenticate
+                    )(request)
+                if user is None:
+                    raise exceptions.NotAuthenticated()
+                request.user = user[0]
+
+                return await view(request, *args, **kwargs)
+            except (exceptions.APIException, Http404) as exc:
+                return error_response(exc)
+
+        wrapper.csrf_exempt = True
+        return wrapper
+
+    return decorator
+
+
+async def cached_response(request, serial_number, action, render_data):
+    """
+    Return the response of the drone `action` from the cache of the
+    drone current version, or a 304 if the client already has it. The
+    data is rendered by the `render_data` function, in a thread, on a
+    miss.
+    """
+    drone_cache = cache.get_cache()
+    if drone_cache is None:
+        return render(await sync_to_async(render_data)())
+
+    version = await cache.aget_version(serial_number)
+    key = cache.response_key(
+        serial_number,
+        version,
+        action,
+        request.user.pk,
+        request.get_host()
+        )
+    etag = quote_etag(f'{version}-{action}')
+
+    data = await drone_cache.aget(key)
+    if data is None:
+        data = await sync_to_async(render_data)()
+        await drone_cache.aset(key, data, settings.DRONE_CACHE_TTL)
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = render(data)
+
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def get_drone_values(request, serial_number, *fields):
+    """Return the `fields` of the drone of the user."""
+    return get_object_or_404(
+        Drone.objects.filter(user=request.user).values(*fields),
+        serial_number=serial_number
+        )
+
+
+@api_view(fallback=DroneViewSet.as_view(
+    {'get': 'retrieve', 'delete': 'destroy'},
+    basename='drone',
+    detail=True
+))
+async def retrieve(request, serial_number):
+    """Retrieve the drone, from the cache if it did not change."""
+    def render_drone():
+        drone = get_object_or_404(
+            Drone.objects.filter(user=request.user).prefetch_related(
+                prefetch_medications(
+                    'code',
+                    'name',
+                    'weight',
+                    'image',
+                    'image_status'
+                    )
+                ),
+            serial_number=serial_number
+            )
+        return serializers.DroneDetailSerializer(
+            drone,
+            context={'request': request}
+            ).data
+
+    if cache.get_cache() is None:
+        return await sync_to_async(conditional.conditional_response)(
+            request,
+            Drone.objects.filter(
+                user=request.user,
+                serial_number=serial_number
+                ),
+            DroneViewSet.detail_last_modified_fields,
+            lambda: render(render_drone()),
+            detail=True
+            )
+
+    return await cached_response(
+        request,
+        serial_number,
+        'retrieve',
+        render_drone
+        )
+
+
+@api_view()
+async def check_available(request):
+    """List the user drones available to load medications."""
+    def render_page():
+        return available_page(
+            Request(request),
+            Drone.objects.filter(user=request.user).values(
+                *serializers.DroneValuesSerializer.columns
+                ),
+            api_settings.DEFAULT_PAGINATION_CLASS(),
+            DroneViewSet
+            )
+
+    return render(await sync_to_async(render_page)())
+
+
+@api_view()
+async def check_medication(request, serial_number):
+    """Return the medications loaded into the selected drone."""
+    return await cached_response(
+        request,
+        serial_number,
+        'check_medication',
+        lambda: loaded_medications(
+            get_drone_values(request, serial_number, 'pk')['pk'],
+            {'request': request}
+            )
+        )
+
+
+@api_view()
+async def check_battery(request, serial_number):
+    """Check the battery of the drone."""
+    return await cached_response(
+        request,
+        serial_number,
+        'check_battery',
+        lambda: get_drone_values(request, serial_number, 'battery')
+        )
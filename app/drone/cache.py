@@ -0,0 +1,83 @@
+"""
+Caching of the drone read responses.
+
+Every drone has a version token in the cache, replaced whenever the drone
+or its medications change. Cached responses are keyed on the token, so a
+change makes the old responses unreachable instead of deleting them.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def get_cache():
+    """Return the cache of the drone responses, if enabled."""
+    if settings.DRONE_CACHE_ALIAS is None:
+        return None
+
+    return caches[settings.DRONE_CACHE_ALIAS]
+
+
+def version_key(serial_number):
+    """Return the cache key of the drone version."""
+    return f'drone-version:{serial_number}'
+
+
+def response_key(serial_number, version, *parts):
+    """Return the cache key of a drone response."""
+    key = ['drone-response', serial_number, version, *parts]
+    return ':'.join(map(str, key))
+
+
+def get_version(serial_number):
+    """Return the current version token of the drone."""
+    cache = get_cache()
+    key = version_key(serial_number)
+    version = cache.get(key)
+
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+
+    return version
+
+
+async def aget_version(serial_number):
+    """Return the current version token of the drone, asynchronously."""
+    cache = get_cache()
+    key = version_key(serial_number)
+    version = await cache.aget(key)
+
+    if version is None:
+        version = uuid.uuid4().hex
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key, version)
+
+    return version
+
+
+def bump_versions(serial_numbers):
+    """Replace the version tokens of the drones."""
+    cache = get_cache()
+    if cache is None or not serial_numbers:
+        return
+
+    cache.set_many(
+        {version_key(sn): uuid.uuid4().hex for sn in serial_numbers},
+        timeout=None
+    )
+
+
+def invalidate_drones(serial_numbers):
+    """
+    Bump the drone versions once the current transaction commits, so a
+    concurrent reader cannot cache the old rows under the new version.
+    """
+    if get_cache() is None:
+        return
+
+    serial_numbers = list(serial_numbers)
+    transaction.on_commit(lambda: bump_versions(serial_numbers))
@@ -0,0 +1,60 @@
+"""
+Django command to benchmark the drone assignment packing.
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import Drone
+from drone.packing import pack
+
+
+class Command(BaseCommand):
+    """Django command to benchmark packing medications into drones."""
+
+    help = 'Benchmark packing a random medication manifest into drones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=10000)
+        parser.add_argument('--drones', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        rng = random.Random(options['seed'])
+        items = [
+            (f'MED_{i}', rng.randint(1, 100))
+            for i in range(options['items'])
+        ]
+        bins = [
+            (
+                f'DRONE{i}',
+                rng.choice(Drone.DRONE_WEIGHTS),
+                rng.randint(25, 100)
+            )
+            for i in range(options['drones'])
+        ]
+
+        timings = []
+        for _ in range(options['repeat']):
+            start = time.perf_counter()
+            assignments, unassigned = pack(items, bins)
+            timings.append(time.perf_counter() - start)
+
+        capacity = sum(
+            capacity for key, capacity, battery in bins
+            if key in assignments
+        )
+        skipped = set(unassigned)
+        loaded = sum(
+            weight for key, weight in items
+            if key not in skipped
+        )
+        self.stdout.write(
+            f'Packed {len(items)} items into {len(assignments)} of '
+            f'{len(bins)} drones ({len(unassigned)} unassigned) in '
+            f'{min(timings) * 1000:.1f} ms (best of {len(timings)}), '
+            f'fill ratio {loaded / capacity:.1%}.'
+        )
@@ -0,0 +1,224 @@
+"""
+Django command to load test the drone read endpoints.
+"""
+import asyncio
+import itertools
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from core.models import Drone
+
+
+ENDPOINTS = {
+    'retrieve': '/api/drone/{}/',
+    'check_available': '/api/drone/check_available/',
+    'check_medication': '/api/drone/{}/check_medication/',
+    'check_battery': '/api/drone/{}/check_battery/',
+}
+
+
+class Stats:
+    """Latencies and errors of the requests of a run."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.statuses = {}
+
+    def add(self, status, latency):
+        """Record a response with `status` after `latency` seconds."""
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def percentile(self, fraction):
+        """Return the latency at `fraction` of the sorted latencies."""
+        if not self.latencies:
+            return 0.0
+
+        index = min(
+            len(self.latencies) - 1,
+            int(len(self.latencies) * fraction)
+            )
+        return self.latencies[index]
+
+
+async def read_response(reader):
+    """Read an HTTP/1.1 response, returning its status and keep-alive."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed by the server.')
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif status not in (204, 304):
+        await reader.read()
+        return status, False
+
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def connection(host, port, requests, deadline, stats):
+    """Send the `requests` over a keep-alive connection until `deadline`."""
+    reader = writer = None
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+
+            start = time.monotonic()
+            writer.write(next(requests))
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+            stats.add(status, time.monotonic() - start)
+        except (OSError, ConnectionError, ValueError, IndexError,
+                asyncio.IncompleteReadError):
+            stats.errors += 1
+            keep_alive = False
+            await asyncio.sleep(0.1)
+
+        if not keep_alive and writer is not None:
+            writer.close()
+            writer = None
+
+    if writer is not None:
+        writer.close()
+
+
+class Command(BaseCommand):
+    """Django command to load test the drone read endpoints."""
+
+    help = 'Send the drone read requests of a user over many concurrent ' \
+           'keep-alive connections and report the throughput and the ' \
+           'latencies. Run it once against each APP_SERVER to compare ' \
+           'the WSGI and ASGI deployments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='User whose drones are read.')
+        parser.add_argument(
+            '--url',
+            default='http://localhost:8000',
+            help='Base URL of the API, e.g. the proxy.',
+        )
+        parser.add_argument(
+            '--connections',
+            type=int,
+            default=1000,
+            help='Number of concurrent connections.',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Seconds to send requests for.',
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            choices=sorted(ENDPOINTS),
+            help='Endpoint to read, repeat for several; all by default.',
+        )
+        parser.add_argument(
+            '--drones',
+            type=int,
+            default=100,
+            help='Number of drones of the user to read.',
+        )
+
+    def build_requests(self, options):
+        """Return the raw HTTP requests to send, in a loop."""
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["email"]} not found.')
+        token, _ = Token.objects.get_or_create(user=user)
+
+        serial_numbers = list(
+            Drone.objects.filter(user=user).order_by(
+                'serial_number'
+                ).values_list('serial_number', flat=True)[:options['drones']]
+            )
+        if not serial_numbers:
+            raise CommandError(f'User {options["email"]} has no drones.')
+
+        host = urlsplit(options['url']).netloc
+        requests = []
+        for endpoint in options['endpoint'] or sorted(ENDPOINTS):
+            for serial_number in serial_numbers:
+                path = ENDPOINTS[endpoint].format(serial_number)
+                requests.append((
+                    f'GET {path} HTTP/1.1\r\n'
+                    f'Host: {host}\r\n'
+                    f'Authorization: Token {token.key}\r\n'
+                    'Accept: application/json\r\n'
+                    '\r\n'
+                    ).encode('latin-1'))
+
+        return requests
+
+    async def run(self, requests, options):
+        """Run the connections, returning their stats and duration."""
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError('Only http URLs are supported.')
+        port = url.port or 80
+
+        stats = Stats()
+        start = time.monotonic()
+        deadline = start + options['duration']
+        await asyncio.gather(*(
+            connection(
+                url.hostname,
+                port,
+                itertools.islice(
+                    itertools.cycle(requests),
+                    i % len(requests),
+                    None
+                    ),
+                deadline,
+                stats
+                )
+            for i in range(options['connections'])
+        ))
+
+        return stats, time.monotonic() - start
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        requests = self.build_requests(options)
+        stats, elapsed = asyncio.run(self.run(requests, options))
+
+        stats.latencies.sort()
+        self.stdout.write(
+            f'{len(stats.latencies)} requests in {elapsed:.1f} s over '
+            f'{options["connections"]} connections: '
+            f'{len(stats.latencies) / elapsed:.0f} req/s, '
+            f'{stats.errors} errors.'
+        )
+        self.stdout.write('Latency: ' + ', '.join(
+            f'p{int(fraction * 100)} '
+            f'{stats.percentile(fraction) * 1000:.1f} ms'
+            for fraction in (0.5, 0.9, 0.99)
+        ))
+        self.stdout.write('Statuses: ' + ', '.join(
+            f'{status} x{count}'
+            for status, count in sorted(stats.statuses.items())
+        ))
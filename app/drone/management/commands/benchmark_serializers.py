@@ -0,0 +1,107 @@
+"""
+Django command to benchmark the drone list serializers.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Drone, DroneLoad, Medication
+from drone.serializers import DroneSerializer, DroneValuesSerializer
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the drone list serializers."""
+
+    help = 'Compare rendering the drone list through the model serializer ' \
+           'against the values serializer, rolling back the sample rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--medications', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with transaction.atomic():
+            user = self.create_rows(options['rows'], options['medications'])
+            drones = Drone.objects.filter(user=user).order_by(
+                'serial_number'
+            )
+            paths = {
+                'model': lambda: DroneSerializer(
+                    drones.prefetch_related(Prefetch(
+                        'medications',
+                        Medication.objects.only('code').order_by('code')
+                    )),
+                    many=True
+                ).data,
+                'values': lambda: DroneValuesSerializer(
+                    drones.values(*DroneValuesSerializer.columns),
+                    many=True
+                ).data,
+            }
+
+            rendered = {}
+            timings = {}
+            for name, serialize in paths.items():
+                timings[name] = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    rendered[name] = JSONRenderer().render(serialize())
+                    timings[name].append(time.perf_counter() - start)
+            transaction.set_rollback(True)
+
+        if rendered['model'] != rendered['values']:
+            raise CommandError('The serializers rendered different bytes.')
+
+        for name, timing in timings.items():
+            self.stdout.write(
+                f'{name:>6}: {options["rows"]} drones in '
+                f'{min(timing) * 1000:.1f} ms '
+                f'(best of {options["repeat"]}).'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Identical output, '
+            f'{min(timings["model"]) / min(timings["values"]):.1f}x faster.'
+        ))
+
+    def create_rows(self, rows, medications):
+        """Create a user owning `rows` drones loaded with `medications`."""
+        user = get_user_model().objects.create_user(
+            email='benchmark@example.com',
+            password='benchmark'
+        )
+        medication_rows = Medication.objects.bulk_create([
+            Medication(
+                user=user,
+                code=f'BENCHMARK_{i}',
+                name='Benchmark',
+                weight=10
+            )
+            for i in range(medications * 10)
+        ])
+        drones = Drone.objects.bulk_create([
+            Drone(
+                user=user,
+                serial_number=f'Benchmark{i:08}',
+                drone_model=i % len(Drone.DRONE_WEIGHTS),
+                weight_limit=Drone.DRONE_WEIGHTS[i % len(Drone.DRONE_WEIGHTS)],
+                battery=i % 101,
+                state=i % len(Drone.DRONE_STATUS),
+            )
+            for i in range(rows)
+        ])
+        DroneLoad.objects.bulk_create([
+            DroneLoad(
+                drone=drone,
+                medication=medication_rows[(i + j) % len(medication_rows)]
+            )
+            for i, drone in enumerate(drones)
+            for j in range(medications)
+        ])
+
+        return user
@@ -0,0 +1,93 @@
+"""
+Django command to reconcile the drone loads with their medications.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import (
+    Case,
+    F,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.models import Drone, DroneLoad
+from drone.cache import invalidate_drones
+
+
+def actual_loads():
+    """
+    Return the expressions computing the drone loaded weight, loaded
+    count and remaining weight limit from the loaded medications.
+    """
+    loads = DroneLoad.objects.filter(
+        drone=OuterRef('pk')
+    ).order_by().values('drone')
+    loaded_weight = Coalesce(
+        Subquery(loads.annotate(
+            total=Sum(F('medication__weight') * F('quantity'))
+        ).values('total')),
+        0
+    )
+    loaded_count = Coalesce(
+        Subquery(loads.annotate(total=Sum('quantity')).values('total')),
+        0
+    )
+    capacity = Case(*[
+        When(drone_model=model, then=Value(weight))
+        for model, weight in enumerate(Drone.DRONE_WEIGHTS)
+    ])
+
+    return {
+        'loaded_weight': loaded_weight,
+        'loaded_count': loaded_count,
+        'weight_limit': capacity - loaded_weight,
+    }
+
+
+class Command(BaseCommand):
+    """Django command to reconcile the drone loads."""
+
+    help = 'Recompute the drone loaded weight, loaded count and weight ' \
+           'limit from the loaded medications.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the drones out of sync.',
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        loads = actual_loads()
+        drifted = Drone.objects.annotate(
+            **{f'actual_{field}': value for field, value in loads.items()}
+        ).exclude(
+            **{field: F(f'actual_{field}') for field in loads}
+        ).select_for_update()
+        serial_numbers = list(
+            drifted.order_by('serial_number').values_list(
+                'serial_number',
+                flat=True
+            )
+        )
+
+        if serial_numbers and not options['dry_run']:
+            Drone.objects.filter(serial_number__in=serial_numbers).update(
+                updated_at=timezone.now(),
+                **loads
+            )
+            invalidate_drones(serial_numbers)
+
+        self.stdout.write(
+            f'{len(serial_numbers)} drones out of sync'
+            f'{"" if options["dry_run"] else " reconciled"}.'
+        )
+        for serial_number in serial_numbers:
+            self.stdout.write(f'  {serial_number}', self.style.WARNING)
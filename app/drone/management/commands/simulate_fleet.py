@@ -0,0 +1,152 @@
+"""
+Django command to simulate the drone missions.
+"""
+import itertools
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Drone, DroneLoad, Medication
+from drone.simulation import Tick
+
+
+# Weight in grams of the medication carried by the created drones.
+LOAD = 50
+
+
+class Command(BaseCommand):
+    """Django command to advance the drones every tick."""
+
+    help = 'Drain the drone batteries and move the drones along their ' \
+           'missions every tick. With the same seed and fleet the ticks ' \
+           'are repeatable, so it doubles as a load generator.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ticks',
+            type=int,
+            default=0,
+            help='Number of ticks to run, 0 to run forever.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds between the start of two ticks.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--start-tick',
+            type=int,
+            default=0,
+            help='Number of the first tick, to resume a replay.',
+        )
+        parser.add_argument(
+            '--email',
+            help='Only simulate the drones of this user.',
+        )
+        parser.add_argument(
+            '--drones',
+            type=int,
+            default=0,
+            help='Create this many random drones for --email first.',
+        )
+        parser.add_argument(
+            '--no-readings',
+            action='store_true',
+            help='Do not record the battery changes.',
+        )
+
+    def create_drones(self, user, count, seed):
+        """
+        Create `count` random drones in flight for `user`, numbered after
+        the last ones created with the same seed. The Delivering drones
+        carry a simulated medication, as the state machine requires.
+        """
+        rng = random.Random(seed)
+        prefix = f'SIM{seed}-'
+        last = Drone.objects.filter(
+            serial_number__startswith=prefix
+            ).order_by('-serial_number').values_list(
+                'serial_number',
+                flat=True
+                ).first()
+        first = int(last[len(prefix):]) + 1 if last else 0
+        medication, _ = Medication.objects.get_or_create(
+            code=f'SIM_{user.pk}',
+            defaults={'user': user, 'name': 'Simulated', 'weight': LOAD},
+        )
+
+        drones = []
+        for i in range(count):
+            model = rng.randrange(len(Drone.DRONE_WEIGHTS))
+            state = rng.choice([
+                Drone.DRONE_STATUS.idl,
+                Drone.DRONE_STATUS.dlg,
+                Drone.DRONE_STATUS.ret,
+            ])
+            loaded = medication.weight \
+                if state == Drone.DRONE_STATUS.dlg else 0
+            drones.append(Drone(
+                user=user,
+                serial_number=f'{prefix}{first + i:08d}',
+                drone_model=model,
+                weight_limit=Drone.DRONE_WEIGHTS[model] - loaded,
+                loaded_weight=loaded,
+                loaded_count=1 if loaded else 0,
+                battery=rng.randint(25, 100),
+                state=state,
+                ))
+
+        with transaction.atomic():
+            Drone.objects.bulk_create(drones, batch_size=1000)
+            DroneLoad.objects.bulk_create(
+                [
+                    DroneLoad(drone=drone, medication=medication)
+                    for drone in drones if drone.loaded_weight
+                ],
+                batch_size=1000
+                )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        drones = Drone.objects.all()
+        if options['email']:
+            try:
+                user = get_user_model().objects.get(email=options['email'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'User {options["email"]} not found.')
+            drones = drones.filter(user=user)
+            if options['drones']:
+                self.create_drones(user, options['drones'], options['seed'])
+        elif options['drones']:
+            raise CommandError('--drones requires --email.')
+
+        if options['ticks']:
+            ticks = range(
+                options['start_tick'],
+                options['start_tick'] + options['ticks']
+            )
+        else:
+            ticks = itertools.count(options['start_tick'])
+
+        for tick in ticks:
+            start = time.perf_counter()
+            counts = Tick(
+                drones,
+                tick,
+                options['seed'],
+                readings=not options['no_readings']
+            ).run()
+            elapsed = time.perf_counter() - start
+
+            self.stdout.write(
+                f'Tick {tick} in {elapsed * 1000:.1f} ms: ' + ', '.join(
+                    f'{count} {name}' for name, count in counts.items()
+                )
+            )
+            if options['interval'] > elapsed:
+                time.sleep(options['interval'] - elapsed)
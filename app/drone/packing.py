@@ -0,0 +1,42 @@
+"""
+Packing of medications into drones.
+"""
+from bisect import bisect_left, insort
+
+
+def pack(items, bins, excluded=frozenset()):
+    """
+    Assign `items` to `bins` with the best-fit-decreasing heuristic.
+
+    `items` are `(key, weight)` pairs and `bins` are
+    `(key, capacity, battery)` triples. Heaviest first, every item goes
+    into the bin with the least remaining capacity that still fits it,
+    preferring the highest battery on ties, so partially loaded drones
+    are filled up before new ones are used. `excluded` holds the
+    `(bin key, item key)` pairs that cannot be combined.
+
+    Return a dict mapping bin keys to their item keys and the list of
+    item keys that do not fit into any bin.
+    """
+    free = sorted(
+        (capacity, -battery, index)
+        for index, (key, capacity, battery) in enumerate(bins)
+    )
+    assignments = {}
+    unassigned = []
+
+    for item, weight in sorted(items, key=lambda i: i[1], reverse=True):
+        position = bisect_left(free, (weight,))
+        while position < len(free) and \
+                (bins[free[position][2]][0], item) in excluded:
+            position += 1
+
+        if position == len(free):
+            unassigned.append(item)
+            continue
+
+        capacity, battery, index = free.pop(position)
+        insort(free, (capacity - weight, battery, index))
+        assignments.setdefault(bins[index][0], []).append(item)
+
+    return assignments, unassigned
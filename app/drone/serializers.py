@@ -2,46 +2,162 @@
 Serializers for drone APIs
 """
 import logging
-
-from core.models import Drone, Medication
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import (
+    Avg,
+    Count,
+    ExpressionWrapper,
+    FloatField,
+    Max,
+    Min,
+)
+from django.db.models.functions import Extract, Floor
+from django.utils import timezone
+
+from core.models import BatteryReading, Drone, DroneLoad, Medication
+from core.queries import bulk_update_values
+from core.serializers import ValuesSerializer
+from drone.cache import invalidate_drones
 
 from rest_framework.exceptions import ParseError
 from rest_framework import serializers
 
 from medication.serializers import MedicationSerializer
+from drone import states
+from drone.packing import pack
 
 
 class ChoicesField(serializers.ChoiceField):
-    """Custom ChoiceField serializer field."""
+    """
+    Custom ChoiceField serializer field.
+
+    Accepts the choice values, their database names and their labels,
+    case insensitive, looked up in maps built once per field.
+    """
 
     def __init__(self, choices, **kwargs):
         """init."""
         self._choices = choices
+        self.choice_labels = dict(choices)
+        self.choice_values = {
+            name.lower(): value
+            for name, value in getattr(choices, '_identifier_map', {}).items()
+        }
+        for value, label in self.choice_labels.items():
+            self.choice_values.update({
+                value: value,
+                str(value): value,
+                str(label).lower(): value,
+            })
+        self.invalid_message = \
+            f'Acceptable values are {self.choice_labels}.'
         super(ChoicesField, self).__init__(choices, **kwargs)
 
     def to_representation(self, obj):
         """Used while retrieving value for the field."""
-        return self._choices[obj]
+        return self.choice_labels[obj]
 
     def to_internal_value(self, data):
         """Used while storing value for the field."""
-        for i in range(len(self._choices)):
-            try:
-                if i == int(data):
-                    return i
-            except ValueError:
-                if str(self._choices[i]) == data:
-                    return i
-
-        raise serializers.ValidationError(
-            f'Acceptable values are {dict(self._choices)}.'
-        )
+        key = data.strip().lower() if isinstance(data, str) else data
+        try:
+            return self.choice_values[key]
+        except (KeyError, TypeError):
+            raise serializers.ValidationError(self.invalid_message)
+
+
+def lock_drone(instance):
+    """
+    Lock the `instance` row until the end of the current transaction
+    and refresh its fields with the locked values.
+    """
+    locked = Drone.objects.select_for_update().get(pk=instance.pk)
+    for field in Drone._meta.concrete_fields:
+        setattr(instance, field.attname, getattr(locked, field.attname))
+
+    return instance
+
+
+def apply_report(instance, readings, state=None, battery=None):
+    """
+    Apply a reported `state` and `battery` to `instance` without saving
+    it, appending the battery change to `readings`. The state is checked
+    against the guards of the state machine, but not against the current
+    state, as it is reported by the drone itself. Return whether the
+    drone medications have to be unloaded, i.e. it enters an unloading
+    state it was not in.
+    """
+    unload = False
+
+    if state is not None:
+        error = states.rejection(instance, state, battery, check_source=False)
+        if error is not None:
+            raise ParseError(detail=error)
+
+        if states.TRANSITIONS[state].unload and instance.state != state:
+            states.unload(instance)
+            unload = True
+
+        instance.state = state
+
+    if battery is not None:
+        if instance.battery != battery:
+            logging.getLogger('battery_log').info(
+                f'[{instance.serial_number}] Battery Change -> '
+                f'from:{instance.battery}% -> to:{battery}%'
+                )
+            readings.append(BatteryReading(drone=instance, battery=battery))
+        instance.battery = battery
+
+    return unload
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """
+    ManyRelatedField validating every primary key, or slug of a
+    SlugRelatedField, in a single query.
+    """
+
+    def to_internal_value(self, data):
+        """Used while storing value for the field."""
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        field = getattr(child, 'slug_field', 'pk')
+        try:
+            found = set(
+                child.get_queryset().filter(**{
+                    f'{field}__in': data
+                    }).values_list(field, flat=True)
+                )
+        except (TypeError, ValueError):
+            child.fail('incorrect_type', data_type=type(data).__name__)
+
+        for value in data:
+            if value not in found:
+                if field == 'pk':
+                    child.fail('does_not_exist', pk_value=value)
+                child.fail('does_not_exist', slug_name=field, value=value)
+
+        return list(data)
 
 
 class DroneSerializer(serializers.ModelSerializer):
     """Serializer for drones."""
     drone_model = ChoicesField(Drone.DRONE_MODEL)
     state = serializers.CharField(source='get_state_display', read_only=True)
+    medications = serializers.SlugRelatedField(
+        slug_field='code',
+        many=True,
+        read_only=True
+        )
 
     class Meta:
         model = Drone
@@ -52,16 +168,66 @@ class DroneSerializer(serializers.ModelSerializer):
             'battery',
             'state',
             'weight_limit',
+            'loaded_weight',
+            'loaded_count',
             'medications'
             ]
         read_only_fields = [
             'battery',
             'state',
             'weight_limit',
+            'loaded_weight',
+            'loaded_count',
             'medications',
             ]
 
 
+class DroneValuesSerializer(ValuesSerializer):
+    """Fast read-only DroneSerializer of `values()` rows."""
+    columns = (
+        'pk',
+        'serial_number',
+        'drone_model',
+        'battery',
+        'state',
+        'weight_limit',
+        'loaded_weight',
+        'loaded_count',
+        )
+
+    def prepare(self, rows):
+        self.drone_models = {
+            value: str(label) for value, label in Drone.DRONE_MODEL
+        }
+        self.states = {
+            value: str(label) for value, label in Drone.DRONE_STATUS
+        }
+        self.medications = defaultdict(list)
+        loads = DroneLoad.objects.filter(
+            drone__in=[row['pk'] for row in rows]
+            ).order_by('medication__code').values_list(
+                'drone_id',
+                'medication__code'
+                )
+        for drone_id, code in loads:
+            self.medications[drone_id].append(code)
+
+    def to_representation(self, row):
+        return {
+            'serial_number': row['serial_number'],
+            'drone_model': self.drone_models.get(
+                row['drone_model'],
+                row['drone_model']
+                ),
+            'battery': row['battery'],
+            'state': self.states.get(row['state'], row['state']),
+            'weight_limit': row['weight_limit'],
+            'loaded_weight': row['loaded_weight'],
+            'loaded_count': row['loaded_count'],
+            'medications': self.medications[row['pk']],
+        }
+
+
 class DroneDetailSerializer(DroneSerializer):
     """Serializer for drone detail view."""
     medications = MedicationSerializer(many=True, read_only=True)
@@ -84,42 +250,43 @@ class DroneManageSerializer(DroneSerializer):
             ]
         read_only_fields = [
             'weight_limit',
+            'loaded_weight',
+            'loaded_count',
             'medications',
             'serial_number',
         ]
 
-    def update(self, instance, validated_data):
-        """Manage drone instance battery and state."""
-
-        state = validated_data.pop('state', None)
-        battery = validated_data.pop('battery', None)
-
-        if len(validated_data) > 0:
+    def validate(self, attrs):
+        """Reject the fields other than the state and the battery."""
+        fields = [
+            field for field in self.initial_data
+            if field not in ('state', 'battery')
+        ]
+        if fields:
             raise ParseError(detail='You cannot modify the following fields:'
-                                    f' {[vl for vl in validated_data]}.')
+                                    f' {fields}.')
 
-        if state is not None:
-            if state == Drone.DRONE_STATUS.ldg:
-                if battery is not None:
-                    if battery < 25:
-                        raise ParseError(detail='You cannot set the state to'
-                                                ' loading if the battery is '
-                                                'below 25%.')
-            elif state == Drone.DRONE_STATUS.dld:
-                instance.weight_limit = None
-                instance.medications.clear()
-
-            instance.state = state
-
-        if battery is not None:
-            if instance.battery != battery:
-                logging.getLogger('battery_log').info(
-                    f'[{instance.serial_number}] Battery Change -> '
-                    f'from:{instance.battery}% -> to:{battery}%'
-                    )
-            instance.battery = battery
+        return attrs
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        """
+        Manage drone instance battery and state through the state
+        machine, with a single conditional update of the drone row.
+        """
+        state = validated_data.get('state')
+        battery = validated_data.get('battery')
+
+        updated = states.transition_drones(
+            Drone.objects.filter(pk=instance.pk),
+            state,
+            battery
+            )
+        instance.refresh_from_db()
+
+        if not updated:
+            raise ParseError(detail=states.rejection(instance, state, battery))
 
-        instance.save()
         return instance
 
 
@@ -152,8 +319,378 @@ class DroneBatterySerializer(serializers.ModelSerializer):
             ]
 
 
+class DroneLoadSerializer(serializers.ModelSerializer):
+    """Serializer for a medication loaded into a drone."""
+    medication = serializers.SlugRelatedField(
+        slug_field='code',
+        read_only=True
+        )
+
+    class Meta:
+        model = DroneLoad
+        fields = [
+            'medication',
+            'quantity',
+            'loaded_at',
+            'delivery_id',
+            ]
+        read_only_fields = fields
+
+
+class DroneTelemetrySerializer(serializers.Serializer):
+    """Serializer for a drone state and battery report."""
+    serial_number = serializers.CharField(max_length=100)
+    battery = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        max_value=100
+        )
+    state = ChoicesField(Drone.DRONE_STATUS, required=False)
+
+
+class DroneTelemetryListSerializer(serializers.Serializer):
+    """Serializer for a batch of drone state and battery reports."""
+    reports = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=10000,
+        )
+
+    @transaction.atomic
+    def ingest(self, user):
+        """
+        Validate and apply every report to the user drones with a single
+        bulk update. Return the number of updated drones and the errors
+        of the rejected reports.
+        """
+        reports = []
+        errors = []
+        report = DroneTelemetrySerializer()
+        for index, data in enumerate(self.validated_data['reports']):
+            try:
+                reports.append((index, report.run_validation(data)))
+            except serializers.ValidationError as exc:
+                errors.append({'index': index, 'errors': exc.detail})
+
+        serial_numbers = {report['serial_number'] for _, report in reports}
+        drones = {
+            drone.serial_number: drone
+            for drone in Drone.objects.select_for_update().filter(
+                user=user,
+                serial_number__in=serial_numbers
+                ).order_by('pk')
+        }
+
+        updated = {}
+        unload = set()
+        readings = []
+        for index, report in reports:
+            drone = drones.get(report['serial_number'])
+            if drone is None:
+                errors.append({
+                    'index': index,
+                    'errors': {'serial_number': ['Not found.']},
+                })
+                continue
+
+            try:
+                if apply_report(
+                        drone,
+                        readings,
+                        report.get('state'),
+                        report.get('battery')):
+                    unload.add(drone.pk)
+            except ParseError as exc:
+                errors.append({
+                    'index': index,
+                    'errors': {'non_field_errors': [exc.detail]},
+                })
+                continue
+
+            updated[drone.serial_number] = drone
+
+        now = timezone.now()
+        for drone in updated.values():
+            drone.updated_at = now
+        bulk_update_values(
+            Drone,
+            updated.values(),
+            [
+                'battery',
+                'state',
+                'weight_limit',
+                'loaded_weight',
+                'loaded_count',
+                'updated_at',
+            ]
+            )
+        DroneLoad.objects.filter(drone_id__in=unload).delete()
+        BatteryReading.objects.bulk_create(readings, batch_size=1000)
+        invalidate_drones(updated)
+
+        return {
+            'updated': len(updated),
+            'errors': sorted(errors, key=lambda error: error['index']),
+        }
+
+
+class DroneTransitionSerializer(serializers.Serializer):
+    """Serializer for moving many drones into a state at once."""
+    serial_numbers = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        allow_empty=False,
+        max_length=10000,
+        write_only=True,
+        )
+    state = ChoicesField(Drone.DRONE_STATUS, write_only=True)
+    battery = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        max_value=100,
+        write_only=True,
+        )
+
+    def transition(self, user):
+        """
+        Move the user drones into the state with one conditional update.
+        Return the serial numbers of the moved drones and of the drones
+        the state machine rejected or that do not exist.
+        """
+        serial_numbers = self.validated_data['serial_numbers']
+        moved = states.transition_drones(
+            Drone.objects.filter(
+                user=user,
+                serial_number__in=serial_numbers
+                ),
+            self.validated_data['state'],
+            self.validated_data.get('battery')
+            )
+
+        moved = set(moved)
+        return {
+            'transitioned': sorted(moved),
+            'rejected': sorted(set(serial_numbers) - moved),
+        }
+
+
+class BatteryHistorySerializer(serializers.Serializer):
+    """Serializer for the battery history filters."""
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    buckets = serializers.IntegerField(
+        default=100,
+        min_value=1,
+        max_value=1000
+        )
+
+    def validate(self, attrs):
+        """Default to the last day and validate the range."""
+        attrs.setdefault('end', timezone.now())
+        attrs.setdefault('start', attrs['end'] - timedelta(days=1))
+
+        if attrs['start'] >= attrs['end']:
+            raise serializers.ValidationError(
+                'The start must be before the end.'
+            )
+
+        return attrs
+
+    def history(self, drone):
+        """
+        Return the `drone` battery readings in the range downsampled to
+        the number of buckets, aggregated by the database.
+        """
+        start = self.validated_data['start']
+        end = self.validated_data['end']
+        buckets = self.validated_data['buckets']
+        width = (end - start).total_seconds() / buckets
+
+        history = BatteryReading.objects.filter(
+            drone=drone,
+            timestamp__gte=start,
+            timestamp__lt=end,
+        ).annotate(
+            bucket=Floor(ExpressionWrapper(
+                (Extract('timestamp', 'epoch') - start.timestamp()) / width,
+                output_field=FloatField(),
+            )),
+        ).values('bucket').annotate(
+            readings=Count('id'),
+            battery_min=Min('battery'),
+            battery_max=Max('battery'),
+            battery_avg=Avg('battery'),
+        ).order_by('bucket')
+
+        return [
+            {
+                'start': start + timedelta(seconds=row.pop('bucket') * width),
+                **row,
+            }
+            for row in history
+        ]
+
+
+class BatteryBucketSerializer(serializers.Serializer):
+    """Serializer for a downsampled battery history bucket."""
+    start = serializers.DateTimeField()
+    readings = serializers.IntegerField()
+    battery_min = serializers.IntegerField()
+    battery_max = serializers.IntegerField()
+    battery_avg = serializers.FloatField()
+
+
+class DroneAvailableSerializer(serializers.Serializer):
+    """Serializer for the available drones filters."""
+    min_battery = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        max_value=100
+        )
+    min_weight = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        max_value=500
+        )
+
+
+class DroneAssignSerializer(serializers.Serializer):
+    """Serializer for assigning medications to the available drones."""
+    medications = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        allow_empty=False,
+        write_only=True,
+        )
+    reserve = serializers.BooleanField(default=False, write_only=True)
+
+    def validate_medications(self, value):
+        """Validate the medications are not repeated."""
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError(
+                'You cannot assign the same medication twice.'
+            )
+
+        return value
+
+    @transaction.atomic
+    def assign(self, user):
+        """
+        Assign the medications to the user drones in Loading state,
+        loading them into the drones if `reserve` is set.
+        """
+        codes = self.validated_data['medications']
+        reserve = self.validated_data['reserve']
+
+        medications = {
+            code: (pk, weight)
+            for code, pk, weight in Medication.objects.filter(
+                user=user,
+                code__in=codes
+                ).values_list('code', 'pk', 'weight')
+        }
+        missing = [code for code in codes if code not in medications]
+        if missing:
+            raise ParseError(detail='The following medications do not '
+                                    f'exist: {missing}.')
+
+        drones = Drone.objects.filter(
+            user=user,
+            state=Drone.DRONE_STATUS.ldg
+            ).order_by('serial_number')
+        if reserve:
+            drones = drones.select_for_update()
+        drones = list(
+            drones.values_list(
+                'serial_number',
+                'weight_limit',
+                'battery',
+                'pk',
+                'loaded_weight',
+                'loaded_count'
+                )
+            )
+
+        loaded = set(
+            DroneLoad.objects.filter(
+                drone__user=user,
+                drone__state=Drone.DRONE_STATUS.ldg,
+                medication__in=[pk for pk, weight in medications.values()],
+                ).values_list('drone__serial_number', 'medication__code')
+            )
+
+        assignments, unassigned = pack(
+            [(code, medications[code][1]) for code in codes],
+            [drone[:3] for drone in drones],
+            loaded
+            )
+
+        loads = {}
+        for sn, limit, battery, pk, loaded_weight, loaded_count in drones:
+            if sn in assignments:
+                weight = sum(medications[med][1] for med in assignments[sn])
+                loads[sn] = Drone(
+                    pk=pk,
+                    serial_number=sn,
+                    weight_limit=limit - weight,
+                    loaded_weight=loaded_weight + weight,
+                    loaded_count=loaded_count + len(assignments[sn]),
+                    )
+
+        if reserve:
+            if unassigned:
+                raise ParseError(detail='The available drones cannot load '
+                                        f'the medications {unassigned}.')
+            self.load_assignments(assignments, loads, medications)
+
+        return {
+            'assignments': [
+                {
+                    'serial_number': sn,
+                    'medications': meds,
+                    'weight_limit': loads[sn].weight_limit,
+                }
+                for sn, meds in sorted(assignments.items())
+            ],
+            'unassigned': unassigned,
+            'reserved': reserve,
+        }
+
+    def load_assignments(self, assignments, drones, medications):
+        """
+        Load the `assignments` into the locked drones, saving the new
+        capacity and loads of the unsaved `drones` by serial number.
+        """
+        now = timezone.now()
+        loads = []
+        for sn, meds in assignments.items():
+            delivery_id = uuid.uuid4()
+            loads.extend(
+                DroneLoad(
+                    drone_id=drones[sn].pk,
+                    medication_id=medications[med][0],
+                    loaded_at=now,
+                    delivery_id=delivery_id,
+                    )
+                for med in meds
+            )
+        DroneLoad.objects.bulk_create(loads)
+        for drone in drones.values():
+            drone.updated_at = now
+        Drone.objects.bulk_update(
+            drones.values(),
+            ['weight_limit', 'loaded_weight', 'loaded_count', 'updated_at']
+        )
+        invalidate_drones(assignments)
+
+
 class DroneAddSerializer(serializers.ModelSerializer):
     """Serializer for add medication to drone."""
+    medications = BulkManyRelatedField(
+        child_relation=serializers.SlugRelatedField(
+            slug_field='code',
+            queryset=Medication.objects.all()
+            )
+        )
+
     class Meta:
         model = Drone
         lockup_field = 'serial_number'
@@ -167,6 +704,7 @@ class DroneAddSerializer(serializers.ModelSerializer):
             'serial_number',
             ]
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Add medication to drone."""
         medications = validated_data.pop('medications', None)
@@ -175,54 +713,81 @@ class DroneAddSerializer(serializers.ModelSerializer):
             raise ParseError(detail='You cannot modify the following fields:'
                                     f' {[vl for vl in validated_data]}.')
 
-        if instance.state == Drone.DRONE_STATUS.ldg:
-            if len(set(medications)) != len(medications):
-                raise ParseError(detail='You cannot load the same '
-                                        'medication twice into a drone.')
-
-            if medications is not None and len(medications) > 0:
-                insert_meds = []
-                auth_user = self.context['request'].user
-                user_meds = Medication.objects.filter(user=auth_user)
-                drone_remianing_space = instance.weight_limit
-
-                for med in medications:
-                    if instance.medications.filter(code=med).exists():
-                        raise ParseError(detail=f'The medication {med} '
-                                                'is already loaded into this'
-                                                ' drone. You cannot load the'
-                                                ' same medication twice into'
-                                                ' a drone.')
-
-                for med in medications:
-                    try:
-                        new_med = Medication.objects.get(
-                                user=auth_user,
-                                code=med
-                                )
-                        drone_remianing_space -= new_med.weight
-                        if drone_remianing_space < 0:
-                            raise ParseError(detail='The drone cannot load '
-                                                    'the total weight of the'
-                                                    ' selected medications.')
-
-                        insert_meds.append(new_med)
-                    except Medication.DoesNotExist:
-                        if len(user_meds):
-                            detail = 'The available medications are '\
-                                    f'{[m.code for m in user_meds]}.'
-                            raise ParseError(detail=detail)
-                        else:
-                            raise ParseError(detail='You have to '
-                                                    'create a medication '
-                                                    'first.')
-
-                for med_get in insert_meds:
-                    instance.medications.add(med_get)
-                    instance.weight_limit -= med_get.weight
-        else:
+        lock_drone(instance)
+
+        if instance.state != Drone.DRONE_STATUS.ldg:
             raise ParseError(detail='The drone can only be loaded on '
                                     'Loading state.')
 
+        if medications:
+            self.load_medications(instance, medications)
+
         instance.save()
         return instance
+
+    def load_medications(self, instance, medications):
+        """
+        Load `medications` codes into `instance` using a constant number
+        of queries regardless of how many codes are requested.
+        """
+        if len(set(medications)) != len(medications):
+            raise ParseError(detail='You cannot load the same '
+                                    'medication twice into a drone.')
+
+        loaded = set(
+            instance.medications.filter(
+                code__in=medications
+                ).values_list('code', flat=True)
+            )
+        for med in medications:
+            if med in loaded:
+                raise ParseError(detail=f'The medication {med} '
+                                        'is already loaded into this'
+                                        ' drone. You cannot load the'
+                                        ' same medication twice into'
+                                        ' a drone.')
+
+        auth_user = self.context['request'].user
+        user_meds = Medication.objects.filter(user=auth_user)
+        found = {
+            code: (pk, weight)
+            for code, pk, weight in user_meds.filter(
+                code__in=medications
+                ).values_list('code', 'pk', 'weight')
+        }
+
+        if len(found) != len(medications):
+            user_codes = list(user_meds.values_list('code', flat=True))
+            if len(user_codes):
+                raise ParseError(detail='The available medications are '
+                                        f'{user_codes}.')
+            else:
+                raise ParseError(detail='You have to '
+                                        'create a medication '
+                                        'first.')
+
+        total_weight = sum(weight for pk, weight in found.values())
+        if total_weight > instance.weight_limit:
+            raise ParseError(detail='The drone cannot load '
+                                    'the total weight of the'
+                                    ' selected medications.')
+
+        now = timezone.now()
+        delivery_id = uuid.uuid4()
+        DroneLoad.objects.bulk_create([
+            DroneLoad(
+                drone_id=instance.pk,
+                medication_id=found[med][0],
+                loaded_at=now,
+                delivery_id=delivery_id,
+                )
+            for med in medications
+        ])
+        invalidate_drones([instance.serial_number])
+        instance.weight_limit -= total_weight
+        instance.loaded_weight += total_weight
+        instance.loaded_count += len(medications)
+        getattr(instance, '_prefetched_objects_cache', {}).pop(
+            'medications',
+            None
+            )
@@ -0,0 +1,46 @@
+"""
+Signal receivers invalidating the cached drone responses.
+"""
+from django.db import models
+from django.dispatch import receiver
+
+from core.models import Drone, DroneLoad, Medication
+from drone.cache import get_cache, invalidate_drones
+
+
+@receiver(models.signals.post_save, sender=Drone)
+@receiver(models.signals.post_delete, sender=Drone)
+def drone_changed(sender, instance, *args, **kwargs):
+    """Invalidate the responses of the changed drone."""
+    invalidate_drones([instance.serial_number])
+
+
+@receiver(models.signals.m2m_changed, sender=DroneLoad)
+def drone_medications_changed(sender, instance, action, reverse, pk_set,
+                              *args, **kwargs):
+    """Invalidate the responses of the drones whose medications changed."""
+    if reverse and action == 'pre_clear':
+        invalidate_drones(
+            instance.drone_set.values_list('serial_number', flat=True)
+        )
+    elif action in ['post_add', 'post_remove', 'post_clear']:
+        if not reverse:
+            invalidate_drones([instance.serial_number])
+        elif pk_set:
+            invalidate_drones(
+                Drone.objects.filter(pk__in=pk_set).values_list(
+                    'serial_number',
+                    flat=True
+                )
+            )
+
+
+@receiver(models.signals.post_save, sender=Medication)
+def medication_changed(sender, instance, created, *args, **kwargs):
+    """Invalidate the responses of the drones loaded with the medication."""
+    if created or get_cache() is None:
+        return
+
+    invalidate_drones(
+        instance.drone_set.values_list('serial_number', flat=True)
+    )
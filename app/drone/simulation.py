@@ -0,0 +1,191 @@
+"""
+Simulation of the drone missions.
+
+Every tick drains the battery of the flying drones by their model and
+load, recharges the idle ones and moves the drones along their mission:
+Delivering drones arrive and become Delivered, Delivered drones start
+Returning and Returning drones land as Idle. Delivering drones with a
+low battery return before arriving.
+
+A tick is a fixed number of set-based statements whatever the size of
+the fleet. The per-drone randomness is a hash of the drone id, the tick
+number and the seed computed by the database, so replaying the ticks
+with the same seed moves the same drones.
+"""
+from django.db import transaction
+from django.db.models import (
+    Case,
+    CharField,
+    DateTimeField,
+    F,
+    Func,
+    IntegerField,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Concat, Greatest, Least
+from django.utils import timezone
+
+from core.models import BatteryReading, Drone, DroneLoad
+from core.queries import insert_from
+from drone import states
+from drone.cache import get_cache, invalidate_drones
+
+
+STATUS = Drone.DRONE_STATUS
+
+# Battery percentage drained per tick by drone model.
+DRAIN = [1, 1, 2, 2]
+
+# Extra battery percentage drained per tick for every LOAD_STEP grams.
+LOAD_STEP = 250
+
+# Battery percentage recharged per tick by the idle drones.
+CHARGE = 5
+
+# Delivering drones below this battery percentage return.
+LOW_BATTERY = 15
+
+# Percentage of the flying drones reaching their destination per tick.
+ARRIVAL = 20
+
+
+class HashText(Func):
+    """PostgreSQL `hashtext`, a 32-bit signed hash of a text."""
+    function = 'hashtext'
+    output_field = IntegerField()
+
+
+def roll(tick, seed, salt):
+    """
+    Return an expression of a number in [0, 100) that depends only on
+    the drone id, the `tick`, the `seed` and the `salt` of the draw,
+    hashed together so the drones drawn every tick are unrelated.
+    """
+    digest = HashText(Concat(
+        Cast('pk', CharField()),
+        Value(f':{tick}:{seed}:{salt}'),
+        output_field=CharField(),
+    ))
+    return (digest % 100 + 100) % 100
+
+
+def drain(tick, seed):
+    """Return the expression of the drone battery after a flying tick."""
+    model_drain = Case(
+        *[
+            When(drone_model=model, then=Value(amount))
+            for model, amount in enumerate(DRAIN)
+        ],
+        output_field=IntegerField(),
+        )
+
+    return Greatest(
+        F('battery') - model_drain - F('loaded_weight') / LOAD_STEP
+        - roll(tick, seed, 0) % 2,
+        Value(0),
+        )
+
+
+def charge():
+    """Return the expression of the drone battery after a charging tick."""
+    return Least(F('battery') + CHARGE, Value(100))
+
+
+class Tick:
+    """Advance of the `drones` queryset by one simulation tick."""
+
+    def __init__(self, drones, tick, seed=0, readings=True):
+        self.drones = drones
+        self.tick = tick
+        self.seed = seed
+        self.readings = readings
+        self.now = timezone.now()
+        self.counts = {}
+
+    def update(self, name, drones, **values):
+        """Update `values` on `drones`, counting the rows as `name`."""
+        self.counts[name] = drones.update(updated_at=self.now, **values)
+
+    def arrived(self, state, salt):
+        """Return the drones in `state` arriving at their destination."""
+        return self.drones.filter(state=state).alias(
+            arrival=roll(self.tick, self.seed, salt)
+            ).filter(arrival__lt=ARRIVAL)
+
+    def record(self, drones, battery):
+        """Record the `battery` the `drones` are about to report."""
+        if not self.readings:
+            return
+
+        insert_from(
+            BatteryReading,
+            ['drone', 'battery', 'timestamp'],
+            drones.annotate(
+                reading_battery=battery,
+                reading_timestamp=Value(self.now, DateTimeField()),
+                ).values_list(
+                    'pk',
+                    'reading_battery',
+                    'reading_timestamp'
+                    )
+            )
+
+    @transaction.atomic
+    def run(self):
+        """
+        Run the tick from the end of the mission backwards, so no drone
+        moves more than one state. Return the updated rows by step.
+        """
+        self.update(
+            'landed',
+            self.arrived(STATUS.ret, 1),
+            state=STATUS.idl,
+            **states.unload_values()
+            )
+        self.update(
+            'returning',
+            self.drones.filter(state=STATUS.dld),
+            state=STATUS.ret
+            )
+        self.update(
+            'delivered',
+            self.arrived(STATUS.dlg, 2),
+            state=STATUS.dld,
+            **states.unload_values()
+            )
+        DroneLoad.objects.filter(
+            drone__in=self.drones.filter(
+                state__in=[STATUS.idl, STATUS.dld],
+                updated_at=self.now
+                )
+            ).delete()
+
+        flying = self.drones.filter(
+            state__in=[STATUS.dlg, STATUS.ret],
+            battery__gt=0
+            )
+        self.record(flying, drain(self.tick, self.seed))
+        self.update('drained', flying, battery=drain(self.tick, self.seed))
+        self.update(
+            'low_battery',
+            self.drones.filter(
+                state=STATUS.dlg,
+                battery__lt=LOW_BATTERY
+                ),
+            state=STATUS.ret
+            )
+
+        charging = self.drones.filter(state=STATUS.idl, battery__lt=100)
+        self.record(charging, charge())
+        self.update('charged', charging, battery=charge())
+
+        if get_cache() is not None:
+            invalidate_drones(
+                self.drones.filter(updated_at=self.now).values_list(
+                    'serial_number',
+                    flat=True
+                    )
+                )
+
+        return self.counts
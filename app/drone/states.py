@@ -0,0 +1,211 @@
+"""
+State machine of the drones.
+
+Every state declares the states a drone can enter it from, the guards
+the drone has to pass and whether entering it unloads the drone. The
+transitions are applied with a single conditional `UPDATE` restricted
+to the allowed states, so two concurrent transitions of a drone can
+never both succeed and no row is read before it is written.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from core.models import BatteryReading, Drone, DroneLoad
+from core.queries import update_locked
+from drone.cache import invalidate_drones
+
+
+STATUS = Drone.DRONE_STATUS
+
+
+class Guard:
+    """Minimum value of a drone field required to enter a state."""
+
+    def __init__(self, field, minimum, message):
+        self.field = field
+        self.minimum = minimum
+        self.message = message
+
+    def passes(self, value):
+        """Return whether the field `value` passes the guard."""
+        return value >= self.minimum
+
+    def as_q(self):
+        """Return the guard as a filter of the drone rows."""
+        return Q(**{f'{self.field}__gte': self.minimum})
+
+
+class Transition:
+    """Entering the drones into `state` from the `sources` states."""
+
+    def __init__(self, state, sources, guards=(), unload=False):
+        self.state = state
+        self.sources = frozenset(sources)
+        self.guards = tuple(guards)
+        self.unload = unload
+
+
+LOADING_BATTERY = Guard(
+    'battery',
+    25,
+    'You cannot set the state to loading if the battery is below 25%.'
+    )
+
+DELIVERING_BATTERY = Guard(
+    'battery',
+    25,
+    'You cannot set the state to delivering if the battery is below 25%.'
+    )
+
+NOT_LOADED = Guard(
+    'loaded_weight',
+    1,
+    'The drone has no medications loaded.'
+    )
+
+TRANSITIONS = {
+    transition.state: transition
+    for transition in [
+        Transition(STATUS.idl, [STATUS.ldg, STATUS.ret], unload=True),
+        Transition(STATUS.ldg, [STATUS.idl, STATUS.ldd], [LOADING_BATTERY]),
+        Transition(STATUS.ldd, [STATUS.ldg], [NOT_LOADED]),
+        Transition(
+            STATUS.dlg,
+            [STATUS.ldd],
+            [DELIVERING_BATTERY, NOT_LOADED]
+            ),
+        Transition(STATUS.dld, [STATUS.dlg], unload=True),
+        Transition(STATUS.ret, [STATUS.dlg, STATUS.dld]),
+    ]
+}
+
+
+def default_weight_limit():
+    """Return the weight limit of the drone model as an expression."""
+    return Case(
+        *[
+            When(drone_model=model, then=Value(weight))
+            for model, weight in enumerate(Drone.DRONE_WEIGHTS)
+        ],
+        output_field=IntegerField(),
+        )
+
+
+def unload_values():
+    """Return the drone columns reset when it is unloaded."""
+    return {
+        'weight_limit': default_weight_limit(),
+        'loaded_weight': 0,
+        'loaded_count': 0,
+    }
+
+
+def unload(instance):
+    """Reset the loaded weight and capacity of `instance` in place."""
+    instance.weight_limit = instance.DRONE_WEIGHTS[instance.drone_model]
+    instance.loaded_weight = 0
+    instance.loaded_count = 0
+
+
+def rejection(drone, state, battery=None, check_source=True):
+    """
+    Return why `drone` cannot enter `state` reporting `battery`, or
+    None if it can. Staying in the current state is always allowed.
+    The source state is only checked if `check_source` is set.
+    """
+    transition = TRANSITIONS[state]
+    if drone.state == state:
+        return None
+
+    if check_source and drone.state not in transition.sources:
+        return (
+            'The drone cannot change from '
+            f'{STATUS[drone.state]} to {STATUS[state]}.'
+            )
+
+    for guard in transition.guards:
+        if guard.field == 'battery' and battery is not None:
+            value = battery
+        else:
+            value = getattr(drone, guard.field)
+        if not guard.passes(value):
+            return guard.message
+
+    return None
+
+
+def allowed(state, battery=None):
+    """
+    Return the filter of the drones that can enter `state` reporting
+    `battery`, checking the reported battery instead of the stored one.
+    """
+    transition = TRANSITIONS[state]
+    condition = Q(state__in=transition.sources)
+    for guard in transition.guards:
+        if guard.field == 'battery' and battery is not None:
+            if not guard.passes(battery):
+                condition = Q(pk__in=[])
+        else:
+            condition &= guard.as_q()
+
+    return Q(state=state) | condition
+
+
+@transaction.atomic
+def transition_drones(drones, state=None, battery=None):
+    """
+    Move the `drones` queryset into `state` and set their `battery`
+    with one conditional `UPDATE`, skipping the drones the transition
+    table does not allow. Record the battery changes, unload the
+    drones entering an unloading state, but not the ones already in it,
+    and invalidate their cached responses. Return the serial numbers of
+    the updated drones.
+    """
+    values = {'updated_at': timezone.now()}
+    unloads = False
+
+    if state is not None:
+        drones = drones.filter(allowed(state, battery))
+        values['state'] = state
+        if TRANSITIONS[state].unload:
+            unloads = True
+            values.update({
+                field: Case(When(state=state, then=F(field)), default=value)
+                for field, value in unload_values().items()
+            })
+
+    if battery is not None:
+        values['battery'] = battery
+
+    updated = update_locked(
+        drones,
+        values,
+        returning=('serial_number', 'battery', 'state')
+        )
+
+    if battery is not None:
+        readings = []
+        battery_log = logging.getLogger('battery_log')
+        for pk, serial_number, old_battery, old_state in updated:
+            if old_battery != battery:
+                battery_log.info(
+                    f'[{serial_number}] Battery Change -> '
+                    f'from:{old_battery}% -> to:{battery}%'
+                    )
+                readings.append(BatteryReading(drone_id=pk, battery=battery))
+        BatteryReading.objects.bulk_create(readings, batch_size=1000)
+
+    if unloads:
+        DroneLoad.objects.filter(
+            drone_id__in=[
+                pk for pk, serial_number, old_battery, old_state in updated
+                if old_state != state
+            ]).delete()
+
+    serial_numbers = [serial_number for pk, serial_number, *old in updated]
+    invalidate_drones(serial_numbers)
+
+    return serial_numbers
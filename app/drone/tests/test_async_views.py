@@ -0,0 +1,279 @@
+"""
+Tests for the asynchronous drone read views.
+"""
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import include, path, resolve, reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.models import Drone, Medication
+from drone import async_views, urls
+
+
+# The drone URLs with the asynchronous views on, for `AsyncDroneRoutesTests`.
+urlpatterns = [
+    path('api/', include(
+        (urls.async_urlpatterns() + urls.urlpatterns, 'drone')
+    )),
+]
+
+
+AVAILABLE_URL = reverse('drone:drone-check-available')
+
+
+def create_user(email='test@example.com', password='12345678'):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class AsyncDroneViewsTests(TestCase):
+    """Test the asynchronous drone read views."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.factory = AsyncRequestFactory()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.drone = Drone.objects.create(
+            user=self.user,
+            serial_number='Test1',
+            state=Drone.DRONE_STATUS.ldg,
+            battery=80
+        )
+        self.drone.medications.add(Medication.objects.create(
+            user=self.user,
+            code='TEST1',
+            name='Testing',
+            weight=100
+        ))
+        self.reads = [
+            (async_views.retrieve, 'drone:drone-detail'),
+            (async_views.check_medication, 'drone:drone-check-medication'),
+            (async_views.check_battery, 'drone:drone-check-battery'),
+        ]
+
+    def get(self, view, url, token=None, headers=None, **kwargs):
+        """Return the response of the asynchronous `view` to a GET."""
+        headers = dict(headers or {})
+        if token is not False:
+            headers['authorization'] = f'Token {token or self.token}'
+        request = self.factory.get(url, **headers)
+
+        return view(request, **kwargs)
+
+    async def sync_get(self, url):
+        """Return the JSON data of the synchronous view at `url`."""
+        res = await sync_to_async(self.client.get)(url)
+        return json.loads(res.content)
+
+    async def test_reads_match_sync_views(self):
+        """Test the views return the data of the synchronous actions."""
+        for view, name in self.reads:
+            url = reverse(name, args=['Test1'])
+            expected = await self.sync_get(url)
+
+            res = await self.get(view, url, serial_number='Test1')
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(json.loads(res.content), expected)
+
+        expected = await self.sync_get(AVAILABLE_URL)
+        res = await self.get(async_views.check_available, AVAILABLE_URL)
+
+        self.assertEqual(json.loads(res.content), expected)
+        self.assertEqual(len(expected['results']), 1)
+
+    async def test_authentication_required(self):
+        """Test the requests without a token are unauthorized."""
+        res = await self.get(
+            async_views.check_battery,
+            '/',
+            token=False,
+            serial_number='Test1'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+        res = await self.get(
+            async_views.check_battery,
+            '/',
+            token='invalid',
+            serial_number='Test1'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_drones_limited_to_user(self):
+        """Test the drones of other users are not found."""
+        other_token = await sync_to_async(Token.objects.create)(
+            user=await sync_to_async(create_user)(email='test2@example.com')
+        )
+
+        for view, name in self.reads:
+            res = await self.get(
+                view,
+                reverse(name, args=['Test1']),
+                token=other_token,
+                serial_number='Test1'
+                )
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(json.loads(res.content), {'detail': 'Not found.'})
+
+    async def test_available_invalid_filters(self):
+        """Test invalid filters of the available drones are rejected."""
+        res = await self.get(
+            async_views.check_available,
+            f'{AVAILABLE_URL}?min_battery=200'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('min_battery', json.loads(res.content))
+
+    @override_settings(DRONE_CACHE_ALIAS='default')
+    async def test_cached_response_shared_with_sync_views(self):
+        """Test the ETags of the synchronous actions answer with a 304."""
+        for view, name in self.reads:
+            url = reverse(name, args=['Test1'])
+            sync_res = await sync_to_async(self.client.get)(url)
+
+            # The queries are counted on the connection of the test
+            # thread, where the views run their queries.
+            queries = await sync_to_async(self.assertNumQueries)(0)
+            await sync_to_async(queries.__enter__)()
+            res = await view(
+                self.factory.get(
+                    url,
+                    authorization=f'Token {self.token}',
+                    if_none_match=sync_res['ETag']
+                    ),
+                serial_number='Test1'
+                )
+            await sync_to_async(queries.__exit__)(None, None, None)
+
+            self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(res['ETag'], sync_res['ETag'])
+
+    async def test_conditional_retrieve_without_cache(self):
+        """Test the drone is answered with the conditional GET uncached."""
+        url = reverse('drone:drone-detail', args=['Test1'])
+        sync_res = await sync_to_async(self.client.get)(url)
+
+        res = await self.get(
+            async_views.retrieve,
+            url,
+            headers={'if_none_match': sync_res['ETag']},
+            serial_number='Test1'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], sync_res['ETag'])
+        self.assertEqual(res['Last-Modified'], sync_res['Last-Modified'])
+
+        res = await self.get(
+            async_views.retrieve,
+            url,
+            headers={'if_modified_since': sync_res['Last-Modified']},
+            serial_number='Test1'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        await sync_to_async(Drone.objects.filter(pk=self.drone.pk).update)(
+            battery=50,
+            updated_at=self.drone.updated_at + timedelta(seconds=1)
+            )
+        res = await self.get(
+            async_views.retrieve,
+            url,
+            headers={'if_none_match': sync_res['ETag']},
+            serial_number='Test1'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(res.content)['battery'], 50)
+        self.assertNotEqual(res['ETag'], sync_res['ETag'])
+
+    async def test_other_methods_use_sync_view(self):
+        """Test deleting the drone is handed over to the sync view."""
+        request = self.factory.delete(
+            reverse('drone:drone-detail', args=['Test1']),
+            authorization=f'Token {self.token}'
+            )
+
+        res = await async_views.retrieve(request, serial_number='Test1')
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        res = await self.get(
+            async_views.check_battery,
+            '/',
+            serial_number='Test1'
+            )
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncDroneRoutesTests(TestCase):
+    """Test the URLs served with the asynchronous views on."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}'
+            )
+        Drone.objects.create(
+            user=self.user,
+            serial_number='Test1',
+            state=Drone.DRONE_STATUS.idl,
+            battery=80
+        )
+        Medication.objects.create(
+            user=self.user,
+            code='TEST1',
+            name='Testing',
+            weight=100
+        )
+
+    def test_list_actions_served_by_router(self):
+        """Test the POST list actions are not taken for a drone."""
+        posts = [
+            ('drone:drone-telemetry', [{
+                'serial_number': 'Test1',
+                'battery': 70,
+            }]),
+            ('drone:drone-assign', {'medications': ['TEST1']}),
+            ('drone:drone-transition', {
+                'serial_numbers': ['Test1'],
+                'state': Drone.DRONE_STATUS.ldg,
+            }),
+        ]
+
+        for name, payload in posts:
+            res = self.client.post(reverse(name), payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK, name)
+
+    def test_detail_served_by_async_view(self):
+        """Test the drone reads are routed to the asynchronous views."""
+        url = reverse('drone:drone-detail', args=['Test1'])
+
+        self.assertIs(resolve(url).func, async_views.retrieve)
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['serial_number'], 'Test1')
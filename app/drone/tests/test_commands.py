@@ -0,0 +1,134 @@
+"""
+Test drone Django management commands.
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.models import Drone, Medication
+from drone.management.commands import simulate_fleet
+
+
+class ReconcileLoadsTests(TestCase):
+    """Test the reconcile_loads command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='12345678'
+        )
+        self.drone = Drone.objects.create(
+            user=self.user,
+            serial_number='Test1',
+            drone_model=Drone.DRONE_MODEL.hw,
+        )
+        self.drone.medications.add(
+            Medication.objects.create(
+                user=self.user,
+                code='TEST1',
+                name='Testing',
+                weight=200
+            ),
+            Medication.objects.create(
+                user=self.user,
+                code='TEST2',
+                name='Testing',
+                weight=100
+            ),
+        )
+        Drone.objects.create(user=self.user, serial_number='Test2')
+
+    def test_reconcile_loads(self):
+        """Test the drifted drones are recomputed from their medications."""
+        out = StringIO()
+
+        call_command('reconcile_loads', stdout=out)
+
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.loaded_weight, 300)
+        self.assertEqual(self.drone.loaded_count, 2)
+        self.assertEqual(self.drone.weight_limit, 200)
+        self.assertIn('1 drones out of sync reconciled.', out.getvalue())
+        self.assertIn('Test1', out.getvalue())
+
+        out = StringIO()
+        call_command('reconcile_loads', stdout=out)
+
+        self.assertIn('0 drones out of sync reconciled.', out.getvalue())
+
+    def test_reconcile_loads_dry_run(self):
+        """Test a dry run only reports the drifted drones."""
+        out = StringIO()
+
+        call_command('reconcile_loads', '--dry-run', stdout=out)
+
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.loaded_weight, 0)
+        self.assertEqual(self.drone.weight_limit, 500)
+        self.assertIn('1 drones out of sync.', out.getvalue())
+
+
+class SimulateFleetTests(TestCase):
+    """Test the simulate_fleet command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='12345678'
+        )
+
+    def test_simulate_fleet(self):
+        """Test the command creates a fleet and runs the ticks."""
+        out = StringIO()
+
+        call_command(
+            'simulate_fleet',
+            '--email', 'test@example.com',
+            '--drones', '100',
+            '--ticks', '3',
+            '--interval', '0',
+            '--seed', '7',
+            stdout=out
+        )
+
+        self.assertEqual(Drone.objects.filter(user=self.user).count(), 100)
+        self.assertEqual(out.getvalue().count('Tick '), 3)
+        self.assertIn('Tick 2 in', out.getvalue())
+
+    def test_simulate_fleet_drones_valid(self):
+        """Test the created drones carry their loads and unique serials."""
+        command = simulate_fleet.Command()
+        command.create_drones(self.user, 50, seed=7)
+        Drone.objects.filter(serial_number__endswith='0').delete()
+
+        command.create_drones(self.user, 50, seed=7)
+
+        drones = Drone.objects.filter(user=self.user)
+        self.assertEqual(drones.count(), 95)
+        self.assertEqual(
+            drones.values('serial_number').distinct().count(),
+            95
+            )
+        delivering = drones.filter(state=Drone.DRONE_STATUS.dlg)
+        self.assertTrue(delivering.exists())
+        for drone in delivering:
+            self.assertEqual(drone.loaded_weight, 50)
+            self.assertEqual(drone.medications.count(), 1)
+            self.assertEqual(
+                drone.weight_limit + drone.loaded_weight,
+                Drone.DRONE_WEIGHTS[drone.drone_model]
+                )
+
+    def test_simulate_fleet_requires_user(self):
+        """Test creating drones requires an existing user."""
+        with self.assertRaises(CommandError):
+            call_command('simulate_fleet', '--drones', '10', '--ticks', '1')
+        with self.assertRaises(CommandError):
+            call_command(
+                'simulate_fleet',
+                '--email', 'missing@example.com',
+                '--ticks', '1'
+            )
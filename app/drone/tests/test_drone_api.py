@@ -2,23 +2,41 @@
 Tests for drone APIs.
 """
 
+import json
 import logging
+import threading
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from unittest.mock import patch
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.db.models import Prefetch
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
-from core.models import Drone, Medication
+from core.models import BatteryReading, Drone, DroneLoad, Medication
+from core.tests.utils import QueryCountTestMixin
 
 from drone.serializers import (
     DroneSerializer,
     DroneDetailSerializer,
+    DroneValuesSerializer,
     )
+from drone.views import DroneViewSet
+from medication.serializers import MedicationSerializer
 
 
 DRONES_URL = reverse('drone:drone-list')
+AVAILABLE_URL = reverse('drone:drone-check-available')
+ASSIGN_URL = reverse('drone:drone-assign')
+TELEMETRY_URL = reverse('drone:drone-telemetry')
+TRANSITION_URL = reverse('drone:drone-transition')
 
 
 def detail_url(drone_sn):
@@ -31,6 +49,16 @@ def add_med_url(drone_sn):
     return reverse('drone:drone-load-medication', args=[drone_sn])
 
 
+def battery_history_url(drone_sn):
+    """Create and return a drone battery history URL."""
+    return reverse('drone:drone-battery-history', args=[drone_sn])
+
+
+def manifest_url(drone_sn):
+    """Create and return a drone manifest URL."""
+    return reverse('drone:drone-manifest', args=[drone_sn])
+
+
 def manage_url(drone_sn):
     """Create and return a drone manage URL."""
     return reverse('drone:drone-manage', args=[drone_sn])
@@ -74,7 +102,7 @@ class PublicDroneAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateDroneAPITests(TestCase):
+class PrivateDroneAPITests(QueryCountTestMixin, TestCase):
     """Test authenticated API requests."""
 
     def setUp(self):
@@ -93,7 +121,76 @@ class PrivateDroneAPITests(TestCase):
         drones = Drone.objects.all().order_by('serial_number')
         serializer = DroneSerializer(drones, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_drone_list_natural_keys(self):
+        """Test drones and medications are exposed by their natural keys."""
+        drone = create_drone(user=self.user, serial_number='Test1')
+        drone.medications.add(create_medication(user=self.user, code='TEST1'))
+
+        res = self.client.get(DRONES_URL)
+
+        self.assertEqual(res.data['results'][0]['serial_number'], 'Test1')
+        self.assertEqual(res.data['results'][0]['medications'], ['TEST1'])
+        self.assertNotIn('id', res.data['results'][0])
+
+    def test_drone_values_serializer_matches_model(self):
+        """Test the values serializer renders the same bytes as the model."""
+        drone = create_drone(
+            user=self.user,
+            serial_number='Test1',
+            state=Drone.DRONE_STATUS.ldg,
+            )
+        drone.medications.add(
+            create_medication(user=self.user, code='TEST2'),
+            create_medication(user=self.user, code='TEST1'),
+        )
+        create_drone(user=self.user, serial_number='Test2', battery=20)
+        drones = Drone.objects.order_by('serial_number')
+
+        expected = JSONRenderer().render(DroneSerializer(
+            drones.prefetch_related(
+                Prefetch('medications', Medication.objects.order_by('code'))
+            ),
+            many=True
+        ).data)
+        rendered = JSONRenderer().render(DroneValuesSerializer(
+            drones.values(*DroneValuesSerializer.columns),
+            many=True
+        ).data)
+
+        self.assertEqual(rendered, expected)
+
+    def test_drone_list_stream(self):
+        """Test streaming every drone prefetching a chunk at a time."""
+        for i in range(5):
+            drone = create_drone(user=self.user, serial_number=f'Test{i}')
+            drone.medications.add(
+                create_medication(user=self.user, code=f'TEST{i}')
+            )
+
+        with patch.object(DroneViewSet, 'stream_chunk_size', 2), \
+                self.assertNumQueries(5):
+            res = self.client.get(DRONES_URL, {'stream': 'json'})
+            content = b''.join(res.streaming_content)
+
+        drones = Drone.objects.all().order_by('serial_number')
+        serializer = DroneSerializer(drones, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(content), serializer.data)
+
+    def test_drone_list_stream_empty(self):
+        """Test streaming an empty list of drones."""
+        res = self.client.get(DRONES_URL, {'stream': 'json'})
+
+        self.assertEqual(b''.join(res.streaming_content), b'[]')
+
+    def test_drone_list_stream_invalid_format(self):
+        """Test streaming in an unknown format returns an error."""
+        res = self.client.get(DRONES_URL, {'stream': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_drone_list_limited_to_user(self):
         """Test list of drones is limited to authenticated user."""
@@ -110,7 +207,73 @@ class PrivateDroneAPITests(TestCase):
         drones = Drone.objects.filter(user=self.user)
         serializer = DroneSerializer(drones, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_drone_list_paginated(self):
+        """Test paging through drones forwards and backwards."""
+        serials = [f'Test{i}' for i in range(7)]
+        for serial_number in reversed(serials):
+            create_drone(user=self.user, serial_number=serial_number)
+
+        res = self.client.get(DRONES_URL, {'page_size': 3})
+        pages = [res.data]
+        while pages[-1]['next']:
+            pages.append(self.client.get(pages[-1]['next']).data)
+
+        self.assertEqual(
+            [[d['serial_number'] for d in page['results']] for page in pages],
+            [serials[0:3], serials[3:6], serials[6:]]
+            )
+        self.assertIsNone(pages[0]['previous'])
+
+        res = self.client.get(pages[-1]['previous'])
+
+        self.assertEqual(
+            [d['serial_number'] for d in res.data['results']],
+            serials[3:6]
+            )
+
+    @patch('core.pagination.KeysetPagination.max_page_size', 2)
+    def test_drone_list_page_size_limit(self):
+        """Test the page size cannot exceed the server maximum."""
+        for i in range(3):
+            create_drone(user=self.user, serial_number=f'Test{i}')
+
+        res = self.client.get(DRONES_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_drone_list_invalid_cursor(self):
+        """Test an invalid cursor returns not found."""
+        res = self.client.get(DRONES_URL, {'cursor': 'invalid'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_drone_list_forged_cursor(self):
+        """Test a cursor with values no drone can have returns not found."""
+        for position in [None, [1], {'a': 1}]:
+            cursor = json.dumps({'r': 0, 'p': [position]})
+            res = self.client.get(DRONES_URL, {
+                'cursor': urlsafe_b64encode(cursor.encode()).decode(),
+            })
+
+            self.assertEqual(
+                res.status_code,
+                status.HTTP_404_NOT_FOUND,
+                position
+                )
+
+    def test_drone_list_invalid_page_size(self):
+        """Test an invalid page size falls back to the default one."""
+        for i in range(3):
+            create_drone(user=self.user, serial_number=f'Test{i}')
+
+        for page_size in ['0', '-1', 'abc']:
+            res = self.client.get(DRONES_URL, {'page_size': page_size})
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data['results']), 3)
 
     def test_get_drone_detail(self):
         """Test get drone detail."""
@@ -140,15 +303,203 @@ class PrivateDroneAPITests(TestCase):
         """Test manage a drone status and battery."""
         logging.disable(logging.CRITICAL)
 
-        drone = create_drone(user=self.user, serial_number='Test1')
+        drone = create_drone(
+            user=self.user,
+            serial_number='Test1',
+            state=Drone.DRONE_STATUS.ldg,
+            )
+        create_medication(user=self.user, code='TEST1', weight=50)
+        self.client.post(
+            add_med_url(drone.serial_number),
+            {'medications': ['TEST1']},
+            format='json'
+            )
         url = manage_url(drone.serial_number)
 
         payload = {'battery': 50, 'state': Drone.DRONE_STATUS.ldd}
         res = self.client.post(url, payload, format='json')
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['state'], 'Loaded')
         drone.refresh_from_db()
         self.assertEqual(drone.battery, payload['battery'])
+        self.assertEqual(drone.state, payload['state'])
+
+    def test_manage_drone_state_labels(self):
+        """Test the state is accepted by value, name and label."""
+        logging.disable(logging.CRITICAL)
+
+        drone = create_drone(user=self.user, serial_number='Test1')
+        url = manage_url(drone.serial_number)
+
+        for state in ['Loading', 'loading', ' LDG ', '1', 1]:
+            Drone.objects.filter(pk=drone.pk).update(
+                state=Drone.DRONE_STATUS.idl
+            )
+
+            res = self.client.post(url, {'state': state}, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK, state)
+            self.assertEqual(res.data['state'], 'Loading')
+
+        res = self.client.post(
+            url,
+            {'state': Drone.DRONE_STATUS.ldg, 'battery': '50'},
+            format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        drone.refresh_from_db()
+        self.assertEqual(drone.battery, 50)
+
+    def test_manage_drone_invalid_payload(self):
+        """Test invalid states and read only fields are rejected."""
+        drone = create_drone(user=self.user, serial_number='Test1')
+        url = manage_url(drone.serial_number)
+
+        for payload in [
+                {'state': 'flying'},
+                {'state': 99},
+                {'battery': 'full'},
+                {'state': 'Loading', 'weight_limit': 500}]:
+            res = self.client.post(url, payload, format='json')
+
+            self.assertEqual(
+                res.status_code,
+                status.HTTP_400_BAD_REQUEST,
+                payload
+                )
+
+        drone.refresh_from_db()
+        self.assertEqual(drone.state, Drone.DRONE_STATUS.idl)
+
+    def test_manage_drone_invalid_transition(self):
+        """Test the state machine rejects transitions it does not allow."""
+        drone = create_drone(user=self.user, serial_number='Test1')
+        url = manage_url(drone.serial_number)
+
+        payload = {'battery': 50, 'state': Drone.DRONE_STATUS.dld}
+        res = self.client.post(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        drone.refresh_from_db()
+        self.assertEqual(drone.state, Drone.DRONE_STATUS.idl)
+        self.assertEqual(drone.battery, 100)
+        self.assertFalse(drone.battery_readings.exists())
+
+    def test_manage_drone_not_loaded(self):
+        """Test an empty drone cannot leave as loaded."""
+        drone = create_drone(
+            user=self.user,
+            serial_number='Test1',
+            state=Drone.DRONE_STATUS.ldg,
+            )
+
+        res = self.client.post(
+            manage_url(drone.serial_number),
+            {'state': Drone.DRONE_STATUS.ldd},
+            format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_manage_drone_same_state_keeps_loads(self):
+        """Test a repeated unloading state does not unload the drone."""
+        logging.disable(logging.CRITICAL)
+
+        drone = create_drone(
+            user=self.user,
+            serial_number='Test1',
+            state=Drone.DRONE_STATUS.ldg,
+            )
+        create_medication(user=self.user, code='TEST1', weight=50)
+        self.client.post(
+            add_med_url(drone.serial_number),
+            {'medications': ['TEST1']},
+            format='json'
+            )
+        Drone.objects.filter(pk=drone.pk).update(state=Drone.DRONE_STATUS.dld)
+
+        res = self.client.post(
+            manage_url(drone.serial_number),
+            {'state': Drone.DRONE_STATUS.dld, 'battery': 40},
+            format='json'
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.post(
+            TELEMETRY_URL,
+            [{'serial_number': 'Test1', 'state': Drone.DRONE_STATUS.dld}],
+            format='json'
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        drone.refresh_from_db()
+        self.assertEqual(drone.battery, 40)
+        self.assertEqual(drone.loaded_weight, 50)
+        self.assertEqual(drone.loaded_count, 1)
+        self.assertTrue(DroneLoad.objects.filter(drone=drone).exists())
+
+    def test_manage_drone_records_battery(self):
+        """Test battery changes are stored as battery readings."""
+        logging.disable(logging.CRITICAL)
+
+        drone = create_drone(user=self.user, serial_number='Test1')
+        url = manage_url(drone.serial_number)
+
+        for battery in [50, 50, 40]:
+            payload = {'battery': battery, 'state': Drone.DRONE_STATUS.idl}
+            res = self.client.post(url, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(
+            list(drone.battery_readings.order_by('timestamp').values_list(
+                'battery',
+                flat=True
+                )),
+            [50, 40]
+            )
+
+    def test_drone_battery_history(self):
+        """Test the battery history is downsampled into buckets."""
+        drone = create_drone(user=self.user, serial_number='Test1')
+        start = timezone.now() - timedelta(hours=4)
+        BatteryReading.objects.bulk_create([
+            BatteryReading(
+                drone=drone,
+                battery=battery,
+                timestamp=start + timedelta(minutes=minutes)
+                )
+            for minutes, battery in [(10, 90), (50, 80), (130, 60), (300, 5)]
+        ])
+
+        res = self.client.get(battery_history_url(drone.serial_number), {
+            'start': start.isoformat(),
+            'end': (start + timedelta(hours=4)).isoformat(),
+            'buckets': 2,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (b['readings'], b['battery_min'], b['battery_max'])
+                for b in res.data
+            ],
+            [(2, 80, 90), (1, 60, 60)]
+            )
+        self.assertEqual(res.data[0]['battery_avg'], 85)
+
+    def test_drone_battery_history_invalid_range(self):
+        """Test the battery history range must be ordered."""
+        drone = create_drone(user=self.user, serial_number='Test1')
+        now = timezone.now()
+
+        res = self.client.get(battery_history_url(drone.serial_number), {
+            'start': now.isoformat(),
+            'end': (now - timedelta(hours=1)).isoformat(),
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_update_drone_to_delivered(self):
         """
@@ -157,14 +508,26 @@ class PrivateDroneAPITests(TestCase):
         """
         logging.disable(logging.CRITICAL)
 
-        drone = create_drone(user=self.user, serial_number='Test1')
-        medication = create_medication(user=self.user, code=['TESTING'])
+        drone = create_drone(
+            user=self.user,
+            serial_number='Test1',
+            state=Drone.DRONE_STATUS.ldg,
+            )
+        medication = create_medication(
+            user=self.user,
+            code='TESTING',
+            weight=50
+        )
 
         payload = {'medications': ['TESTING']}
         url = add_med_url(drone.serial_number)
         self.client.post(url, payload, format='json')
 
         url = manage_url(drone.serial_number)
+        for state in [Drone.DRONE_STATUS.ldd, Drone.DRONE_STATUS.dlg]:
+            res = self.client.post(url, {'state': state}, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
         payload = {'battery': 10, 'state': Drone.DRONE_STATUS.dld}
         res = self.client.post(url, payload, format='json')
 
@@ -175,6 +538,8 @@ class PrivateDroneAPITests(TestCase):
             drone.weight_limit,
             drone.DRONE_WEIGHTS[drone.drone_model]
             )
+        self.assertEqual(drone.loaded_weight, 0)
+        self.assertEqual(drone.loaded_count, 0)
 
     def test_cannot_update_to_loading_battery_level(self):
         """Test cannot update the state to loading if battery <25%."""
@@ -243,6 +608,39 @@ class PrivateDroneAPITests(TestCase):
         self.assertIn(medication2, drone.medications.all())
         self.assertIn(medication, drone.medications.all())
 
+    def test_drone_manifest(self):
+        """Test the manifest lists the loads of each request in order."""
+        drone = create_drone(
+            user=self.user,
+            serial_number='Test1',
+            drone_model=3,
+            state=Drone.DRONE_STATUS.ldg,
+            )
+        for code in ['TEST1', 'TEST2', 'TEST3']:
+            create_medication(user=self.user, code=code, weight=100)
+
+        url = add_med_url(drone.serial_number)
+        payload = {'medications': ['TEST2', 'TEST1']}
+        self.client.post(url, payload, format='json')
+        payload = {'medications': ['TEST3']}
+        self.client.post(url, payload, format='json')
+        res = self.client.get(manifest_url(drone.serial_number))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [load['medication'] for load in res.data],
+            ['TEST1', 'TEST2', 'TEST3']
+            )
+        self.assertEqual([load['quantity'] for load in res.data], [1] * 3)
+        self.assertEqual(
+            res.data[0]['delivery_id'],
+            res.data[1]['delivery_id']
+            )
+        self.assertNotEqual(
+            res.data[1]['delivery_id'],
+            res.data[2]['delivery_id']
+            )
+
     def test_add_duplicate_medications_drone(self):
         """Test error when trying to add the same medication."""
         drone = create_drone(user=self.user, serial_number='Test1')
@@ -360,5 +758,695 @@ class PrivateDroneAPITests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        for k, v in res.data['medications'][0].items():
-            self.assertEqual(getattr(medication, k), v)
+        serializer = MedicationSerializer(
+            medication,
+            context={'request': res.wsgi_request}
+            )
+        self.assertEqual(res.data['medications'], [serializer.data])
+
+    def test_check_available_drones(self):
+        """Test listing the user drones in loading state."""
+        other_user = create_user(
+            email='test2@example.com',
+            password='12345678'
+        )
+        create_drone(
+            user=other_user,
+            serial_number='Test1',
+            state=Drone.DRONE_STATUS.ldg
+            )
+        create_drone(user=self.user, serial_number='Test2')
+        create_drone(
+            user=self.user,
+            serial_number='Test3',
+            state=Drone.DRONE_STATUS.ldg
+            )
+
+        res = self.client.get(AVAILABLE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [d['serial_number'] for d in res.data['results']],
+            ['Test3']
+            )
+
+    def test_check_available_filters(self):
+        """Test filtering available drones by battery and capacity."""
+        for serial_number, battery, drone_model in [
+                ('Test1', 30, 3),
+                ('Test2', 90, 0),
+                ('Test3', 90, 3),
+                ]:
+            create_drone(
+                user=self.user,
+                serial_number=serial_number,
+                battery=battery,
+                drone_model=drone_model,
+                state=Drone.DRONE_STATUS.ldg
+                )
+
+        res = self.client.get(
+            AVAILABLE_URL,
+            {'min_battery': 50, 'min_weight': 300}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [d['serial_number'] for d in res.data['results']],
+            ['Test3']
+            )
+
+    def test_check_available_invalid_filters(self):
+        """Test invalid available drones filters return an error."""
+        res = self.client.get(AVAILABLE_URL, {'min_battery': 'full'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_check_available_constant_queries(self):
+        """Test listing available drones does not query once per drone."""
+        def setup(size):
+            Drone.objects.all().delete()
+            for i in range(size):
+                drone = self.create_loaded_drone(f'Test{size}_{i}', 2)
+                drone.state = Drone.DRONE_STATUS.ldg
+                drone.save()
+
+        def request(context):
+            res = self.client.get(AVAILABLE_URL, {'page_size': 5})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertConstantQueries(setup, request)
+
+    def test_assign_medications(self):
+        """Test assigning medications to the best fitting drones."""
+        create_drone(
+            user=self.user,
+            serial_number='Test1',
+            drone_model=3,
+            state=Drone.DRONE_STATUS.ldg,
+            )
+        create_drone(
+            user=self.user,
+            serial_number='Test2',
+            drone_model=1,
+            state=Drone.DRONE_STATUS.ldg,
+            )
+        create_medication(user=self.user, code='TEST1', weight=200)
+        create_medication(user=self.user, code='TEST2', weight=50)
+        create_medication(user=self.user, code='TEST3', weight=300)
+
+        payload = {'medications': ['TEST1', 'TEST2', 'TEST3']}
+        res = self.client.post(ASSIGN_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['assignments'], [
+            {
+                'serial_number': 'Test1',
+                'medications': ['TEST3', 'TEST1'],
+                'weight_limit': 0,
+            },
+            {
+                'serial_number': 'Test2',
+                'medications': ['TEST2'],
+                'weight_limit': 200,
+            },
+        ])
+        self.assertEqual(res.data['unassigned'], [])
+        self.assertFalse(DroneLoad.objects.exists())
+
+    def test_assign_and_reserve_medications(self):
+        """Test reserving assigned medications loads the drones."""
+        drone = create_drone(
+            user=self.user,
+            serial_number='Test1',
+            drone_model=3,
+            state=Drone.DRONE_STATUS.ldg,
+            )
+        medication = create_medication(user=self.user, code='TEST1')
+
+        payload = {'medications': ['TEST1'], 'reserve': True}
+        res = self.client.post(ASSIGN_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        drone.refresh_from_db()
+        self.assertIn(medication, drone.medications.all())
+        self.assertEqual(drone.weight_limit, 300)
+        self.assertEqual(drone.loaded_weight, 200)
+        self.assertEqual(drone.loaded_count, 1)
+
+    def test_assign_reserve_overweight(self):
+        """Test nothing is reserved if some medication does not fit."""
+        drone = create_drone(
+            user=self.user,
+            serial_number='Test1',
+            drone_model=1,
+            state=Drone.DRONE_STATUS.ldg,
+            )
+        create_medication(user=self.user, code='TEST1', weight=200)
+        create_medication(user=self.user, code='TEST2', weight=100)
+
+        payload = {'medications': ['TEST1', 'TEST2'], 'reserve': True}
+        res = self.client.post(ASSIGN_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        drone.refresh_from_db()
+        self.assertFalse(drone.medications.exists())
+        self.assertEqual(drone.weight_limit, 250)
+
+    def test_assign_unknown_medication(self):
+        """Test assigning another user medication returns an error."""
+        other_user = create_user(
+            email='test2@example.com',
+            password='12345678'
+        )
+        create_medication(user=other_user, code='TEST1')
+
+        payload = {'medications': ['TEST1']}
+        res = self.client.post(ASSIGN_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_drone_transition(self):
+        """Test moving many drones into a state at once."""
+        logging.disable(logging.CRITICAL)
+
+        for i, state in enumerate([
+                Drone.DRONE_STATUS.dlg,
+                Drone.DRONE_STATUS.dlg,
+                Drone.DRONE_STATUS.ldg]):
+            create_drone(
+                user=self.user,
+                serial_number=f'Test{i}',
+                state=state,
+                weight_limit=50,
+                loaded_weight=50,
+                loaded_count=1,
+                )
+        other_user = create_user(
+            email='test2@example.com',
+            password='12345678'
+        )
+        create_drone(
+            user=other_user,
+            serial_number='Other',
+            state=Drone.DRONE_STATUS.dlg
+            )
+
+        payload = {
+            'serial_numbers': ['Test0', 'Test1', 'Test2', 'Other'],
+            'state': 'Delivered',
+            'battery': 40,
+        }
+        res = self.client.post(TRANSITION_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'transitioned': ['Test0', 'Test1'],
+            'rejected': ['Other', 'Test2'],
+        })
+        delivered = Drone.objects.filter(state=Drone.DRONE_STATUS.dld)
+        self.assertEqual(
+            sorted(delivered.values_list('serial_number', flat=True)),
+            ['Test0', 'Test1']
+            )
+        for drone in delivered:
+            self.assertEqual(drone.battery, 40)
+            self.assertEqual(drone.weight_limit, 100)
+            self.assertEqual(drone.loaded_weight, 0)
+        self.assertEqual(BatteryReading.objects.count(), 2)
+
+    def test_drone_transition_constant_queries(self):
+        """Test moving drones does not query once per drone."""
+        logging.disable(logging.CRITICAL)
+
+        def setup(size):
+            return [
+                create_drone(
+                    user=self.user,
+                    serial_number=f'Test{size}_{i}',
+                    state=Drone.DRONE_STATUS.ret,
+                    )
+                for i in range(size)
+            ]
+
+        def request(drones):
+            payload = {
+                'serial_numbers': [drone.serial_number for drone in drones],
+                'state': Drone.DRONE_STATUS.idl,
+                'battery': 100,
+            }
+            res = self.client.post(TRANSITION_URL, payload, format='json')
+            self.assertEqual(len(res.data['transitioned']), len(drones))
+
+        self.assertConstantQueries(setup, request)
+
+    def test_drone_telemetry(self):
+        """Test applying a batch of drone reports."""
+        logging.disable(logging.CRITICAL)
+
+        drone1 = create_drone(user=self.user, serial_number='Test1')
+        drone2 = create_drone(
+            user=self.user,
+            serial_number='Test2',
+            drone_model=1,
+            state=Drone.DRONE_STATUS.ldg
+            )
+        medication = create_medication(user=self.user, code='TEST1')
+        drone2.medications.add(medication)
+        drone2.weight_limit = 50
+        drone2.save()
+
+        payload = [
+            {'serial_number': 'Test1', 'battery': 80},
+            {'serial_number': 'Test2', 'state': Drone.DRONE_STATUS.dld},
+        ]
+        res = self.client.post(TELEMETRY_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'updated': 2, 'errors': []})
+        self.assertEqual(
+            list(BatteryReading.objects.values_list(
+                'drone__serial_number',
+                'battery'
+                )),
+            [('Test1', 80)]
+            )
+        drone1.refresh_from_db()
+        drone2.refresh_from_db()
+        self.assertEqual(drone1.battery, 80)
+        self.assertEqual(drone2.state, Drone.DRONE_STATUS.dld)
+        self.assertEqual(drone2.weight_limit, 250)
+        self.assertEqual(drone2.loaded_weight, 0)
+        self.assertFalse(drone2.medications.exists())
+
+    def test_drone_telemetry_errors(self):
+        """Test invalid reports are reported without rejecting the batch."""
+        logging.disable(logging.CRITICAL)
+
+        other_user = create_user(
+            email='test2@example.com',
+            password='12345678'
+        )
+        create_drone(user=other_user, serial_number='Test1')
+        drone = create_drone(user=self.user, serial_number='Test2')
+
+        payload = [
+            {'serial_number': 'Test1', 'battery': 80},
+            {'serial_number': 'Test2', 'battery': 101},
+            {
+                'serial_number': 'Test2',
+                'battery': 10,
+                'state': Drone.DRONE_STATUS.ldg,
+            },
+            {'serial_number': 'Test2', 'battery': 60},
+        ]
+        res = self.client.post(TELEMETRY_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['updated'], 1)
+        self.assertEqual(
+            [error['index'] for error in res.data['errors']],
+            [0, 1, 2]
+            )
+        drone.refresh_from_db()
+        self.assertEqual(drone.battery, 60)
+
+    def test_drone_telemetry_invalid_payload(self):
+        """Test the telemetry payload has to be a list of reports."""
+        res = self.client.post(
+            TELEMETRY_URL,
+            {'serial_number': 'Test1'},
+            format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_drone_telemetry_constant_queries(self):
+        """Test applying reports does not query once per drone."""
+        logging.disable(logging.CRITICAL)
+
+        def setup(size):
+            return [
+                create_drone(user=self.user, serial_number=f'Test{size}_{i}')
+                for i in range(size)
+            ]
+
+        def request(drones):
+            payload = [
+                {'serial_number': drone.serial_number, 'battery': 50}
+                for drone in drones
+            ]
+            res = self.client.post(TELEMETRY_URL, payload, format='json')
+            self.assertEqual(res.data['updated'], len(drones))
+
+        self.assertConstantQueries(setup, request)
+
+    def test_add_medications_constant_queries(self):
+        """Test loading medications takes the same queries for any size."""
+        def setup(size):
+            drone = create_drone(
+                user=self.user,
+                serial_number=f'Test{size}',
+                drone_model=3,
+                state=Drone.DRONE_STATUS.ldg,
+                )
+            codes = [f'TEST{size}_{i}' for i in range(size)]
+            for code in codes:
+                create_medication(user=self.user, code=code, weight=10)
+            return drone, codes
+
+        def request(context):
+            drone, codes = context
+            res = self.client.post(
+                add_med_url(drone.serial_number),
+                {'medications': codes},
+                format='json'
+                )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(sorted(res.data['medications']), sorted(codes))
+            drone.refresh_from_db()
+            self.assertEqual(drone.weight_limit, 500 - 10 * len(codes))
+
+        self.assertConstantQueries(setup, request, sizes=(1, 20))
+
+    def create_loaded_drone(self, serial_number, medications):
+        """Create and return a drone loaded with new `medications`."""
+        drone = create_drone(
+            user=self.user,
+            serial_number=serial_number,
+            drone_model=3,
+            )
+        drone.medications.add(*[
+            create_medication(
+                user=self.user,
+                code=f'{serial_number}_{i}'.upper(),
+                weight=10
+                )
+            for i in range(medications)
+        ])
+        return drone
+
+    def test_list_drones_constant_queries(self):
+        """Test listing drones does not query once per drone."""
+        def setup(size):
+            Drone.objects.all().delete()
+            for i in range(size):
+                self.create_loaded_drone(f'Test{size}_{i}', 2)
+
+        def request(context):
+            res = self.client.get(DRONES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            for drone in res.data['results']:
+                self.assertEqual(len(drone['medications']), 2)
+
+        self.assertConstantQueries(setup, request)
+
+    def test_drone_detail_constant_queries(self):
+        """Test drone detail endpoints do not query once per medication."""
+        urls = [
+            detail_url,
+            lambda sn: reverse('drone:drone-check-medication', args=[sn]),
+        ]
+
+        for index, url in enumerate(urls):
+            def setup(size):
+                return self.create_loaded_drone(f'Test{index}_{size}', size)
+
+            def request(drone):
+                res = self.client.get(url(drone.serial_number))
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    len(res.data['medications']),
+                    drone.medications.count()
+                    )
+
+            with self.subTest(url=index):
+                self.assertConstantQueries(setup, request)
+
+
+@override_settings(DRONE_CACHE_ALIAS='default')
+class CachedDroneAPITests(TestCase):
+    """Test cached drone read API requests."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='test@example.com', password='12345678')
+        self.client.force_authenticate(self.user)
+        self.drone = create_drone(user=self.user, serial_number='Test1')
+        self.urls = [
+            detail_url(self.drone.serial_number),
+            reverse('drone:drone-check-battery', args=['Test1']),
+            reverse('drone:drone-check-medication', args=['Test1']),
+        ]
+
+    def test_cached_response_not_modified(self):
+        """Test polling with the ETag returns 304 without queries."""
+        for url in self.urls:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+            with self.assertNumQueries(0):
+                cached = self.client.get(url)
+                not_modified = self.client.get(
+                    url,
+                    HTTP_IF_NONE_MATCH=res['ETag']
+                    )
+
+            self.assertEqual(cached.data, res.data)
+            self.assertEqual(
+                not_modified.status_code,
+                status.HTTP_304_NOT_MODIFIED
+                )
+            self.assertEqual(not_modified['ETag'], res['ETag'])
+
+    def test_cached_response_invalidated(self):
+        """Test changing the drone invalidates its cached responses."""
+        logging.disable(logging.CRITICAL)
+
+        responses = [self.client.get(url) for url in self.urls]
+
+        medication = create_medication(user=self.user, code='TEST1')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.drone.medications.add(medication)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                manage_url(self.drone.serial_number),
+                {'battery': 50, 'state': Drone.DRONE_STATUS.idl},
+                format='json'
+                )
+
+        for url, res in zip(self.urls, responses):
+            updated = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+            self.assertEqual(updated.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(updated['ETag'], res['ETag'])
+            self.assertNotEqual(updated.data, res.data)
+
+    def test_cached_response_limited_to_user(self):
+        """Test another user cannot read the cached responses."""
+        for url in self.urls:
+            self.client.get(url)
+
+        other_user = create_user(
+            email='test2@example.com',
+            password='12345678'
+        )
+        self.client.force_authenticate(other_user)
+
+        for url in self.urls:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ConditionalDroneAPITests(TestCase):
+    """Test conditional drone read API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='test@example.com', password='12345678')
+        self.client.force_authenticate(self.user)
+        self.drone = create_drone(user=self.user, serial_number='Test1')
+        create_drone(user=self.user, serial_number='Test2')
+
+    def test_list_not_modified(self):
+        """Test polling the list with the ETag runs a single query."""
+        res = self.client.get(DRONES_URL)
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(
+                DRONES_URL,
+                HTTP_IF_NONE_MATCH=res['ETag']
+                )
+
+        self.assertEqual(
+            not_modified.status_code,
+            status.HTTP_304_NOT_MODIFIED
+            )
+        self.assertEqual(not_modified['ETag'], res['ETag'])
+
+    def test_list_not_modified_since(self):
+        """Test polling the list with the Last-Modified date."""
+        res = self.client.get(DRONES_URL)
+
+        not_modified = self.client.get(
+            DRONES_URL,
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+            )
+
+        self.assertEqual(
+            not_modified.status_code,
+            status.HTTP_304_NOT_MODIFIED
+            )
+
+    def test_list_modified(self):
+        """Test creating, updating and deleting drones change the ETag."""
+        etags = {self.client.get(DRONES_URL)['ETag']}
+
+        create_drone(user=self.user, serial_number='Test3')
+        etags.add(self.client.get(DRONES_URL)['ETag'])
+        self.drone.battery = 50
+        self.drone.save()
+        etags.add(self.client.get(DRONES_URL)['ETag'])
+        self.drone.delete()
+        res = self.client.get(DRONES_URL, HTTP_IF_NONE_MATCH=', '.join(etags))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn(res['ETag'], etags)
+
+    def test_detail_modified_by_medication(self):
+        """Test updating a loaded medication changes the drone ETag."""
+        medication = create_medication(user=self.user, code='TEST1')
+        self.drone.medications.add(medication)
+        url = detail_url(self.drone.serial_number)
+        res = self.client.get(url)
+
+        medication.name = 'Updated'
+        medication.save()
+        updated = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(updated.status_code, status.HTTP_200_OK)
+        self.assertEqual(updated.data['medications'][0]['name'], 'Updated')
+
+    def test_telemetry_modifies_drone(self):
+        """Test the batch telemetry updates change the drone ETag."""
+        url = detail_url(self.drone.serial_number)
+        res = self.client.get(url)
+
+        self.client.post(
+            TELEMETRY_URL,
+            [{'serial_number': 'Test1', 'battery': 50}],
+            format='json'
+            )
+        updated = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(updated.status_code, status.HTTP_200_OK)
+        self.assertEqual(updated.data['battery'], 50)
+
+    def test_detail_not_found_ignores_conditions(self):
+        """Test a missing drone is not reported as not modified."""
+        res = self.client.get(detail_url('Missing'), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ConcurrentDroneAPITests(TransactionTestCase):
+    """Test concurrent API requests against the same drone."""
+
+    def setUp(self):
+        self.user = create_user(email='test@example.com', password='12345678')
+
+    def run_concurrently(self, requests):
+        """
+        Post every `(url, payload)` in `requests` from its own thread at
+        the same time and return the response status codes, in order.
+        """
+        barrier = threading.Barrier(len(requests))
+        results = [None] * len(requests)
+
+        def post(index, url, payload):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                res = client.post(url, payload, format='json')
+                results[index] = res.status_code
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=post, args=(index, *request))
+            for index, request in enumerate(requests)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_concurrent_loads_never_overload_drone(self):
+        """Test concurrent loads never exceed the drone weight limit."""
+        drone = create_drone(
+            user=self.user,
+            serial_number='Test1',
+            drone_model=3,
+            state=Drone.DRONE_STATUS.ldg,
+            )
+        codes = [f'TEST{i}' for i in range(16)]
+        for code in codes:
+            create_medication(user=self.user, code=code, weight=50)
+
+        url = add_med_url(drone.serial_number)
+        results = self.run_concurrently(
+            [(url, {'medications': [code]}) for code in codes]
+        )
+
+        drone.refresh_from_db()
+        loaded = list(drone.medications.all())
+        self.assertEqual(results.count(status.HTTP_200_OK), 10)
+        self.assertEqual(len(loaded), 10)
+        self.assertEqual(drone.weight_limit, 0)
+        self.assertEqual(
+            drone.weight_limit + sum(med.weight for med in loaded),
+            drone.DRONE_WEIGHTS[drone.drone_model]
+            )
+        self.assertEqual(drone.loaded_weight, 500)
+        self.assertEqual(drone.loaded_count, 10)
+
+    def test_concurrent_load_and_unload(self):
+        """Test unloading while loading keeps the weight invariant."""
+        logging.disable(logging.CRITICAL)
+
+        drone = create_drone(
+            user=self.user,
+            serial_number='Test1',
+            drone_model=3,
+            state=Drone.DRONE_STATUS.ldg,
+            )
+        codes = [f'TEST{i}' for i in range(8)]
+        for code in codes:
+            create_medication(user=self.user, code=code, weight=50)
+
+        requests = [
+            (add_med_url(drone.serial_number), {'medications': [code]})
+            for code in codes
+        ]
+        requests.insert(4, (
+            manage_url(drone.serial_number),
+            {'state': Drone.DRONE_STATUS.idl}
+            ))
+        results = self.run_concurrently(requests)
+
+        drone.refresh_from_db()
+        medications = drone.medications.all()
+        loaded = sum(med.weight for med in medications)
+        self.assertEqual(
+            drone.weight_limit + loaded,
+            drone.DRONE_WEIGHTS[drone.drone_model]
+            )
+        self.assertEqual(results[4], status.HTTP_200_OK)
+        self.assertEqual(drone.state, Drone.DRONE_STATUS.idl)
+        self.assertEqual(drone.loaded_weight, loaded)
+        self.assertEqual(drone.loaded_count, len(medications))
+        self.assertEqual(len(medications), 0)
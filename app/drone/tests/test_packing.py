@@ -0,0 +1,60 @@
+"""
+Tests for packing medications into drones.
+"""
+import random
+
+from django.test import SimpleTestCase
+
+from drone.packing import pack
+
+
+class PackingTests(SimpleTestCase):
+    """Test the best-fit-decreasing packing."""
+
+    def test_pack_fills_loaded_drones_first(self):
+        """Test items go to the drone with the least space that fits."""
+        assignments, unassigned = pack(
+            [('A', 50), ('B', 200), ('C', 40)],
+            [('D1', 500, 100), ('D2', 250, 100), ('D3', 100, 100)],
+        )
+
+        self.assertEqual(assignments, {'D2': ['B', 'A'], 'D3': ['C']})
+        self.assertEqual(unassigned, [])
+
+    def test_pack_battery_tiebreaker(self):
+        """Test the drone with more battery wins between equal fits."""
+        assignments, unassigned = pack(
+            [('A', 100)],
+            [('D1', 250, 40), ('D2', 250, 90), ('D3', 250, 60)],
+        )
+
+        self.assertEqual(assignments, {'D2': ['A']})
+
+    def test_pack_unassigned_and_excluded(self):
+        """Test items that do not fit or are excluded are unassigned."""
+        assignments, unassigned = pack(
+            [('A', 300), ('B', 100)],
+            [('D1', 250, 100)],
+            excluded={('D1', 'B')},
+        )
+
+        self.assertEqual(assignments, {})
+        self.assertEqual(unassigned, ['A', 'B'])
+
+    def test_pack_large_manifest(self):
+        """Test packing 10k items into 1k drones respects capacities."""
+        rng = random.Random(0)
+        items = [(i, rng.randint(1, 100)) for i in range(10000)]
+        bins = [
+            (i, rng.choice([100, 250, 350, 500]), rng.randint(25, 100))
+            for i in range(1000)
+        ]
+        weights = dict(items)
+
+        assignments, unassigned = pack(items, bins)
+
+        for key, capacity, battery in bins:
+            loaded = sum(weights[i] for i in assignments.get(key, []))
+            self.assertLessEqual(loaded, capacity)
+        packed = sum(len(meds) for meds in assignments.values())
+        self.assertEqual(packed + len(unassigned), len(items))
@@ -0,0 +1,38 @@
+"""
+Tests for the drone serializers.
+"""
+from django.test import SimpleTestCase
+
+from rest_framework.exceptions import ValidationError
+
+from core.models import Drone
+
+from drone.serializers import ChoicesField
+
+
+class ChoicesFieldTests(SimpleTestCase):
+    """Test parsing and rendering choices."""
+
+    def setUp(self):
+        self.field = ChoicesField(Drone.DRONE_STATUS)
+
+    def test_choices_to_internal_value(self):
+        """Test values, names and labels parse in any case."""
+        for data in [1, '1', ' 1 ', 'ldg', 'LDG', 'Loading', 'loading']:
+            self.assertEqual(
+                self.field.to_internal_value(data),
+                Drone.DRONE_STATUS.ldg
+            )
+
+    def test_choices_invalid_value(self):
+        """Test unknown values raise a validation error."""
+        for data in [6, '6', 1.5, 'flying', ['ldg'], None]:
+            with self.assertRaisesMessage(ValidationError, 'Acceptable'):
+                self.field.to_internal_value(data)
+
+    def test_choices_to_representation(self):
+        """Test values are rendered as their labels."""
+        self.assertEqual(
+            self.field.to_representation(Drone.DRONE_STATUS.ldd),
+            'Loaded'
+        )
@@ -0,0 +1,110 @@
+"""
+Tests for the drone mission simulation.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.models import BatteryReading, Drone, DroneLoad, Medication
+from drone.simulation import Tick
+
+
+STATUS = Drone.DRONE_STATUS
+
+
+class SimulationTests(TestCase):
+    """Test the simulation ticks."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='12345678'
+        )
+
+    def create_drones(self, count, **params):
+        """Create `count` drones with `params` and return them."""
+        return Drone.objects.bulk_create([
+            Drone(
+                user=self.user,
+                serial_number=f'Test{Drone.objects.count()}_{i}',
+                weight_limit=100,
+                **params
+                )
+            for i in range(count)
+        ])
+
+    def snapshot(self):
+        """Return the state and battery of every drone."""
+        return list(
+            Drone.objects.order_by('pk').values_list('state', 'battery')
+        )
+
+    def test_tick_advances_missions(self):
+        """Test a tick drains, charges and moves the drones one state."""
+        delivered = self.create_drones(1, state=STATUS.dld, battery=60)[0]
+        idle = self.create_drones(1, state=STATUS.idl, battery=50)[0]
+        loading = self.create_drones(1, state=STATUS.ldg, battery=50)[0]
+
+        counts = Tick(Drone.objects.all(), 0).run()
+
+        delivered.refresh_from_db()
+        idle.refresh_from_db()
+        loading.refresh_from_db()
+        self.assertEqual(delivered.state, STATUS.ret)
+        self.assertLess(delivered.battery, 60)
+        self.assertEqual(idle.battery, 55)
+        self.assertEqual(loading.battery, 50)
+        self.assertEqual(counts['returning'], 1)
+        self.assertEqual(
+            set(BatteryReading.objects.values_list('drone', 'battery')),
+            {(delivered.pk, delivered.battery), (idle.pk, 55)}
+            )
+
+    def test_tick_arrivals_unload(self):
+        """Test delivering drones eventually deliver and unload."""
+        drones = self.create_drones(50, state=STATUS.dlg, battery=100)
+        medication = Medication.objects.create(
+            user=self.user,
+            code='TEST1',
+            name='Testing',
+            weight=50
+        )
+        for drone in drones:
+            drone.medications.add(medication)
+
+        counts = Tick(Drone.objects.all(), 0).run()
+
+        self.assertGreater(counts['delivered'], 0)
+        self.assertLess(counts['delivered'], 50)
+        delivered = Drone.objects.filter(state=STATUS.dld)
+        self.assertEqual(delivered.count(), counts['delivered'])
+        self.assertFalse(
+            DroneLoad.objects.filter(drone__in=delivered).exists()
+        )
+        self.assertEqual(
+            DroneLoad.objects.count(),
+            50 - counts['delivered']
+            )
+
+    def test_tick_low_battery_returns(self):
+        """Test delivering drones with a low battery return."""
+        self.create_drones(20, state=STATUS.dlg, battery=10)
+
+        Tick(Drone.objects.all(), 0).run()
+
+        self.assertFalse(Drone.objects.filter(state=STATUS.dlg).exists())
+
+    def test_ticks_deterministic(self):
+        """Test replaying the ticks with the same seed is repeatable."""
+        drones = self.create_drones(30, state=STATUS.dlg, battery=100)
+
+        def replay(seed):
+            Drone.objects.filter(pk__in=[d.pk for d in drones]).update(
+                state=STATUS.dlg,
+                battery=100
+            )
+            for tick in range(10):
+                Tick(Drone.objects.all(), tick, seed, readings=False).run()
+            return self.snapshot()
+
+        self.assertEqual(replay(1), replay(1))
+        self.assertNotEqual(replay(1), replay(2))
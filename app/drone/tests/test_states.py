@@ -0,0 +1,68 @@
+"""
+Tests for the drone state machine.
+"""
+from django.test import SimpleTestCase
+
+from core.models import Drone
+from drone import states
+
+
+STATUS = Drone.DRONE_STATUS
+
+
+class StateMachineTests(SimpleTestCase):
+    """Test the drone transition table and guards."""
+
+    def test_transition_sources(self):
+        """Test only the declared source states are allowed."""
+        drone = Drone(state=STATUS.idl, battery=100, loaded_weight=0)
+
+        self.assertIsNone(states.rejection(drone, STATUS.ldg))
+        self.assertIsNone(states.rejection(drone, STATUS.idl))
+        self.assertEqual(
+            states.rejection(drone, STATUS.dld),
+            'The drone cannot change from Idle to Delivered.'
+            )
+        self.assertIsNone(
+            states.rejection(drone, STATUS.dld, check_source=False)
+            )
+
+    def test_transition_guards(self):
+        """Test the guards check the reported battery first."""
+        drone = Drone(state=STATUS.ldd, battery=20, loaded_weight=50)
+
+        self.assertEqual(
+            states.rejection(drone, STATUS.dlg),
+            states.DELIVERING_BATTERY.message
+            )
+        self.assertIsNone(states.rejection(drone, STATUS.dlg, battery=80))
+
+        drone.loaded_weight = 0
+        self.assertEqual(
+            states.rejection(drone, STATUS.dlg, battery=80),
+            states.NOT_LOADED.message
+            )
+
+    def test_unload(self):
+        """Test unloading resets the drone capacity."""
+        drone = Drone(
+            drone_model=Drone.DRONE_MODEL.mw,
+            weight_limit=50,
+            loaded_weight=200,
+            loaded_count=2
+            )
+
+        states.unload(drone)
+
+        self.assertEqual(drone.weight_limit, 250)
+        self.assertEqual(drone.loaded_weight, 0)
+        self.assertEqual(drone.loaded_count, 0)
+
+    def test_every_state_reachable(self):
+        """Test every state can be entered and left."""
+        sources = set().union(*(
+            transition.sources for transition in states.TRANSITIONS.values()
+        ))
+
+        self.assertEqual(set(states.TRANSITIONS), set(STATUS._db_values))
+        self.assertEqual(sources, set(STATUS._db_values))
@@ -1,14 +1,16 @@
 """
 URL mappings for the drone app.
 """
+from django.conf import settings
 from django.urls import (
     path,
+    re_path,
     include
 )
 
 from rest_framework.routers import DefaultRouter
 
-from drone import views
+from drone import async_views, views
 
 
 router = DefaultRouter()
@@ -19,3 +21,40 @@ app_name = 'drone'
 urlpatterns = [
     path('', include(router.urls)),
 ]
+
+
+def async_urlpatterns():
+    """
+    Return the URLs of the asynchronous views, to be placed ahead of the
+    router, which still reverses the same URLs. The serial number never
+    matches the URL of a list action, which the router keeps serving.
+    """
+    list_actions = '|'.join(
+        extra_action.url_path
+        for extra_action in views.DroneViewSet.get_extra_actions()
+        if not extra_action.detail
+        )
+    serial_number = rf'(?P<serial_number>(?!(?:{list_actions})/)[^/.]+)'
+
+    return [
+        re_path(
+            r'^drone/check_available/$',
+            async_views.check_available
+            ),
+        re_path(
+            rf'^drone/{serial_number}/$',
+            async_views.retrieve
+            ),
+        re_path(
+            rf'^drone/{serial_number}/check_medication/$',
+            async_views.check_medication
+            ),
+        re_path(
+            rf'^drone/{serial_number}/check_battery/$',
+            async_views.check_battery
+            ),
+    ]
+
+
+if settings.ASYNC_DRONE_VIEWS:
+    urlpatterns = async_urlpatterns() + urlpatterns
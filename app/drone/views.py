@@ -4,33 +4,121 @@ Views for the drone API.
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Drone
-from drone import serializers
+from django.conf import settings
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from drf_spectacular.utils import extend_schema, extend_schema_view
 
+from core.authentication import CachedTokenAuthentication
+from core.mixins import (
+    STREAM_PARAMETER,
+    ConditionalGetMixin,
+    StreamingListMixin,
+)
+from core.models import Drone, Medication
+from drone import cache, serializers
+from medication.serializers import MedicationValuesSerializer
 
-class DroneViewSet(viewsets.ModelViewSet):
+
+def prefetch_medications(*fields):
+    """Prefetch the drone medications by code loading only `fields`."""
+    return Prefetch(
+        'medications',
+        Medication.objects.only(*fields).order_by('code')
+    )
+
+
+def available_page(request, queryset, paginator, view=None):
+    """
+    Return the page of the drones of `queryset` available to load
+    medications, filtered by the `request` query.
+    """
+    filters = serializers.DroneAvailableSerializer(
+        data=request.query_params
+        )
+    filters.is_valid(raise_exception=True)
+
+    available_drones = queryset.filter(
+        state=Drone.DRONE_STATUS.ldg,
+        battery__gte=filters.validated_data.get('min_battery', 0),
+        weight_limit__gte=filters.validated_data.get('min_weight', 0),
+    )
+    page = paginator.paginate_queryset(available_drones, request, view=view)
+    serializer = serializers.DroneValuesSerializer(
+        page,
+        many=True,
+        context={'request': request}
+        )
+
+    return paginator.get_paginated_response(serializer.data).data
+
+
+def loaded_medications(drone_pk, context):
+    """Return the medications loaded into the drone, from their values."""
+    medications = Medication.objects.filter(
+        loads__drone=drone_pk
+        ).order_by('code').values(*MedicationValuesSerializer.columns)
+    serializer = MedicationValuesSerializer(
+        medications,
+        many=True,
+        context=context
+        )
+
+    return {'medications': serializer.data}
+
+
+@extend_schema_view(list=extend_schema(
+    parameters=[STREAM_PARAMETER],
+    responses=serializers.DroneSerializer(many=True),
+))
+class DroneViewSet(
+        ConditionalGetMixin,
+        StreamingListMixin,
+        viewsets.ModelViewSet):
     """View for manage drone APIs."""
 
     serializer_class = serializers.DroneDetailSerializer
     queryset = Drone.objects.all()
     http_method_names = ['get', 'post', 'delete']
     lookup_field = 'serial_number'
-    authentication_classes = [TokenAuthentication]
+    ordering = ('serial_number',)
+    detail_last_modified_fields = ('updated_at', 'medications__updated_at')
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         """Retrieve drones for authenticated user."""
-        return self.queryset.filter(user=self.request.user).order_by(
-            'serial_number'
-        )
+        queryset = self.queryset.filter(user=self.request.user)
+
+        if self.action in ['list', 'check_available']:
+            queryset = queryset.values(
+                *serializers.DroneValuesSerializer.columns
+            )
+        elif self.action in ['retrieve', 'manage']:
+            queryset = queryset.prefetch_related(
+                prefetch_medications(
+                    'code',
+                    'name',
+                    'weight',
+                    'image',
+                    'image_status'
+                    )
+            )
+        elif self.action == 'battery_history':
+            queryset = queryset.only('serial_number', 'battery')
+        elif self.action == 'manifest':
+            queryset = queryset.only('serial_number')
+
+        return queryset.order_by(*self.ordering)
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
-        if self.action == 'list':
-            return serializers.DroneSerializer
+        if self.action in ['list', 'check_available']:
+            return serializers.DroneValuesSerializer
         elif self.action == 'manage':
             return serializers.DroneManageSerializer
         elif self.action == 'load_medication':
@@ -39,6 +127,8 @@ class DroneViewSet(viewsets.ModelViewSet):
             return serializers.DroneMedsSerializer
         elif self.action == 'check_battery':
             return serializers.DroneBatterySerializer
+        elif self.action == 'manifest':
+            return serializers.DroneLoadSerializer
 
         return self.serializer_class
 
@@ -46,14 +136,118 @@ class DroneViewSet(viewsets.ModelViewSet):
         """Create new drone."""
         serializer.save(user=self.request.user)
 
-    @action(detail=False, serializer_class=serializers.DroneSerializer)
-    def check_available(self, *args, **kwargs):
-        """List all available drones to load medications."""
+    def cached_response(self, request, render):
+        """
+        Return the response built by `render` from the cache of the drone
+        current version, or a 304 if the client already has it.
+        """
+        drone_cache = cache.get_cache()
+        if drone_cache is None:
+            return render()
 
-        available_drones = Drone.objects.filter(state=1)
-        serializer = serializers.DroneSerializer(available_drones, many=True)
+        serial_number = self.kwargs[self.lookup_field]
+        version = cache.get_version(serial_number)
+        key = cache.response_key(
+            serial_number,
+            version,
+            self.action,
+            request.user.pk,
+            request.get_host()
+            )
+        etag = quote_etag(f'{version}-{self.action}')
 
-        return Response(serializer.data)
+        data = drone_cache.get(key)
+        if data is None:
+            response = render()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            drone_cache.set(key, response.data, settings.DRONE_CACHE_TTL)
+            data = response.data
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data, status=status.HTTP_200_OK)
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve the drone, from the cache if it did not change."""
+        return self.cached_response(
+            request,
+            lambda: super(DroneViewSet, self).retrieve(
+                request,
+                *args,
+                **kwargs
+                )
+            )
+
+    @extend_schema(
+        parameters=[serializers.DroneAvailableSerializer],
+        responses=serializers.DroneSerializer(many=True),
+    )
+    @action(detail=False)
+    def check_available(self, request, *args, **kwargs):
+        """List the user drones available to load medications."""
+        return Response(available_page(
+            request,
+            self.get_queryset(),
+            self.paginator,
+            self
+            ))
+
+    @extend_schema(request=serializers.DroneAssignSerializer)
+    @action(detail=False, methods=['POST'])
+    def assign(self, request, *args, **kwargs):
+        """
+        Assign the medications to the best fitting available drones,
+        loading them if requested.
+        """
+        serializer = serializers.DroneAssignSerializer(data=request.data)
+
+        if serializer.is_valid():
+            return Response(
+                serializer.assign(request.user),
+                status=status.HTTP_200_OK
+                )
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(request=serializers.DroneTelemetrySerializer(many=True))
+    @action(detail=False, methods=['POST'])
+    def telemetry(self, request, *args, **kwargs):
+        """Apply a batch of drone state and battery reports."""
+        serializer = serializers.DroneTelemetryListSerializer(
+            data={'reports': request.data}
+            )
+
+        if serializer.is_valid():
+            return Response(
+                serializer.ingest(request.user),
+                status=status.HTTP_200_OK
+                )
+
+        return Response(
+            serializer.errors['reports'],
+            status=status.HTTP_400_BAD_REQUEST
+            )
+
+    @extend_schema(request=serializers.DroneTransitionSerializer)
+    @action(detail=False, methods=['POST'])
+    def transition(self, request, *args, **kwargs):
+        """Move many drones into a state through the state machine."""
+        serializer = serializers.DroneTransitionSerializer(data=request.data)
+
+        if serializer.is_valid():
+            return Response(
+                serializer.transition(request.user),
+                status=status.HTTP_200_OK
+                )
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=True, methods=['POST'])
     def load_medication(self, request, *args, **kwargs):
@@ -61,23 +255,76 @@ class DroneViewSet(viewsets.ModelViewSet):
         obj = self.get_object()
         return self.get_and_return_response(request, obj, True)
 
+    def get_object_values(self, *fields):
+        """Return the `fields` of the drone selected by the URL."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return get_object_or_404(
+            self.filter_queryset(self.get_queryset()).values(*fields),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+
     @action(detail=True)
     def check_medication(self, request, *args, **kwargs):
         """Return the medications loaded into the selected drone."""
-        obj = self.get_object()
-        return self.get_and_return_response(request, obj)
+        return self.cached_response(request, self.render_medications)
+
+    def render_medications(self):
+        """Render the drone medications from their values."""
+        drone = self.get_object_values('pk')
+        return Response(loaded_medications(
+            drone['pk'],
+            self.get_serializer_context()
+            ))
 
     @action(detail=True)
     def check_battery(self, request, *args, **kwargs):
         """Check the battery of the drone."""
+        return self.cached_response(
+            request,
+            lambda: Response(self.get_object_values('battery'))
+            )
+
+    @extend_schema(
+        parameters=[serializers.BatteryHistorySerializer],
+        responses=serializers.BatteryBucketSerializer(many=True),
+    )
+    @action(detail=True)
+    def battery_history(self, request, *args, **kwargs):
+        """Return the downsampled battery history of the drone."""
+        obj = self.get_object()
+        filters = serializers.BatteryHistorySerializer(
+            data=request.query_params
+            )
+        filters.is_valid(raise_exception=True)
+
+        serializer = serializers.BatteryBucketSerializer(
+            filters.history(obj),
+            many=True
+            )
+        return Response(serializer.data)
+
+    @action(detail=True)
+    def manifest(self, request, *args, **kwargs):
+        """Return the medications loaded into the drone, oldest first."""
         obj = self.get_object()
-        return self.get_and_return_response(request, obj)
+        loads = obj.loads.select_related('medication').only(
+            'medication__code',
+            'quantity',
+            'loaded_at',
+            'delivery_id'
+            ).order_by('loaded_at', 'medication__code')
+        serializer = self.get_serializer(loads, many=True)
+
+        return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
     def manage(self, request, *args, **kwargs):
         """Manage drone status and battery."""
-        obj = self.get_object()
-        return self.get_and_return_response(request, obj, True)
+        serializer = self.get_serializer(self.get_object(), data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     def get_and_return_response(self, request, obj, update=False):
         serializer = self.get_serializer(obj, data=request.data)
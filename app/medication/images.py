@@ -0,0 +1,267 @@
+"""
+Processing of the medication images.
+
+Uploads are only checked from their extension and header, moved to
+the storage as they are and handed over to a pool of worker threads
+once the upload commits. A worker validates the image, dropping it if
+it cannot be decoded, stores it again without its metadata, replacing
+the upload, and scales it down into WebP and JPEG thumbnails of fixed
+sizes.
+"""
+import io
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Drone, Medication
+from drone.cache import invalidate_drones
+
+
+logger = logging.getLogger(__name__)
+
+# Pillow format of every thumbnail extension.
+FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+# Extension of the stripped images by Pillow format.
+EXTENSIONS = {
+    'JPEG': '.jpg',
+    'PNG': '.png',
+    'WEBP': '.webp',
+    'GIF': '.gif',
+}
+
+# Extensions of the accepted uploads.
+UPLOAD_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_storage():
+    """Return the storage of the medication images."""
+    return Medication._meta.get_field('image').storage
+
+
+def thumbnail_name(name, size, extension):
+    """Return the storage name of a thumbnail of the image `name`."""
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+
+    return os.path.join(directory, 'thumbnails', f'{stem}_{size}.{extension}')
+
+
+def thumbnail_names(name):
+    """
+    Return the storage names of the thumbnails of the image `name` by
+    size and extension.
+    """
+    return {
+        str(size): {
+            extension: thumbnail_name(name, size, extension)
+            for extension in FORMATS
+        }
+        for size in settings.MEDICATION_THUMBNAIL_SIZES
+    }
+
+
+def image_lookup(name):
+    """
+    Return the lookup of the medications whose image is `name` or, for
+    a thumbnail, whose image `name` was scaled down from.
+    """
+    directory, filename = os.path.split(name)
+    if os.path.basename(directory) != 'thumbnails':
+        return Q(image=name)
+
+    stem = os.path.splitext(filename)[0].rpartition('_')[0]
+    return Q(image__startswith=os.path.join(
+        os.path.dirname(directory),
+        f'{stem}.'
+    ))
+
+
+def sniff_format(upload):
+    """
+    Return the Pillow format of the `upload` from its extension and its
+    header, without decoding it, or None if it is not an accepted image.
+    """
+    extension = os.path.splitext(upload.name)[1].lower()
+    if extension not in UPLOAD_EXTENSIONS:
+        return None
+
+    try:
+        with Image.open(upload) as image:
+            image_format = image.format
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return None
+    finally:
+        upload.seek(0)
+
+    if image_format not in EXTENSIONS and image_format != 'MPO':
+        return None
+
+    return image_format
+
+
+def save_image(image, path, image_format, **params):
+    """Write `image` to `path` atomically, replacing the existing file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            image.save(output, format=image_format, **params)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def save_thumbnails(image, name):
+    """
+    Scale `image` down into the thumbnails of the image `name`, unless
+    they exist already: the names are immutable, so are the thumbnails.
+    """
+    storage = get_storage()
+    names = thumbnail_names(name)
+    if all(
+            storage.exists(thumbnail)
+            for thumbnails in names.values()
+            for thumbnail in thumbnails.values()):
+        return
+
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA')
+    for size in sorted(settings.MEDICATION_THUMBNAIL_SIZES, reverse=True):
+        image.thumbnail((size, size))
+        for extension, thumbnail_format in FORMATS.items():
+            thumbnail = image
+            if thumbnail_format == 'JPEG' and image.mode != 'RGB':
+                thumbnail = image.convert('RGB')
+            save_image(
+                thumbnail,
+                storage.path(names[str(size)][extension]),
+                thumbnail_format,
+                quality=80
+                )
+
+
+def process_image(pk, name):
+    """
+    Validate the image `name` of the medication `pk`, store it again
+    without its metadata and generate its thumbnails. Return the new
+    image status, which is only stored, together with the stripped
+    image, if the medication still has the same image. An image that
+    cannot be processed is removed from the medication.
+    """
+    storage = get_storage()
+    path = storage.path(name)
+    stripped_name = None
+
+    try:
+        with Image.open(path) as image:
+            image.verify()
+
+        with Image.open(path) as original:
+            image_format = 'JPEG' if original.format == 'MPO' \
+                else original.format
+            image = ImageOps.exif_transpose(original)
+            image.load()
+
+        stripped = io.BytesIO()
+        image.save(stripped, format=image_format, quality=90)
+        extension = EXTENSIONS.get(image_format, os.path.splitext(name)[1])
+        stripped_name = storage.save(
+            Medication._meta.get_field('image').generate_filename(
+                None,
+                f'image{extension}'
+                ),
+            ContentFile(stripped.getvalue())
+            )
+        save_thumbnails(image, stripped_name)
+        status = Medication.IMAGE_STATUS.ready
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        logger.warning('Cannot process the medication image %s.', name,
+                       exc_info=True)
+        status = Medication.IMAGE_STATUS.failed
+        if stripped_name is not None:
+            storage.delete(stripped_name)
+            stripped_name = None
+
+    values = {
+        'image': stripped_name,
+        'image_status': status,
+        'updated_at': timezone.now(),
+    }
+    with transaction.atomic():
+        updated = Medication.objects.filter(pk=pk, image=name).update(
+            **values
+        )
+        if updated:
+            invalidate_drones(
+                Drone.objects.filter(loads__medication=pk).values_list(
+                    'serial_number',
+                    flat=True
+                    )
+                )
+
+        if updated:
+            storage.delete(name)
+        elif stripped_name is not None:
+            storage.delete(stripped_name)
+
+    return status
+
+
+def run_in_worker(pk, name):
+    """Process the image in a worker thread, closing its connections."""
+    try:
+        process_image(pk, name)
+    except Exception:
+        logger.exception('Cannot process the medication image %s.', name)
+    finally:
+        connections.close_all()
+
+
+def get_executor():
+    """Return the pool of image workers, starting it on first use."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.MEDICATION_IMAGE_WORKERS,
+                thread_name_prefix='medication-image',
+            )
+
+    return _executor
+
+
+def submit(pk, name):
+    """
+    Process the image `name` of the medication `pk` in the worker pool,
+    or right away if the pool is disabled.
+    """
+    if settings.MEDICATION_IMAGE_WORKERS <= 0:
+        process_image(pk, name)
+    else:
+        get_executor().submit(run_in_worker, pk, name)
+
+
+def schedule(medication):
+    """Process the image of `medication` once the transaction commits."""
+    pk, name = medication.pk, medication.image.name
+    transaction.on_commit(lambda: submit(pk, name))
@@ -0,0 +1,103 @@
+"""
+Django command to remove the medication images no longer referenced.
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.models import ImageBlob, Medication
+from medication.images import get_storage, thumbnail_names
+
+
+class Command(BaseCommand):
+    """Django command to garbage collect the stored images."""
+
+    help = 'Remove the stored images, and their thumbnails, that no ' \
+           'medication references anymore. With --interval it keeps ' \
+           'running as the background sweeper.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=3600,
+            help='Seconds an image stays unreferenced before removal.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep sweeping every this many seconds, 0 to run once.',
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Recount the references from the medications first.',
+        )
+
+    def recount(self):
+        """Recompute the drifted reference counts from the medications."""
+        actual = Coalesce(
+            Subquery(
+                Medication.objects.filter(
+                    image=OuterRef('name')
+                ).order_by().values('image').annotate(
+                    total=Count('pk')
+                ).values('total')
+            ),
+            0
+        )
+
+        return ImageBlob.objects.annotate(actual=actual).exclude(
+            references=F('actual')
+        ).update(references=actual, updated_at=timezone.now())
+
+    def collect(self, cutoff, batch_size):
+        """
+        Remove one batch of unreferenced images, keeping their rows
+        locked until the files are gone. Return the number removed.
+        """
+        storage = get_storage()
+        with transaction.atomic():
+            blobs = dict(
+                ImageBlob.objects.filter(
+                    references__lte=0,
+                    updated_at__lt=cutoff
+                ).select_for_update(skip_locked=True).order_by(
+                    'updated_at'
+                ).values_list('pk', 'name')[:batch_size]
+            )
+
+            for name in blobs.values():
+                for thumbnails in thumbnail_names(name).values():
+                    for thumbnail in thumbnails.values():
+                        storage.purge(thumbnail)
+                storage.purge(name)
+            ImageBlob.objects.filter(pk__in=blobs).delete()
+
+        return len(blobs)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['recount']:
+            self.stdout.write(f'{self.recount()} reference counts fixed.')
+
+        while True:
+            cutoff = timezone.now() - timedelta(seconds=options['grace'])
+            removed = 0
+            while True:
+                collected = self.collect(cutoff, options['batch_size'])
+                removed += collected
+                if collected < options['batch_size']:
+                    break
+
+            self.stdout.write(f'{removed} unreferenced images removed.')
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
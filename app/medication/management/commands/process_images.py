@@ -0,0 +1,41 @@
+"""
+Django command to process the pending medication images.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Medication
+from medication.images import process_image
+
+
+class Command(BaseCommand):
+    """Django command to process the medication images left pending."""
+
+    help = 'Process the medication images still pending, such as the ' \
+           'ones queued before a restart.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--failed',
+            action='store_true',
+            help='Also retry the images that failed.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        statuses = [Medication.IMAGE_STATUS.pending]
+        if options['failed']:
+            statuses.append(Medication.IMAGE_STATUS.failed)
+
+        pending = Medication.objects.filter(
+            image_status__in=statuses
+            ).order_by('pk').values_list('pk', 'image')
+
+        counts = {status: 0 for status, label in Medication.IMAGE_STATUS}
+        for pk, name in pending.iterator():
+            counts[process_image(pk, name)] += 1
+
+        self.stdout.write(', '.join(
+            f'{count} {Medication.IMAGE_STATUS[status].lower()}'
+            for status, count in counts.items()
+            if status != Medication.IMAGE_STATUS.pending
+        ) + '.')
@@ -0,0 +1,95 @@
+"""
+Django command to find the medication image files with no database row.
+"""
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import ImageBlob, Medication
+from medication.images import get_storage
+
+
+class Command(BaseCommand):
+    """Django command to reconcile the image files with the database."""
+
+    help = 'Find the files under uploads/medication that no image blob ' \
+           'or medication refers to, and remove them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the orphaned files.',
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=3600,
+            help='Ignore the files modified in the last seconds, as they '
+                 'may still be being written.',
+        )
+
+    def known_images(self):
+        """
+        Return the `(directory, stem)` pairs of the images known to the
+        database, which their thumbnails are named after.
+        """
+        names = set(ImageBlob.objects.values_list('name', flat=True))
+        names.update(
+            Medication.objects.exclude(image__isnull=True).exclude(
+                image=''
+            ).values_list('image', flat=True)
+        )
+
+        return {
+            (os.path.dirname(name), os.path.splitext(name)[0].rsplit('/')[-1])
+            for name in names
+        }
+
+    def orphans(self, known, cutoff):
+        """Yield the storage names of the files of no known image."""
+        storage = get_storage()
+        root = storage.path(os.path.join('uploads', 'medication'))
+
+        for directory, dirnames, filenames in os.walk(root):
+            relative = os.path.relpath(directory, storage.location)
+            if os.path.basename(relative) == 'thumbnails':
+                owner = os.path.dirname(relative)
+            else:
+                owner = None
+
+            for filename in filenames:
+                stem = os.path.splitext(filename)[0]
+                if owner is not None:
+                    image = (owner, stem.rsplit('_', 1)[0])
+                else:
+                    image = (relative, stem)
+                if image in known:
+                    continue
+
+                path = os.path.join(directory, filename)
+                try:
+                    if os.path.getmtime(path) > cutoff:
+                        continue
+                except FileNotFoundError:
+                    continue
+
+                yield os.path.join(relative, filename)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        storage = get_storage()
+        cutoff = time.time() - options['grace']
+        orphans = sorted(self.orphans(self.known_images(), cutoff))
+
+        if not options['dry_run']:
+            for name in orphans:
+                storage.purge(name)
+
+        self.stdout.write(
+            f'{len(orphans)} orphaned files'
+            f'{"" if options["dry_run"] else " removed"}.'
+        )
+        for name in orphans:
+            self.stdout.write(f'  {name}', self.style.WARNING)
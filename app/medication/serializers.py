@@ -4,10 +4,35 @@ Serializers for medication APIs
 from rest_framework import serializers
 
 from core.models import Medication
+from core.serializers import ValuesSerializer
+from medication import images
+
+
+def thumbnail_urls(name, request=None):
+    """
+    Return the URLs of the thumbnails of the image `name` by size and
+    format, absolute if there is a `request`.
+    """
+    storage = images.get_storage()
+    urls = {}
+    for size, names in images.thumbnail_names(name).items():
+        urls[size] = {}
+        for extension, thumbnail in names.items():
+            url = storage.url(thumbnail)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[size][extension] = url
+
+    return urls
 
 
 class MedicationSerializer(serializers.ModelSerializer):
     """Serializer for medications."""
+    image_status = serializers.CharField(
+        source='get_image_status_display',
+        read_only=True
+        )
+    thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = Medication
@@ -16,17 +41,89 @@ class MedicationSerializer(serializers.ModelSerializer):
             'code',
             'name',
             'weight',
-            'image'
+            'image',
+            'image_status',
+            'thumbnails',
             ]
         read_only_fields = [
         ]
 
+    def get_thumbnails(self, obj):
+        """Return the thumbnail URLs once the image is processed."""
+        if obj.image_status != Medication.IMAGE_STATUS.ready:
+            return None
+
+        return thumbnail_urls(obj.image.name, self.context.get('request'))
+
+
+class MedicationValuesSerializer(ValuesSerializer):
+    """Fast read-only MedicationSerializer of `values()` rows."""
+    columns = ('code', 'name', 'weight', 'image', 'image_status')
+
+    def prepare(self, rows):
+        self.storage = images.get_storage()
+        self.request = self.context.get('request')
+        self.image_statuses = {
+            value: str(label) for value, label in Medication.IMAGE_STATUS
+        }
+
+    def to_representation(self, row):
+        image = row['image'] or None
+        if image is not None:
+            image = self.storage.url(image)
+            if self.request is not None:
+                image = self.request.build_absolute_uri(image)
+
+        thumbnails = None
+        if row['image_status'] == Medication.IMAGE_STATUS.ready:
+            thumbnails = thumbnail_urls(row['image'], self.request)
+
+        return {
+            'code': row['code'],
+            'name': row['name'],
+            'weight': row['weight'],
+            'image': image,
+            'image_status': self.image_statuses.get(row['image_status']),
+            'thumbnails': thumbnails,
+        }
+
 
 class MedicationImageSerializer(serializers.ModelSerializer):
-    """Serializer for uploading images to recipe."""
+    """
+    Serializer for uploading images to recipe. The image is only
+    checked from its extension and header here, it is decoded by the
+    image workers after the upload.
+    """
+    image = serializers.FileField(required=True)
+    image_status = serializers.CharField(
+        source='get_image_status_display',
+        read_only=True
+        )
 
     class Meta:
         model = Medication
-        fields = ['code', 'image']
+        fields = ['code', 'image', 'image_status']
         read_only_fields = ['code']
-        extra_kwargs = {'image': {'required': 'True'}}
+
+    def validate_image(self, value):
+        """Reject the uploads that do not look like an accepted image."""
+        if images.sniff_format(value) is None:
+            raise serializers.ValidationError(
+                'Upload a JPEG, PNG, WebP or GIF image.'
+            )
+
+        return value
+
+    def update(self, instance, validated_data):
+        """
+        Save the image and queue it for processing, releasing the
+        reference on the previous image.
+        """
+        previous = instance.image.name if instance.image else None
+        validated_data['image_status'] = Medication.IMAGE_STATUS.pending
+        instance = super().update(instance, validated_data)
+        if previous:
+            instance.image.storage.delete(previous)
+        images.schedule(instance)
+
+        return instance
@@ -1,22 +1,32 @@
 """
 Tests for the medications API.
 """
+import json
 import tempfile
 import os
+from io import StringIO
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
 
-from core.models import Medication, Drone
+from core.models import ImageBlob, Medication, Drone
 
-from medication.serializers import MedicationSerializer
+from medication.images import get_storage, thumbnail_names
+
+from medication.serializers import (
+    MedicationSerializer,
+    MedicationValuesSerializer,
+    )
 
 
 MEDICATIONS_URL = reverse('medication:medication-list')
@@ -37,6 +47,11 @@ def image_upload_url(medication_url):
     return reverse('medication:medication-upload-image', args=[medication_url])
 
 
+def media_url(name):
+    """Create and return a protected media URL."""
+    return reverse('medication:media', args=[name])
+
+
 def create_drone(user, serial_number, **params):
     """Create and return a sample drone."""
     drone = Drone.objects.create(
@@ -52,6 +67,16 @@ def detail_url(medication_code):
     return reverse('medication:medication-detail', args=[medication_code])
 
 
+def purge_images():
+    """Remove the image files stored by a test."""
+    storage = get_storage()
+    for name in ImageBlob.objects.values_list('name', flat=True):
+        for thumbnails in thumbnail_names(name).values():
+            for thumbnail in thumbnails.values():
+                storage.purge(thumbnail)
+        storage.purge(name)
+
+
 def create_user(email='user@example.com', password='12345678'):
     """Create and return a new user."""
     return get_user_model().objects.create_user(email=email, password=password)
@@ -85,10 +110,10 @@ class PrivateMedicationsApiTests(TestCase):
 
         res = self.client.get(MEDICATIONS_URL)
 
-        medications = Medication.objects.all().order_by('-name')
+        medications = Medication.objects.all().order_by('-name', 'code')
         serializer = MedicationSerializer(medications, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_medications_limited_to_user(self):
         """Test list of medications is limited to authenticated user."""
@@ -99,9 +124,59 @@ class PrivateMedicationsApiTests(TestCase):
         res = self.client.get(MEDICATIONS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['code'], medication.code)
-        self.assertEqual(res.data[0]['name'], medication.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['code'], medication.code)
+        self.assertEqual(res.data['results'][0]['name'], medication.name)
+
+    def test_medications_list_paginated(self):
+        """Test paging through medications sharing the same name."""
+        create_medication(user=self.user, code='TESTING1', name='Bravo')
+        create_medication(user=self.user, code='TESTING2', name='Alpha')
+        create_medication(user=self.user, code='TESTING3', name='Bravo')
+        create_medication(user=self.user, code='TESTING4', name='Bravo')
+
+        res = self.client.get(MEDICATIONS_URL, {'page_size': 2})
+        pages = [res.data]
+        while pages[-1]['next']:
+            pages.append(self.client.get(pages[-1]['next']).data)
+
+        self.assertEqual(
+            [[m['code'] for m in page['results']] for page in pages],
+            [['TESTING1', 'TESTING3'], ['TESTING4', 'TESTING2']]
+            )
+
+    def test_retrieve_medication_not_modified(self):
+        """Test polling a medication with its ETag until it changes."""
+        medication = create_medication(self.user, 'TESTING1')
+        url = detail_url(medication.code)
+        res = self.client.get(url)
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        medication.name = 'Updated'
+        medication.save()
+        updated = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(
+            not_modified.status_code,
+            status.HTTP_304_NOT_MODIFIED
+            )
+        self.assertEqual(updated.status_code, status.HTTP_200_OK)
+        self.assertEqual(updated.data['name'], 'Updated')
+
+    def test_medications_list_stream_ndjson(self):
+        """Test streaming every medication as newline delimited JSON."""
+        for i in range(3):
+            create_medication(user=self.user, code=f'TESTING{i}')
+
+        res = self.client.get(MEDICATIONS_URL, {'stream': 'ndjson'})
+        lines = b''.join(res.streaming_content).decode().splitlines()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            [json.loads(line)['code'] for line in lines],
+            ['TESTING0', 'TESTING1', 'TESTING2']
+            )
 
     def test_delete_medication(self):
         """Test deleting a medication."""
@@ -140,7 +215,7 @@ class ImageUploadTests(TestCase):
         self.medication = create_medication(user=self.user, code='TEST123')
 
     def tearDown(self):
-        self.medication.image.delete()
+        purge_images()
 
     def test_upload_image(self):
         """Test uploading an image to a medication."""
@@ -157,6 +232,34 @@ class ImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.medication.image.path))
 
+    def test_values_serializer_matches_model(self):
+        """Test the values serializer renders the same bytes as the model."""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            self.client.post(
+                image_upload_url(self.medication.code),
+                {'image': image_file},
+                format='multipart'
+            )
+        create_medication(user=self.user, code='TEST456')
+        medications = Medication.objects.order_by('code')
+        context = {'request': APIRequestFactory().get(MEDICATIONS_URL)}
+
+        expected = JSONRenderer().render(MedicationSerializer(
+            medications,
+            many=True,
+            context=context
+        ).data)
+        rendered = JSONRenderer().render(MedicationValuesSerializer(
+            medications.values(*MedicationValuesSerializer.columns),
+            many=True,
+            context=context
+        ).data)
+
+        self.assertIn(b'http://testserver/', rendered)
+        self.assertEqual(rendered, expected)
+
     def test_upload_image_bad_request(self):
         """Test uploading invalid image."""
         url = image_upload_url(self.medication.code)
@@ -164,3 +267,287 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_not_an_image_rejected(self):
+        """Test the files that do not look like an image are rejected."""
+        url = image_upload_url(self.medication.code)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            image_file.write(b'notanimage')
+            image_file.seek(0)
+            res = self.client.post(url, {'image': image_file},
+                                   format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+
+        with tempfile.NamedTemporaryFile(suffix='.txt') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='PNG')
+            image_file.seek(0)
+            res = self.client.post(url, {'image': image_file},
+                                   format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.medication.refresh_from_db()
+        self.assertFalse(self.medication.image)
+
+
+@override_settings(MEDICATION_IMAGE_WORKERS=0)
+class ImageProcessingTests(TestCase):
+    """Tests for the medication image pipeline."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            'user@example.com',
+            '12345678'
+        )
+        self.client.force_authenticate(self.user)
+        self.medication = create_medication(user=self.user, code='TEST123')
+
+    def tearDown(self):
+        purge_images()
+
+    def upload(self, image_file):
+        """Upload `image_file` and run the image workers."""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                image_upload_url(self.medication.code),
+                {'image': image_file},
+                format='multipart'
+            )
+        self.medication.refresh_from_db()
+
+        return res
+
+    def test_upload_image_processed(self):
+        """Test the image is stripped and scaled into thumbnails."""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            exif = Image.Exif()
+            exif[0x010F] = 'Camera'
+            Image.new('RGB', (1000, 500)).save(
+                image_file,
+                format='JPEG',
+                exif=exif
+            )
+            image_file.seek(0)
+            res = self.upload(image_file)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_status'], 'Pending')
+        self.assertEqual(
+            self.medication.image_status,
+            Medication.IMAGE_STATUS.ready
+            )
+        with Image.open(self.medication.image.path) as image:
+            self.assertNotIn('exif', image.info)
+
+        storage = self.medication.image.storage
+        names = thumbnail_names(self.medication.image.name)
+        with Image.open(storage.path(names['128']['webp'])) as image:
+            self.assertEqual(image.size, (128, 64))
+        with Image.open(storage.path(names['512']['jpeg'])) as image:
+            self.assertEqual(image.size, (512, 256))
+
+        res = self.client.get(MEDICATIONS_URL)
+
+        thumbnails = res.data['results'][0]['thumbnails']
+        self.assertEqual(set(thumbnails), {'128', '512'})
+        self.assertTrue(thumbnails['128']['webp'].endswith('_128.webp'))
+
+    def test_upload_invalid_image_failed(self):
+        """Test an image that cannot be decoded is failed and dropped."""
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            Image.new('RGB', (50, 50)).save(image_file, format='PNG')
+            image_file.truncate(60)
+            image_file.seek(0)
+            res = self.upload(image_file)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.medication.image_status,
+            Medication.IMAGE_STATUS.failed
+            )
+        self.assertFalse(self.medication.image)
+        self.assertEqual(ImageBlob.objects.get().references, 0)
+        res = self.client.get(detail_url(self.medication.code))
+        self.assertEqual(res.data['image_status'], 'Failed')
+        self.assertIsNone(res.data['image'])
+        self.assertIsNone(res.data['thumbnails'])
+
+    def test_process_pending_images(self):
+        """Test the command processes the images left pending."""
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            Image.new('RGBA', (300, 300)).save(image_file, format='PNG')
+            image_file.seek(0)
+            self.client.post(
+                image_upload_url(self.medication.code),
+                {'image': image_file},
+                format='multipart'
+            )
+        out = StringIO()
+
+        call_command('process_images', stdout=out)
+
+        self.medication.refresh_from_db()
+        self.assertEqual(
+            self.medication.image_status,
+            Medication.IMAGE_STATUS.ready
+            )
+        self.assertIn('1 ready, 0 failed.', out.getvalue())
+
+
+class ImageStorageTests(TestCase):
+    """Tests for the deduplicated medication image storage."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            'user@example.com',
+            '12345678'
+        )
+        self.client.force_authenticate(self.user)
+        self.medications = [
+            create_medication(user=self.user, code=f'TEST{i}')
+            for i in range(3)
+        ]
+        submit = patch('medication.images.submit')
+        submit.start()
+        self.addCleanup(submit.stop)
+
+    def tearDown(self):
+        purge_images()
+
+    def upload(self, medication, color):
+        """Upload a single `color` image to `medication`."""
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            Image.new('RGB', (10, 10), color).save(image_file, format='PNG')
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    image_upload_url(medication.code),
+                    {'image': image_file},
+                    format='multipart'
+                )
+        medication.refresh_from_db()
+
+        return medication.image.name
+
+    def test_identical_images_stored_once(self):
+        """Test identical uploads share a single reference counted file."""
+        names = [
+            self.upload(medication, 'red')
+            for medication in self.medications
+        ]
+
+        self.assertEqual(len(set(names)), 1)
+        self.assertTrue(os.path.exists(get_storage().path(names[0])))
+        self.assertEqual(
+            ImageBlob.objects.get(name=names[0]).references,
+            3
+            )
+
+    def test_collect_unreferenced_images(self):
+        """Test only the images no medication references are removed."""
+        shared = self.upload(self.medications[0], 'red')
+        self.upload(self.medications[1], 'red')
+        replaced = self.upload(self.medications[2], 'blue')
+        self.upload(self.medications[2], 'green')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.medications[0].delete()
+
+        out = StringIO()
+        call_command('collect_images', '--grace', '0', stdout=out)
+
+        self.assertIn('1 unreferenced images removed.', out.getvalue())
+        self.assertFalse(os.path.exists(get_storage().path(replaced)))
+        self.assertTrue(os.path.exists(get_storage().path(shared)))
+        self.assertEqual(ImageBlob.objects.get(name=shared).references, 1)
+
+    def test_collect_recounts_references(self):
+        """Test recounting fixes the drifted reference counts."""
+        name = self.upload(self.medications[0], 'red')
+        ImageBlob.objects.filter(name=name).update(references=0)
+
+        out = StringIO()
+        call_command(
+            'collect_images',
+            '--recount',
+            '--grace', '0',
+            stdout=out
+        )
+
+        self.assertIn('1 reference counts fixed.', out.getvalue())
+        self.assertTrue(os.path.exists(get_storage().path(name)))
+
+    def test_reconcile_orphaned_files(self):
+        """Test the files with no database row are found and removed."""
+        storage = get_storage()
+        name = self.upload(self.medications[0], 'red')
+        kept = thumbnail_names(name)['128']['webp']
+        orphan = 'uploads/medication/00/orphan.png'
+        for path in (kept, orphan):
+            os.makedirs(os.path.dirname(storage.path(path)), exist_ok=True)
+            with open(storage.path(path), 'wb') as output:
+                output.write(b'test')
+
+        out = StringIO()
+        call_command('reconcile_images', '--grace', '0', '--dry-run',
+                     stdout=out)
+        self.assertIn('1 orphaned files.', out.getvalue())
+        self.assertTrue(os.path.exists(storage.path(orphan)))
+
+        call_command('reconcile_images', '--grace', '0', stdout=out)
+        self.assertIn('1 orphaned files removed.', out.getvalue())
+        self.assertFalse(os.path.exists(storage.path(orphan)))
+        self.assertTrue(os.path.exists(storage.path(name)))
+        self.assertTrue(os.path.exists(storage.path(kept)))
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=True)
+    def test_media_accel_redirect(self):
+        """Test the owner is redirected to the internal media location."""
+        name = self.upload(self.medications[0], 'red')
+        thumbnail = thumbnail_names(name)['128']['webp']
+
+        for path in (name, thumbnail):
+            res = self.client.get(media_url(path))
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res['X-Accel-Redirect'], f'/static/media/{path}')
+            self.assertEqual(
+                res['Cache-Control'],
+                'private, max-age=31536000, immutable'
+                )
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=True)
+    def test_media_limited_to_owner(self):
+        """Test the images of other users are not found."""
+        name = self.upload(self.medications[0], 'red')
+        client = APIClient()
+        client.force_authenticate(create_user('other@example.com', 'pass'))
+
+        res = client.get(media_url(name))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('X-Accel-Redirect', res)
+
+    def test_media_path_traversal_not_found(self):
+        """Test the paths out of the medication images are not found."""
+        res = self.client.get(
+            media_url('uploads/medication/../../settings.py')
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=False)
+    def test_media_served_by_django(self):
+        """Test the images are streamed by Django without the proxy."""
+        name = self.upload(self.medications[0], 'red')
+
+        res = self.client.get(media_url(name))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with get_storage().open(name) as image_file:
+            self.assertEqual(
+                b''.join(res.streaming_content),
+                image_file.read()
+                )
@@ -18,4 +18,5 @@ app_name = 'medication'
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('media/<path:path>', views.MediaView.as_view(), name='media'),
 ]
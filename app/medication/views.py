@@ -1,40 +1,71 @@
 """
 Views for the medications API.
 """
-from rest_framework.exceptions import PermissionDenied
+import mimetypes
+import posixpath
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.encoding import escape_uri_path
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, extend_schema_view
+from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework import viewsets, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from core.models import Medication, Drone
-from medication import serializers
+from core.authentication import CachedTokenAuthentication
+from core.mixins import (
+    STREAM_PARAMETER,
+    ConditionalGetMixin,
+    StreamingListMixin,
+)
+from core.models import DroneLoad, Medication
+from core.storage import is_content_name
+from medication import images, serializers
 
 
-class MedicationViewSet(viewsets.ModelViewSet):
+@extend_schema_view(list=extend_schema(
+    parameters=[STREAM_PARAMETER],
+    responses=serializers.MedicationSerializer(many=True),
+))
+class MedicationViewSet(
+        ConditionalGetMixin,
+        StreamingListMixin,
+        viewsets.ModelViewSet):
     """View for manage medications APIs."""
     serializer_class = serializers.MedicationSerializer
     queryset = Medication.objects.all()
     http_method_names = ['get', 'post', 'delete']
     lookup_field = 'code'
-    authentication_classes = [TokenAuthentication]
+    ordering = ('-name', 'code')
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            queryset = queryset.values(
+                *serializers.MedicationValuesSerializer.columns
+            )
+
+        return queryset.order_by(*self.ordering)
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
         if self.action == 'upload_image':
             return serializers.MedicationImageSerializer
+        elif self.action == 'list':
+            return serializers.MedicationValuesSerializer
 
         return self.serializer_class
 
     def perform_destroy(self, instance):
         """Destroy the medication."""
-        if Drone.objects.filter(medications__code=instance.code).exists():
+        if DroneLoad.objects.filter(medication=instance).exists():
             raise PermissionDenied(
                 detail='The medication is currently inside of a dron.'
             )
@@ -56,3 +87,58 @@ class MedicationViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class MediaView(APIView):
+    """
+    View serving the medication images to their owners.
+
+    Behind the proxy the file is streamed by nginx with an
+    `X-Accel-Redirect` to its internal media location; otherwise it is
+    streamed by Django.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_name(self, path):
+        """Return the storage name of `path` if it is a medication image."""
+        name = posixpath.normpath(path)
+        if name != path or not name.startswith('uploads/medication/'):
+            raise NotFound()
+
+        return name
+
+    def check_access(self, name):
+        """Check the user owns a medication with the image `name`."""
+        medications = Medication.objects.filter(images.image_lookup(name))
+        if not self.request.user.is_staff:
+            medications = medications.filter(user=self.request.user)
+        if not medications.exists():
+            raise NotFound()
+
+    @extend_schema(responses={(200, '*/*'): OpenApiTypes.BINARY})
+    def get(self, request, path):
+        """Serve the image or thumbnail `path`."""
+        name = self.get_name(path)
+        self.check_access(name)
+
+        if settings.MEDIA_ACCEL_REDIRECT:
+            response = HttpResponse(
+                content_type=mimetypes.guess_type(name)[0]
+            )
+            response['X-Accel-Redirect'] = escape_uri_path(
+                settings.MEDIA_INTERNAL_URL + name
+            )
+        else:
+            try:
+                response = FileResponse(images.get_storage().open(name))
+            except FileNotFoundError:
+                raise NotFound()
+
+        if is_content_name(name):
+            response['Cache-Control'] = \
+                'private, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = 'private, no-cache'
+
+        return response
@@ -1,3 +1,8 @@
+upstream app {
+    server ${APP_HOST}:${APP_PORT};
+    keepalive 64;
+}
+
 server {
     listen ${LISTEN_PORT};
 
@@ -5,9 +10,22 @@ server {
         alias /vol/static;
     }
 
+    # Only reachable through the X-Accel-Redirect of the app, once it
+    # checked the access; the app also sets the Cache-Control header.
+    location /static/media/ {
+        internal;
+        alias /vol/static/media/;
+
+        sendfile                    on;
+        tcp_nopush                  on;
+        open_file_cache             max=10000 inactive=10m;
+        open_file_cache_valid       5m;
+        open_file_cache_min_uses    2;
+        open_file_cache_errors      on;
+    }
+
     location / {
-        uwsgi_pass              ${APP_HOST}:${APP_PORT};
-        include                 /etc/nginx/uwsgi_params;
+        include                 /etc/nginx/upstream-${APP_SERVER}.conf;
         client_max_body_size    10M;
     }
 }
\ No newline at end of file
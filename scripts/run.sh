@@ -6,4 +6,12 @@ python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+if [ "${APP_SERVER:-wsgi}" = "asgi" ]; then
+    exec gunicorn app.asgi:application \
+        --worker-class uvicorn.workers.UvicornWorker \
+        --workers 4 \
+        --bind :9000
+else
+    exec uwsgi --socket :9000 --workers 4 --master --enable-threads \
+        --module app.wsgi
+fi
\ No newline at end of file